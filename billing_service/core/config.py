@@ -39,6 +39,17 @@ class Settings(BaseSettings):
     auth_service_set_premium_user: str = os.getenv(
         "AUTH_SERVICE_SET_PREMIUM_HANDLER", "api/v1/premium/set-premium-status")
 
+    content_service_url: str = os.getenv(
+        "CONTENT_SERVICE_URL", "http://content_service:8080/")
+
+    content_service_film_purchase: str = os.getenv(
+        "CONTENT_SERVICE_FILM_PURCHASE_HANDLER", "movies/api/v1/entitlements/purchases")
+
+    content_service_timeout: float = os.getenv("CONTENT_SERVICE_TIMEOUT", 2.0)
+
+    # Token of requests to other services.
+    service_token: str = os.getenv("SERVICE_TOKEN", "")
+
     # Yookassa
     yookassa_shop_id: str = os.getenv("YOOKASSA_SHOP_ID", "shop_id")
     yookassa_secret_key: str = os.getenv("YOOKASSA_SECRET_KEY", "secret_key")
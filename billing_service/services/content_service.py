@@ -0,0 +1,62 @@
+import asyncio
+import json
+import logging
+import uuid
+from typing import Set
+
+import aiohttp
+
+from core.config import config
+
+# Reports in progress, references keep their tasks from being garbage collected.
+background_reports: Set[asyncio.Task] = set()
+
+
+class ContentService:
+    def __init__(self):
+        self.content_service_url = config.content_service_url
+        self.content_service_film_purchase = config.content_service_film_purchase
+
+    async def make_request_to_report_film_purchase(self, user_id: uuid, film_id: uuid):
+        """
+        Report succeeded film purchase to Content service, so it warms its cache of permissions.
+        Content service falls back to asking Billing service, so errors are only logged.
+        :param user_id:
+        :param film_id:
+        :return:
+        """
+        # Request parameters
+        body = {"user_id": str(user_id),
+                "film_id": str(film_id)}
+
+        try:
+            # Make async request to Content-service
+            async with aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=config.content_service_timeout)
+            ) as session:
+                async with session.post(
+                    url=self.content_service_url + self.content_service_film_purchase,
+                    data=json.dumps(body),
+                    headers={
+                        "Content-Type": "application/json",
+                        "X-Service-Token": config.service_token,
+                    },
+                ) as response:
+                    await response.json()
+
+        except Exception as e:
+            logging.warning(f"Error reporting film purchase to the content service: {e}")
+
+    def report_film_purchase_in_background(self, user_id: uuid, film_id: uuid) -> None:
+        """
+        Report film purchase without waiting for Content service,
+        so updating the status of order doesn't depend on it.
+        :param user_id:
+        :param film_id:
+        :return:
+        """
+        task = asyncio.create_task(
+            self.make_request_to_report_film_purchase(user_id, film_id)
+        )
+        background_reports.add(task)
+        task.add_done_callback(background_reports.discard)
@@ -5,6 +5,7 @@ from core.config import config
 from models.entity import OrderPurchasePremium, PremiumPurchaseManagement, OrderPurchaseFilm, FilmPurchaseManagement
 from schemas.entity import OrderPremium, OrderFilm
 from services.async_pg_repository import PostgresAsyncRepository
+from services.content_service import ContentService
 
 
 class OrderService:
@@ -137,6 +138,12 @@ class OrderService:
         # Update order in DB.
         updated_order = await self.db.update(order)
 
+        # Let content service cache the purchase, so the film is shown without asking billing.
+        if order_type == "film" and order_status == "Success":
+            ContentService().report_film_purchase_in_background(
+                updated_order.user_id, updated_order.film_id
+            )
+
         return updated_order
 
     async def check_whether_user_bought_film(self, user_id: str, film_id: str) -> bool:
@@ -0,0 +1,255 @@
+"""
+Benchmark of API endpoints without Elasticsearch and Redis.
+
+The app is driven in process through ASGI transport of httpx, search engine is replaced by
+MemoryAsyncSearchEngine and Redis by fakeredis, so the numbers show overhead of the service
+layer: routers, services, models, cache, rate limiter and middlewares.
+Every endpoint is measured with cache of responses disabled (cold) and enabled (warm).
+
+Install dev dependencies (fakeredis) and run from content_service directory:
+    python benchmarks/endpoints.py
+    python benchmarks/endpoints.py --requests 2000 --concurrency 20 --json report.json
+    python benchmarks/endpoints.py --max-p99-ms 50  # Exit with 1 if p99 of an endpoint is higher.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+# Rate limiter is measured, but it must not reject requests of benchmark.
+os.environ.setdefault("LIMIT_OF_REQUESTS_PER_MINUTE", "100000000")
+os.environ.setdefault("LIMIT_OF_REQUESTS_BURST", "100000000")
+
+import fakeredis  # noqa: E402
+import httpx  # noqa: E402
+from fastapi_cache import FastAPICache  # noqa: E402
+from fastapi_cache.backends.redis import RedisBackend  # noqa: E402
+from jose import jwt  # noqa: E402
+from prometheus_client import REGISTRY  # noqa: E402
+
+from core.config import config  # noqa: E402
+from core.main import app  # noqa: E402
+from db import redis  # noqa: E402
+from db.cache_backend import TwoTierCacheBackend, cache_key_builder  # noqa: E402
+from db.elastic_async_search_engine import get_search_engine  # noqa: E402
+from memory_async_search_engine import MemoryAsyncSearchEngine  # noqa: E402
+
+API = "/movies/api/v1"
+WORDS = ["star", "wars", "trek", "hope", "empire", "return", "night", "day", "last", "city"]
+ROLES = ("directors", "actors", "writers")
+# Endpoints which are never cached, the others must hit the cache in warm mode.
+UNCACHED_ENDPOINTS = {"films list by cursor", "films export"}
+
+
+def make_indices(films_count: int, persons_count: int, genres_count: int) -> Dict[str, List[dict]]:
+    """Generate documents of movies, persons and genres indices like ETL loads them."""
+    rnd = random.Random(42)
+    genres = [
+        {"id": str(uuid.UUID(int=rnd.getrandbits(128))),
+         "name": f"Genre {i}", "description": f"Description of genre {i}"}
+        for i in range(genres_count)
+    ]
+    persons: List[Dict[str, Any]] = [
+        {"id": str(uuid.UUID(int=rnd.getrandbits(128))),
+         "name": f"{rnd.choice(WORDS).title()} {rnd.choice(WORDS).title()}son", "films": []}
+        for _ in range(persons_count)
+    ]
+    films_of_persons: Dict[str, List[dict]] = {person["id"]: person["films"] for person in persons}
+    films = []
+    for _ in range(films_count):
+        film: Dict[str, Any] = {
+            "id": str(uuid.UUID(int=rnd.getrandbits(128))),
+            "title": " ".join(rnd.choice(WORDS) for _ in range(3)).title(),
+            "description": " ".join(rnd.choice(WORDS) for _ in range(20)),
+            "imdb_rating": round(rnd.uniform(1, 10), 1),
+            "premium": rnd.random() < 0.2,
+            "genres": [
+                {"id": genre["id"], "name": genre["name"]}
+                for genre in rnd.sample(genres, 2)
+            ],
+        }
+        for role in ROLES:
+            film[role] = [
+                {"id": person["id"], "name": person["name"]}
+                for person in rnd.sample(persons, 2)
+            ]
+            for person in film[role]:
+                films_of_persons[person["id"]].append(
+                    {"id": film["id"], "roles": [role[:-1]]})
+        films.append(film)
+    return {"movies": films, "persons": persons, "genres": genres}
+
+
+def make_requests(indices: Dict[str, List[dict]]) -> List[Tuple[str, str, str, Optional[dict]]]:
+    """Endpoints of benchmark: name, method, url and JSON body."""
+    film = indices["movies"][0]
+    genre = indices["genres"][0]
+    person = indices["persons"][0]
+    batch = [film["id"] for film in indices["movies"][:20]]
+    return [
+        ("films list", "GET", f"{API}/films/?page_size=50", None),
+        ("films list by cursor", "GET", f"{API}/films/?page_size=50&cursor=", None),
+        ("films list by genre", "GET", f"{API}/films/?genre={genre['id']}&sort=-imdb_rating", None),
+        ("films search", "GET", f"{API}/films/search?query=star wars", None),
+        ("films suggest", "GET", f"{API}/films/suggest?q=star w", None),
+        ("films facets", "GET", f"{API}/films/facets?query=star", None),
+        ("films export", "GET", f"{API}/films/export", None),
+        ("film details", "GET", f"{API}/films/{film['id']}", None),
+        ("films batch", "POST", f"{API}/films/batch", {"ids": batch}),
+        ("similar films", "GET", f"{API}/films/{film['id']}/similar", None),
+        ("genres list", "GET", f"{API}/genres/", None),
+        ("genre details", "GET", f"{API}/genres/{genre['id']}", None),
+        ("popular films of genre", "GET", f"{API}/genres/{genre['id']}/popular", None),
+        ("persons list", "GET", f"{API}/persons/", None),
+        ("persons search", "GET", f"{API}/persons/search?query={person['name']}", None),
+        ("persons suggest", "GET", f"{API}/persons/suggest?q={person['name'][:3]}", None),
+        ("person details", "GET", f"{API}/persons/{person['id']}", None),
+        ("films of person", "GET", f"{API}/persons/{person['id']}/film", None),
+    ]
+
+
+def make_token() -> str:
+    return jwt.encode(
+        {"sub": str(uuid.uuid4()), "is_premium": True, "exp": time.time() + 3600},
+        config.secret_key,
+        algorithm="HS256",
+    )
+
+
+def cache_hits() -> float:
+    """Number of hits of cache of responses in both tiers."""
+    return sum(
+        REGISTRY.get_sample_value(
+            "cache_requests_total", {"cache": "responses", "tier": tier, "result": "hit"}
+        ) or 0.0
+        for tier in ("l1", "l2")
+    )
+
+
+def percentile(latencies: List[float], q: int) -> float:
+    if len(latencies) == 1:
+        return latencies[0]
+    return statistics.quantiles(latencies, n=100, method="inclusive")[q - 1]
+
+
+async def measure(
+    client: httpx.AsyncClient,
+    method: str,
+    url: str,
+    body: Optional[dict],
+    requests: int,
+    concurrency: int,
+) -> dict:
+    """Send requests by concurrent workers, return throughput and latencies in ms."""
+    latencies: List[float] = []
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f"{method} {url}: {response.status_code} {response.text}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+async def run(args) -> List[dict]:
+    indices = make_indices(args.films, args.films // 2, 20)
+    search_engine = MemoryAsyncSearchEngine(indices)
+    app.dependency_overrides[get_search_engine] = lambda: search_engine
+    redis.redis = fakeredis.FakeAsyncRedis()
+    # Log of every request of the client would be measured too.
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Authorization": f"Bearer {make_token()}"}
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://benchmark", headers=headers
+    ) as client:
+        for mode in ("cold", "warm"):
+            await redis.redis.flushall()
+            # Init is ignored once the cache is initialized, so settings of the mode need a reset.
+            FastAPICache.reset()
+            FastAPICache.init(
+                TwoTierCacheBackend(
+                    RedisBackend(redis.redis),
+                    ttl=config.cache_l1_ttl,
+                    max_items=config.cache_l1_max_items,
+                    max_bytes=config.cache_l1_max_bytes,
+                ),
+                prefix="fastapi-cache",
+                key_builder=cache_key_builder,
+                enable=mode == "warm",
+            )
+            for name, method, url, body in make_requests(indices):
+                # Warm up caches of the app and pydantic.
+                await client.request(method, url, json=body)
+                hits_before = cache_hits()
+                result = await measure(
+                    client, method, url, body, args.requests, args.concurrency
+                )
+                hits = cache_hits() - hits_before
+                if mode == "warm" and name not in UNCACHED_ENDPOINTS and hits < args.requests:
+                    raise RuntimeError(
+                        f"{name}: {hits:.0f} cache hits of {args.requests} warm requests"
+                    )
+                result.update(endpoint=name, mode=mode, cache_hits=hits)
+                results.append(result)
+                print(
+                    f"{name:<24} {mode:<5} {result['rps']:9.0f} rps"
+                    f" {result['p50_ms']:8.2f} ms p50 {result['p99_ms']:8.2f} ms p99"
+                )
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=500,
+                        help="Number of requests to each endpoint in each mode")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--films", type=int, default=1000,
+                        help="Number of generated films")
+    parser.add_argument("--json", type=Path, help="Write results to JSON file")
+    parser.add_argument("--max-p99-ms", type=float,
+                        help="Fail if p99 latency of an endpoint is higher")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    if args.max_p99_ms is not None:
+        slow = [r for r in results if r["p99_ms"] > args.max_p99_ms]
+        for result in slow:
+            print(
+                f"p99 of {result['endpoint']} ({result['mode']}) is "
+                f"{result['p99_ms']:.2f} ms, more than {args.max_p99_ms} ms"
+            )
+        return 1 if slow else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,415 @@
+import re
+import uuid
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from db.async_search_engine import AsyncSearchEngine, InvalidQueryError, SearchPage
+from utils.raw_json import dump_documents
+
+# Sub-fields of mappings which are searched as their parent field.
+SUB_FIELDS = re.compile(r"\.(raw|suggest)(\._\dgram)?$")
+
+
+def _tokens(text: Any) -> List[str]:
+    return re.findall(r"\w+", str(text).lower()) if text is not None else []
+
+
+def _values(doc: Any, field: str) -> List[Any]:
+    """Values of dotted field in document, lists of objects are flattened."""
+    values = [doc]
+    for part in field.split("."):
+        next_values = []
+        for value in values:
+            if isinstance(value, list):
+                value_items = value
+            else:
+                value_items = [value]
+            for item in value_items:
+                if isinstance(item, dict) and part in item:
+                    next_values.append(item[part])
+        values = next_values
+    flat_values = []
+    for value in values:
+        if isinstance(value, list):
+            flat_values.extend(value)
+        else:
+            flat_values.append(value)
+    return flat_values
+
+
+def _filter_source(doc: dict, includes: Optional[List[str]]) -> dict:
+    """Keep only included dotted fields of document, like _source filtering of ES."""
+    if not includes:
+        return doc
+    result: dict = {}
+    for field in includes:
+        _copy_field(doc, result, field.split("."))
+    return result
+
+
+def _copy_field(source: Any, target: dict, parts: List[str]) -> None:
+    head, rest = parts[0], parts[1:]
+    if not isinstance(source, dict) or head not in source:
+        return
+    value = source[head]
+    if not rest:
+        target[head] = value
+    elif isinstance(value, list):
+        items = target.setdefault(head, [{} for _ in value])
+        for item, item_target in zip(value, items):
+            _copy_field(item, item_target, rest)
+    elif isinstance(value, dict):
+        _copy_field(value, target.setdefault(head, {}), rest)
+
+
+def _as_list(clauses: Any) -> List[dict]:
+    if clauses is None:
+        return []
+    return clauses if isinstance(clauses, list) else [clauses]
+
+
+def _score(query: dict, doc: dict) -> Optional[float]:
+    """Score of document for query or None if the document doesn't match."""
+    (kind, params), = query.items()
+
+    if kind == "match_all":
+        return 1.0
+
+    if kind == "term":
+        (field, value), = params.items()
+        if isinstance(value, dict):
+            value = value["value"]
+        return 1.0 if value in _values(doc, field) else None
+
+    if kind == "terms":
+        (field, values), = params.items()
+        return 1.0 if set(values) & set(_values(doc, field)) else None
+
+    if kind == "match":
+        (field, text), = params.items()
+        if isinstance(text, dict):
+            text = text["query"]
+        doc_tokens: Set[str] = set()
+        for value in _values(doc, SUB_FIELDS.sub("", field)):
+            doc_tokens.update(_tokens(value))
+        matched = sum(1 for token in _tokens(text) if token in doc_tokens)
+        return float(matched) if matched else None
+
+    if kind == "multi_match":
+        # Only bool_prefix is used: all words must match, the last one as a prefix.
+        query_tokens = _tokens(params["query"])
+        best_score: Optional[float] = None
+        for field in {SUB_FIELDS.sub("", field) for field in params["fields"]}:
+            field_tokens: List[str] = []
+            for value in _values(doc, field):
+                field_tokens.extend(_tokens(value))
+            if not query_tokens or not field_tokens:
+                continue
+            *words, prefix = query_tokens
+            if all(word in field_tokens for word in words) and any(
+                token.startswith(prefix) for token in field_tokens
+            ):
+                best_score = max(best_score or 0.0, float(len(query_tokens)))
+        return best_score
+
+    if kind == "nested":
+        path = params["path"]
+        scores = [
+            score for score in (
+                _score(params["query"], {path: item}) for item in _values(doc, path)
+            )
+            if score is not None
+        ]
+        return max(scores) if scores else None
+
+    if kind == "bool":
+        score = 0.0
+        for clause in _as_list(params.get("must")):
+            clause_score = _score(clause, doc)
+            if clause_score is None:
+                return None
+            score += clause_score
+        for clause in _as_list(params.get("filter")):
+            if _score(clause, doc) is None:
+                return None
+        for clause in _as_list(params.get("must_not")):
+            if _score(clause, doc) is not None:
+                return None
+        should = _as_list(params.get("should"))
+        should_scores = [
+            s for s in (_score(clause, doc) for clause in should) if s is not None
+        ]
+        has_required = params.get("must") or params.get("filter")
+        if should and not should_scores and not has_required:
+            return None
+        return score + sum(should_scores) or 1.0
+
+    raise ValueError(f"Query {kind} is not supported by in-memory search engine.")
+
+
+def _sort_spec(sort: List[Any]) -> List[Tuple[str, str]]:
+    spec = []
+    for item in sort:
+        if isinstance(item, str):
+            spec.append((item, "desc" if item == "_score" else "asc"))
+        else:
+            (field, order), = item.items()
+            if isinstance(order, dict):
+                order = order.get("order", "asc")
+            spec.append((field, order))
+    return spec
+
+
+class _Reverse:
+    """Wrapper reversing order of value, for descending sort of any type."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class MemoryAsyncSearchEngine(AsyncSearchEngine):
+    """
+    Search engine keeping documents in memory, for benchmarks and tests without Elasticsearch.
+    Supports the queries and aggregations which services make: match_all, term, terms, match,
+    bool_prefix multi_match, nested and bool queries, sort, from/size, search_after,
+    points in time, terms, histogram, filters and top_hits aggregations.
+    """
+
+    def __init__(self, indices: Dict[str, List[dict]]):
+        # index -> id -> document
+        self.indices: Dict[str, Dict[str, dict]] = {
+            index: {doc["id"]: doc for doc in docs} for index, docs in indices.items()
+        }
+        # point in time id -> (index, snapshot of documents)
+        self.points_in_time: Dict[str, Tuple[str, List[dict]]] = {}
+
+    def _search(
+        self, docs: List[dict], query_body: dict
+    ) -> Tuple[List[Tuple[dict, list]], int]:
+        """Find, sort and page documents, return documents with sort values and total."""
+        query = query_body.get("query", {"match_all": {}})
+        hits = []
+        for position, doc in enumerate(docs):
+            score = _score(query, doc)
+            if score is not None:
+                hits.append((doc, score, position))
+
+        spec = _sort_spec(query_body.get("sort", ["_score"]))
+
+        def sort_values(hit) -> list:
+            doc, score, position = hit
+            values = []
+            for field, _ in spec:
+                if field == "_score":
+                    values.append(score)
+                elif field == "_shard_doc":
+                    values.append(position)
+                else:
+                    field_values = _values(doc, SUB_FIELDS.sub("", field))
+                    values.append(field_values[0] if field_values else None)
+            return values
+
+        def sort_key(hit) -> tuple:
+            key: List[Any] = []
+            for (_, order), value in zip(spec, sort_values(hit)):
+                # Missing values are the last in both orders.
+                key.append(value is None)
+                if value is not None:
+                    key.append(_Reverse(value) if order == "desc" else value)
+                else:
+                    key.append(0)
+            return tuple(key)
+
+        hits.sort(key=sort_key)
+        sorted_hits = [(doc, sort_values((doc, score, position)))
+                       for doc, score, position in hits]
+
+        start = query_body.get("from", 0)
+        search_after = query_body.get("search_after")
+        if search_after is not None:
+            if len(search_after) != len(spec):
+                raise InvalidQueryError("search_after doesn't match sort.")
+            start = next(
+                (i + 1 for i, (_, values) in enumerate(sorted_hits)
+                 if values == search_after),
+                len(sorted_hits),
+            )
+        size = query_body.get("size", 10)
+        return sorted_hits[start: start + size], len(sorted_hits)
+
+    def _aggregate(self, aggs: dict, docs: List[dict]) -> dict:
+        results = {}
+        for name, agg in aggs.items():
+            sub_aggs = agg.get("aggs", {})
+            result: Dict[str, Any]
+            if "nested" in agg:
+                path = agg["nested"]["path"]
+                nested_docs = [
+                    {path: item} for doc in docs for item in _values(doc, path)]
+                result = {"doc_count": len(nested_docs)}
+                result.update(self._aggregate(sub_aggs, nested_docs))
+            elif "terms" in agg:
+                field = agg["terms"]["field"]
+                groups: Dict[Any, List[dict]] = {}
+                for doc in docs:
+                    for value in set(_values(doc, field)):
+                        groups.setdefault(value, []).append(doc)
+                buckets = sorted(groups.items(), key=lambda group: (-len(group[1]), group[0]))
+                result = {
+                    "buckets": [
+                        {"key": key, "doc_count": len(group_docs),
+                         **self._aggregate(sub_aggs, group_docs)}
+                        for key, group_docs in buckets[: agg["terms"].get("size", 10)]
+                    ]
+                }
+            elif "histogram" in agg:
+                params = agg["histogram"]
+                interval = params["interval"]
+                counts: Dict[float, int] = {}
+                for doc in docs:
+                    for value in _values(doc, params["field"]):
+                        key = (value // interval) * interval
+                        counts[key] = counts.get(key, 0) + 1
+                bounds = params.get("extended_bounds")
+                if counts or bounds:
+                    keys = list(counts) + (
+                        [bounds["min"], bounds["max"]] if bounds else [])
+                    key = (min(keys) // interval) * interval
+                    while key <= max(keys):
+                        counts.setdefault(key, 0)
+                        key += interval
+                result = {
+                    "buckets": [
+                        {"key": float(key), "doc_count": count}
+                        for key, count in sorted(counts.items())
+                        if count >= params.get("min_doc_count", 0)
+                    ]
+                }
+            elif "filters" in agg:
+                result = {
+                    "buckets": {
+                        bucket: {
+                            "doc_count": sum(
+                                1 for doc in docs if _score(query, doc) is not None)
+                        }
+                        for bucket, query in agg["filters"]["filters"].items()
+                    }
+                }
+            elif "top_hits" in agg:
+                params = agg["top_hits"]
+                hits = []
+                for doc in docs[: params.get("size", 3)]:
+                    # Documents of nested aggregation are the nested objects.
+                    if len(doc) == 1:
+                        (path, item), = doc.items()
+                        includes = [
+                            field[len(path) + 1:] for field in params.get("_source", [])
+                        ]
+                        hits.append({"_source": _filter_source(item, includes)})
+                    else:
+                        hits.append(
+                            {"_source": _filter_source(doc, params.get("_source"))})
+                result = {"hits": {"hits": hits}}
+            else:
+                raise ValueError(
+                    f"Aggregation {name} is not supported by in-memory search engine."
+                )
+            results[name] = result
+        return results
+
+    async def get_by_id(
+        self,
+        index: str,
+        _id: str,
+        source_includes: Optional[List[str]] = None,
+        source_excludes: Optional[List[str]] = None,
+    ) -> Any | None:
+        doc = self.indices.get(index, {}).get(_id)
+        if doc is None:
+            return None
+        doc = _filter_source(doc, source_includes)
+        if source_excludes:
+            doc = {k: v for k, v in doc.items() if k not in source_excludes}
+        return doc
+
+    async def get_many(
+        self,
+        index: str,
+        ids: List[str],
+        source_includes: Optional[List[str]] = None,
+    ) -> List[Any]:
+        docs = self.indices.get(index, {})
+        return [
+            _filter_source(docs[_id], source_includes) for _id in ids if _id in docs
+        ]
+
+    async def search_by_query(
+        self,
+        index: str,
+        query_body: dict,
+        source_includes: Optional[List[str]] = None,
+        source_excludes: Optional[List[str]] = None,
+    ) -> Optional[List[Any]]:
+        if index not in self.indices:
+            return None
+        hits, _ = self._search(list(self.indices[index].values()), query_body)
+        includes = source_includes or query_body.get("_source")
+        return [_filter_source(doc, includes) for doc, _ in hits]
+
+    async def search_by_query_raw(
+        self, index: str, query_body: dict, fields: Dict[str, str]
+    ) -> Optional[bytes]:
+        hits = await self.search_by_query(
+            index, query_body, source_includes=list(fields.values())
+        )
+        if not hits:
+            return None
+        return dump_documents(hits, fields)
+
+    async def aggregate(self, index: str, query_body: dict) -> Optional[dict]:
+        if index not in self.indices:
+            return None
+        hits, total = self._search(
+            list(self.indices[index].values()),
+            {**query_body, "size": len(self.indices[index])},
+        )
+        return {
+            **self._aggregate(query_body.get("aggs", {}), [doc for doc, _ in hits]),
+            "total": total,
+        }
+
+    async def multi_search(
+        self, index: str, query_bodies: List[dict]
+    ) -> Optional[List[List[Any]]]:
+        return [
+            await self.search_by_query(index, query_body) or []
+            for query_body in query_bodies
+        ]
+
+    async def open_point_in_time(self, index: str, keep_alive: str) -> str:
+        pit_id = str(uuid.uuid4())
+        self.points_in_time[pit_id] = (
+            index, list(self.indices.get(index, {}).values()))
+        return pit_id
+
+    async def close_point_in_time(self, pit_id: str) -> None:
+        self.points_in_time.pop(pit_id, None)
+
+    async def search_by_point_in_time(self, query_body: dict) -> Optional[SearchPage]:
+        pit_id = query_body["pit"]["id"]
+        if pit_id not in self.points_in_time:
+            return None
+        _, docs = self.points_in_time[pit_id]
+        hits, total = self._search(docs, query_body)
+        return SearchPage(
+            hits=[_filter_source(doc, query_body.get("_source"))
+                  for doc, _ in hits],
+            pit_id=pit_id,
+            search_after=hits[-1][1] if hits else None,
+            total=total if query_body.get("track_total_hits", True) else None,
+        )
@@ -0,0 +1,108 @@
+"""
+Benchmark of list responses: pydantic models against raw JSON of ES documents.
+
+Run from content_service directory:
+    python benchmarks/raw_responses.py
+"""
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from fastapi.responses import ORJSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from db.cache_backend import RawJsonCoder  # noqa: E402
+from models.film import FilmListInput, FilmListOutput  # noqa: E402
+from services.film import FILM_LIST_OUTPUT_FIELDS  # noqa: E402
+from utils.raw_json import dump_documents, raw_json_response  # noqa: E402
+
+ROUNDS = 2000
+PAGE_SIZES = (10, 50, 100)
+
+
+def make_hits(page_size: int) -> List[dict]:
+    return [
+        {"id": str(uuid.uuid4()), "title": f"Star Wars {i}", "imdb_rating": 7.5}
+        for i in range(page_size)
+    ]
+
+
+async def models_path(hits: List[dict], response_field) -> bytes:
+    """ES documents -> FilmListInput -> FilmListOutput -> response_model -> ORJSONResponse."""
+    films = [FilmListInput(**item) for item in hits]
+    content = [
+        FilmListOutput(uuid=film.uuid, title=film.title,
+                       imdb_rating=film.imdb_rating)
+        for film in films
+    ]
+    content = await serialize_response(
+        field=response_field, response_content=content, is_coroutine=True
+    )
+    return ORJSONResponse(content).body
+
+
+async def raw_path(hits: List[dict]) -> bytes:
+    """ES documents -> JSON."""
+    return raw_json_response(dump_documents(hits, FILM_LIST_OUTPUT_FIELDS)).body
+
+
+async def models_cache_hit(cached: bytes, response_field) -> bytes:
+    content = RawJsonCoder.decode_as_type(cached, type_=List[FilmListOutput])
+    content = await serialize_response(
+        field=response_field, response_content=content, is_coroutine=True
+    )
+    return ORJSONResponse(content).body
+
+
+async def raw_cache_hit(cached: bytes) -> bytes:
+    return RawJsonCoder.decode_as_type(cached, type_=List[FilmListOutput]).body
+
+
+async def measure(name: str, func, *args) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        await func(*args)
+    elapsed = time.perf_counter() - start
+    per_call = elapsed / ROUNDS * 1_000_000
+    print(f"  {name:<20} {per_call:10.1f} us/response")
+    return per_call
+
+
+async def main():
+    response_field = create_response_field(
+        name="Response", type_=List[FilmListOutput])
+    for page_size in PAGE_SIZES:
+        hits = make_hits(page_size)
+        # Both paths must produce the same body.
+        assert await models_path(hits, response_field) == await raw_path(hits)
+
+        print(f"page_size={page_size}")
+        models = await measure("models", models_path, hits, response_field)
+        raw = await measure("raw", raw_path, hits)
+        print(f"  speedup {models / raw:.1f}x")
+
+        models_cached = RawJsonCoder.encode(
+            [
+                FilmListOutput(uuid=film.uuid, title=film.title,
+                               imdb_rating=film.imdb_rating)
+                for film in (FilmListInput(**item) for item in hits)
+            ]
+        )
+        raw_cached = RawJsonCoder.encode(
+            raw_json_response(dump_documents(hits, FILM_LIST_OUTPUT_FIELDS))
+        )
+        models_hit = await measure(
+            "models cache hit", models_cache_hit, models_cached, response_field
+        )
+        raw_hit = await measure("raw cache hit", raw_cache_hit, raw_cached)
+        print(f"  speedup {models_hit / raw_hit:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,47 @@
+import json
+import logging
+
+from redis import Redis
+
+from backoff import backoff
+
+
+class ChangesPublisher:
+    """Publishes ids of loaded documents, so content service can evict its cache."""
+
+    # Approximate number of events kept in the stream.
+    stream_max_len = 10000
+    ids_per_event = 1000
+
+    def __init__(self, redis_adapter: Redis, stream_name: str):
+        self.redis_adapter = redis_adapter
+        self.stream_name = stream_name
+
+    @backoff(limit_of_retries=10)
+    def publish(self, index_name: str, ids: list) -> None:
+        """
+        Add events with changed ids of the index to the stream.
+        :param index_name: The name of index.
+        :param ids: IDs of changed documents.
+        :return: None
+        """
+        if not ids:
+            return
+        # Long lists are split, so one event stays small.
+        for start in range(0, len(ids), self.ids_per_event):
+            self.redis_adapter.xadd(
+                self.stream_name,
+                {"index": index_name, "ids": json.dumps(ids[start: start + self.ids_per_event])},
+                maxlen=self.stream_max_len,
+                approximate=True,
+            )
+        logging.info(f"Changes of {len(ids)} documents of {index_name} were published.")
+
+    def publish_loaded(self, index_name: str, data: list) -> None:
+        """
+        Publish ids of loaded documents.
+        :param index_name: The name of index.
+        :param data: Documents loaded to Elasticsearch.
+        :return: None
+        """
+        self.publish(index_name, [document["_id"] for document in data])
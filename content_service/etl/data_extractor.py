@@ -1,57 +1,187 @@
 import logging
+from typing import Any, Dict, Optional, Tuple
 
 import psycopg
 from psycopg import ClientCursor
 from psycopg.rows import dict_row
 
 from backoff import backoff
-from queries import generate_filmwork_query, generate_person_query, generate_genre_query
+from queries import (
+    generate_filmwork_query,
+    generate_filmwork_by_ids_query,
+    generate_films_ids_query,
+    generate_person_query,
+    generate_genre_query,
+    generate_person_by_ids_query,
+)
+from state.etl_state import INITIAL_CHECKPOINT
+
+# Tables linking entries of tables with films and columns of entry IDs in them.
+FILM_LINKS = {
+    "person": ("person_film_work", "person_id"),
+    "genre": ("genre_film_work", "genre_id"),
+}
+# Less than any UUID, the first page of films IDs starts after it.
+MIN_UUID = "00000000-0000-0000-0000-000000000000"
+
+# Connection returning rows as dicts.
+DictConnection = psycopg.Connection[Dict[str, Any]]
 
 
 class DataExtractor:
+    # Number of times streaming is resumed after lost connection.
+    limit_of_retries = 10
+
     def __init__(self, table_name: str, database_params: dict, batch_size: int):
         self.table_name = table_name
         self.database_params = database_params
         self.batch_size = batch_size
-        self.last_modified = "1970-01-01 00:00:00"  # Initial value for last modified
+        # Modified time and ID of the last extracted entry.
+        self.last_modified, self.last_id = INITIAL_CHECKPOINT
+        # Connections are kept between batches and runs of ETL. Streaming holds a transaction
+        # open, so lookups by IDs made while batches are streamed use their own connection.
+        self._connections: Dict[str, DictConnection] = {}
 
-    def extract(self):
-        data, size_of_current_batch, self.last_modified = self.extract_data_from_db(
-            self.last_modified
-        )
-        return data
+    @property
+    def checkpoint(self) -> Tuple[str, str]:
+        return self.last_modified, self.last_id
+
+    def set_checkpoint(self, last_modified: str, last_id: str) -> None:
+        self.last_modified, self.last_id = last_modified, last_id
 
     @backoff(limit_of_retries=10)
-    def extract_data_from_db(self, last_modified: str) -> (list, int, str):
+    def connection(self, purpose: str = "lookup") -> DictConnection:
+        """
+        Method returns the connection of the extractor, a lost connection is reopened.
+        :param purpose: "stream" or "lookup".
+        :return: Connection to postgres DB.
         """
-        Method extracts data from postgres DB.
-        :param last_modified: Last modified of data.
-        :return: List of data, size of current batch, modified datetime of last entry.
+        connection = self._connections.get(purpose)
+        if connection is None or connection.closed:
+            connection = self._connections[purpose] = psycopg.connect(
+                **self.database_params,
+                row_factory=dict_row,
+                cursor_factory=ClientCursor,
+                autocommit=True,
+            )
+        return connection
+
+    def close(self, purpose: Optional[str] = None) -> None:
+        """
+        Method closes the connection with the purpose or all connections.
+        :param purpose: "stream", "lookup" or None.
+        :return: None
         """
-        with psycopg.connect(
-            **self.database_params, row_factory=dict_row, cursor_factory=ClientCursor
-        ) as conn, conn.cursor() as cursor:
+        purposes = [purpose] if purpose else list(self._connections)
+        for purpose in purposes:
+            connection = self._connections.pop(purpose, None)
+            if connection is not None:
+                connection.close()
+
+    def generate_query(self, last_modified: str, last_id: str) -> str:
+        if self.table_name == "film_work":
+            return generate_filmwork_query(last_modified, last_id)
+        if self.table_name == "person":
+            return generate_person_query(last_modified, last_id)
+        if self.table_name == "genre":
+            return generate_genre_query(last_modified, last_id)
+        raise ValueError(f"Extracting of {self.table_name} isn't supported.")
 
-            if self.table_name == "film_work":
-                cursor.execute(generate_filmwork_query(
-                    last_modified, self.batch_size))
+    def stream(self):
+        """
+        Generator of batches of entries changed after the checkpoint.
+        Entries are read by one query from a server-side cursor, so the query is planned once
+        and only one batch is kept in memory. If the connection is lost, the query is
+        repeated from the checkpoint of the last yielded batch.
+        :return: Generator of lists of data.
+        """
+        retries = 0
+        while True:
+            try:
+                for data in self.stream_from_checkpoint():
+                    retries = 0
+                    yield data
+                return
+            except psycopg.OperationalError as e:
+                retries += 1
+                if retries > self.limit_of_retries:
+                    logging.critical(msg=f"The number of reconnections exceeded. {e}")
+                    raise
+                logging.error(msg=f"Database error. {e}")
+                self.close("stream")
 
-            elif self.table_name == "person":
-                cursor.execute(generate_person_query(
-                    last_modified, self.batch_size))
+    def stream_from_checkpoint(self):
+        """
+        Generator of batches of entries after the checkpoint, the checkpoint moves
+        to the last entry of every yielded batch.
+        Entries are ordered by (modified, id), so entries with the same modified time
+        are not skipped when they are split between batches.
+        :return: Generator of lists of data.
+        """
+        connection = self.connection("stream")
+        # Server-side cursors live inside a transaction.
+        with connection.transaction(), connection.cursor(
+            name=f"etl_{self.table_name}"
+        ) as cursor:
+            cursor.itersize = self.batch_size
+            cursor.execute(self.generate_query(*self.checkpoint))
+            while data := cursor.fetchmany(self.batch_size):
+                self.set_checkpoint(str(data[-1]["modified"]), str(data[-1]["id"]))
+                yield data
+        logging.info(f"There is no new data of {self.table_name} to extract.")
 
-            elif self.table_name == "genre":
-                cursor.execute(generate_genre_query(
-                    last_modified, self.batch_size))
+    @backoff(limit_of_retries=10)
+    def extract_by_ids(self, ids: list) -> list:
+        """
+        Method extracts entries with the IDs from postgres DB.
+        :param ids: IDs of entries.
+        :return: List of data.
+        """
+        if not ids:
+            return []
 
-            executed_data = cursor.fetchall()
-            size_of_current_batch = len(executed_data)
+        if self.table_name == "person":
+            query = generate_person_by_ids_query()
+        elif self.table_name == "film_work":
+            query = generate_filmwork_by_ids_query()
+        else:
+            raise ValueError(
+                f"Extracting by IDs isn't supported for {self.table_name}.")
 
-            # Get modified date of the last entry in the batch.
-            if size_of_current_batch == 0:
-                logging.info("There is no new data to extract.")
-                return [], 0, last_modified
+        with self.connection().cursor() as cursor:
+            cursor.execute(query, (list(ids),))
+            return cursor.fetchall()
 
-            last_modified = str(executed_data[-1]["modified"])
+    @backoff(limit_of_retries=10)
+    def extract_films_ids(self, ids: list, after_film_id: str) -> list:
+        """
+        Method extracts a page of IDs of films linked with entries.
+        :param ids: IDs of entries.
+        :param after_film_id: The last film ID of the previous page.
+        :return: Sorted IDs of films, at most batch size of them.
+        """
+        link_table, link_column = FILM_LINKS[self.table_name]
+        with self.connection().cursor() as cursor:
+            cursor.execute(
+                generate_films_ids_query(link_table, link_column),
+                (list(ids), after_film_id, self.batch_size),
+            )
+            return [str(row["film_work_id"]) for row in cursor.fetchall()]
 
-            return executed_data, size_of_current_batch, last_modified
+    def iter_films_ids(self, ids: list):
+        """
+        Generator of IDs of films linked with entries, in pages of batch size,
+        so a person with thousands of films is processed in several batches.
+        :param ids: IDs of entries.
+        :return: Generator of lists of films IDs.
+        """
+        if not ids:
+            return
+        after_film_id = MIN_UUID
+        while True:
+            films_ids = self.extract_films_ids(ids, after_film_id)
+            if films_ids:
+                yield films_ids
+            if len(films_ids) < self.batch_size:
+                return
+            after_film_id = films_ids[-1]
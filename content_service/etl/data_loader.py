@@ -1,32 +1,191 @@
 import logging
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Tuple
 
 from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
-
-from backoff import backoff
+from elasticsearch.exceptions import TransportError
+from elasticsearch.helpers import BulkIndexError, expand_action, parallel_bulk
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+# Statuses of items which may succeed if they are sent again.
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def expand_serialized_action(action: Any) -> Tuple[dict, bytes]:
+    """
+    Expand action of bulk helpers which is already split by DataLoader.serialize.
+    :param action: Header and serialized body.
+    :return: Header and serialized body.
+    """
+    header, body = action
+    return header, body
+
 
 class DataLoader:
-    def __init__(self, elasticsearch_host: str, index_name: str):
+    # Retries of failed items with exponential delay, like in backoff decorator.
+    limit_of_retries = 10
+    start_sleep_time = 0.1
+    border_sleep_time = 10.0
+
+    def __init__(
+        self,
+        elasticsearch_host: str,
+        index_name: str,
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 10 * 1024 * 1024,
+        thread_count: int = 2,
+    ):
         self.elasticsearch_host = elasticsearch_host
         self.index_name = index_name
+        # Chunk is sent when it reaches either number of documents or size in bytes.
+        self.chunk_size = chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.thread_count = thread_count
+        # Client is kept between batches, so connections are reused.
+        self.client = Elasticsearch(hosts=elasticsearch_host)
+        self._stats_lock = threading.Lock()
+        self._loaded_docs = 0
+        self._loaded_bytes = 0
+
+    def stats(self) -> Tuple[int, int]:
+        """
+        Numbers of documents and bytes loaded since the loader was created.
+        :return: Documents, bytes.
+        """
+        with self._stats_lock:
+            return self._loaded_docs, self._loaded_bytes
+
+    def serialize(self, action: dict) -> Tuple[dict, bytes]:
+        """
+        Split action to header and body serialized once, so retries and stats reuse it.
+        :param action: Action of bulk helpers.
+        :return: Header and body of action.
+        """
+        header, body = expand_action(action)
+        return header, self.client.transport.serializers.dumps(
+            body, mimetype="application/json"
+        )
+
+    def get_documents(self, ids: list, source_includes: list) -> list:
+        """
+        Get indexed documents with the IDs, missing documents are skipped.
+        :param ids: IDs of documents.
+        :param source_includes: Fields of sources.
+        :return: Documents with _id and _source.
+        """
+        if not ids:
+            return []
+        response = self.client.mget(
+            index=self.index_name, ids=ids, source_includes=source_includes
+        )
+        return [document for document in response["docs"] if document.get("found")]
 
-    @backoff(limit_of_retries=10)
     def load(self, data: list):
         """
         Function for loading data to Elasticsearch.
+        Chunks are sent by several threads, only failed documents are sent again.
         :param data: List with prepared data for inserting to Elasticsearch.
         :return: Result of loading to ES.
         """
-        client = Elasticsearch(hosts=self.elasticsearch_host)
-        success, _ = bulk(
-            client, data
-        )  # `success` is the number of successfully indexed documents
+        # Actions are keyed by position, so actions of one document in a batch are all sent.
+        pending: Dict[int, Tuple[dict, bytes]] = {
+            position: self.serialize(action) for position, action in enumerate(data)
+        }
+        size = {position: len(body) for position, (_, body) in pending.items()}
+        success = 0
+        retries = 0
+        delay = self.start_sleep_time
+        while True:
+            failed, failed_items, errors = self.send(pending)
+            loaded = pending.keys() - failed.keys() - {position for position, _ in errors}
+            success += len(loaded)
+            with self._stats_lock:
+                self._loaded_docs += len(loaded)
+                self._loaded_bytes += sum(size[position] for position in loaded)
+            if errors:
+                logging.error(
+                    f"Documents failed to index into {self.index_name}: {errors[:3]}"
+                )
+                raise BulkIndexError(
+                    f"{len(errors)} document(s) failed to index.",
+                    [item for _, item in errors],
+                )
+            if not failed:
+                break
+            retries += 1
+            if retries > self.limit_of_retries:
+                logging.critical(
+                    msg=f"The number of retries of {len(failed)} documents exceeded."
+                )
+                raise BulkIndexError(
+                    f"{len(failed)} document(s) failed to index.", failed_items
+                )
+            logging.error(
+                f"{len(failed)} documents failed to index into {self.index_name}, "
+                f"they are sent again in {delay:.2f}s."
+            )
+            time.sleep(delay)
+            computed_delay = min(
+                self.start_sleep_time * (2 ** retries), self.border_sleep_time
+            )
+            delay = computed_delay / 2 + random.uniform(0, computed_delay / 2)
+            pending = failed
         logging.info(
             f"Successfully indexed {success} records into index {self.index_name}"
         )
         return success
+
+    def send(
+        self, pending: Dict[int, Tuple[dict, bytes]]
+    ) -> Tuple[dict, List[dict], list]:
+        """
+        Send actions once.
+        Results of bulk helpers are in the order of actions, so they are matched by position.
+        :param pending: Serialized actions by positions in the batch.
+        :return: Actions which may succeed on retry, their items
+            and (position, item) of errors which won't.
+        """
+        positions = list(pending)
+        # Bulk helpers take actions of any type if they are expanded by the callback.
+        actions: Iterable[Any] = pending.values()
+        acknowledged = set()
+        failed = {}
+        failed_items = []
+        errors = []
+        try:
+            for position, (ok, item) in zip(
+                positions,
+                parallel_bulk(
+                    self.client,
+                    actions,
+                    thread_count=self.thread_count,
+                    chunk_size=self.chunk_size,
+                    max_chunk_bytes=self.max_chunk_bytes,
+                    expand_action_callback=expand_serialized_action,
+                    raise_on_error=False,
+                    raise_on_exception=False,
+                ),
+            ):
+                acknowledged.add(position)
+                if ok:
+                    continue
+                _, info = item.copy().popitem()
+                if info.get("status") in RETRYABLE_STATUSES:
+                    failed[position] = pending[position]
+                    failed_items.append(item)
+                else:
+                    errors.append((position, item))
+        except TransportError as e:
+            # Connection is lost, documents without response are sent again.
+            logging.error(msg=f"ElasticSearch error. {e}")
+            for position, (header, _) in pending.items():
+                if position not in acknowledged:
+                    failed[position] = pending[position]
+                    op_type, info = header.copy().popitem()
+                    failed_items.append({op_type: {**info, "error": str(e)}})
+        return failed, failed_items, errors
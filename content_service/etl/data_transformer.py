@@ -1,5 +1,5 @@
 from backoff import backoff
-from models import Film, PersonData, GenreData
+from models import Film, PersonWithFilms, GenreData
 
 
 class DataTransformer:
@@ -50,9 +50,10 @@ class DataTransformer:
                     {
                         "_index": index_name,
                         "_id": str(entry["id"]),
-                        "_source": PersonData(
+                        "_source": PersonWithFilms(
                             id=str(entry["id"]),
                             name=entry["name"],
+                            films=entry["films"],
                         ).dict(),
                     }
                     for entry in data_from_db
@@ -1,7 +1,20 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from typing import Optional, Tuple
+
+from changes_publisher import ChangesPublisher
 from data_extractor import DataExtractor
 from data_loader import DataLoader
 from data_transformer import DataTransformer
 from index_manager import IndexManager
+from pipeline import ordered_map, prefetch
+from similar_films import SimilarFilmsBuilder
+from state.etl_state import INITIAL_CHECKPOINT, StateETL
+
+# Fields of films with their persons.
+PERSON_ROLES = ("actors", "directors", "writers")
 
 
 class ETL:
@@ -11,25 +24,161 @@ class ETL:
         extractor: DataExtractor,
         transformer: DataTransformer,
         loader: DataLoader,
-        etl_state: dict,
+        changes_publisher: ChangesPublisher,
+        etl_state: StateETL,
         batch_size: int,
         index_name: str,
+        similar_films_builder: Optional[SimilarFilmsBuilder] = None,
+        persons_etl: Optional["ETL"] = None,
+        movies_etl: Optional["ETL"] = None,
+        queue_size: int = 4,
+        workers: int = 2,
     ):
         self.index_manager = index_manager
         self.extractor = extractor
         self.transformer = transformer
         self.loader = loader
+        self.changes_publisher = changes_publisher
         self.etl_state = etl_state
         self.batch_size = batch_size
         self.index_name = index_name
+        self.similar_films_builder = similar_films_builder
+        # Persons contain their films, so persons of changed films are reloaded.
+        self.persons_etl = persons_etl
+        # Films contain names of persons and genres, so films of loaded entries are reloaded.
+        self.movies_etl = movies_etl
+        # Number of extracted batches waiting for transforming.
+        self.queue_size = queue_size
+        # Number of batches transformed and loaded at once.
+        self.workers = workers
+        # The first run loads everything, documents linked with it are loaded by their own runs.
+        self.full_run = False
+        # Continue from the last loaded entry of the previous process.
+        self.extractor.set_checkpoint(
+            *self.etl_state.get_checkpoint(self.extractor.table_name))
 
-    def run_etl(self):
+    def run_etl(self) -> int:
+        """
+        Load documents changed since the previous run.
+        Batches are extracted in a separate thread and transformed and loaded by workers,
+        while loaded batches are post-processed in their order and checkpointed.
+        :return: Number of loaded documents.
+        """
         self.index_manager.create_index_if_doesnt_exist()
-        size_of_current_batch = self.batch_size
-
-        while size_of_current_batch == self.batch_size:
-            data = self.extractor.extract()
-            transformed_data = self.transformer.transform(
-                self.index_name, data)
-            self.loader.load(transformed_data)
-            size_of_current_batch = len(data)
+        if self.persons_etl:
+            self.persons_etl.index_manager.create_index_if_doesnt_exist()
+        loaded = 0
+        self.full_run = self.extractor.checkpoint == INITIAL_CHECKPOINT
+        start = time.perf_counter()
+        loaded_docs, loaded_bytes = self.loader.stats()
+
+        # Checkpoint is taken in the thread of extraction, right after its batch.
+        batches = (
+            (data, self.extractor.checkpoint) for data in self.extractor.stream()
+        )
+        with ThreadPoolExecutor(max_workers=self.workers) as executor, closing(
+            prefetch(batches, self.queue_size)
+        ) as prefetched:
+            for (data, checkpoint), (transformed_data, previous_persons_ids) in ordered_map(
+                executor, self.transform_and_load, prefetched, self.workers
+            ):
+                if self.similar_films_builder:
+                    self.similar_films_builder.add(transformed_data)
+                self.changes_publisher.publish_loaded(
+                    self.index_name, transformed_data)
+                if self.persons_etl and not self.full_run:
+                    # Persons removed from films lose them too.
+                    self.persons_etl.load_by_ids(
+                        sorted(
+                            set(self.get_persons_ids(transformed_data))
+                            | set(previous_persons_ids)
+                        )
+                    )
+                if self.movies_etl and not self.full_run:
+                    self.reload_films_of(
+                        [document["_id"] for document in transformed_data])
+                # Saved after the batch and its side effects, so a crash repeats the batch
+                # instead of skipping it.
+                self.etl_state.set_checkpoint(self.extractor.table_name, *checkpoint)
+                loaded += len(transformed_data)
+        if loaded:
+            self.log_throughput(start, loaded_docs, loaded_bytes)
+        return loaded
+
+    def log_throughput(self, start: float, loaded_docs: int, loaded_bytes: int):
+        """
+        Log documents and bytes loaded by the loader since start of run.
+        Documents reloaded by other ETLs in the meantime are counted too.
+        :param start: Time of start of run.
+        :param loaded_docs: Number of documents loaded by the loader before run.
+        :param loaded_bytes: Number of bytes loaded by the loader before run.
+        :return: None
+        """
+        elapsed = time.perf_counter() - start
+        docs, size = self.loader.stats()
+        docs, size = docs - loaded_docs, size - loaded_bytes
+        logging.info(
+            f"Loaded {docs} documents ({size} bytes) into {self.index_name} "
+            f"in {elapsed:.1f}s: {docs / elapsed:.0f} docs/s, {size / elapsed:.0f} bytes/s."
+        )
+
+    def transform_and_load(self, batch: tuple) -> Tuple[list, list]:
+        """
+        Transform and load extracted batch.
+        :param batch: Extracted data and checkpoint after it.
+        :return: Loaded documents and IDs of persons of their versions replaced by them.
+        """
+        data, _ = batch
+        transformed_data = self.transformer.transform(self.index_name, data)
+        previous_persons_ids = []
+        if self.persons_etl and not self.full_run:
+            previous_persons_ids = self.get_persons_ids(
+                self.loader.get_documents(
+                    [document["_id"] for document in transformed_data],
+                    source_includes=[f"{role}.id" for role in PERSON_ROLES],
+                )
+            )
+        self.loader.load(transformed_data)
+        return transformed_data, previous_persons_ids
+
+    def load_by_ids(self, ids: list):
+        """
+        Reload documents with the IDs.
+        :param ids: IDs of documents.
+        :return: None
+        """
+        data = self.extractor.extract_by_ids(ids)
+        transformed_data = self.transformer.transform(self.index_name, data)
+        self.loader.load(transformed_data)
+        # Reloaded films lose their similar films.
+        if self.similar_films_builder:
+            self.similar_films_builder.add(transformed_data)
+        self.changes_publisher.publish_loaded(
+            self.index_name, transformed_data)
+
+    def reload_films_of(self, ids: list):
+        """
+        Reload films of entries with the IDs, batch by batch.
+        :param ids: IDs of entries, e.g. persons.
+        :return: None
+        """
+        if self.movies_etl is None:
+            raise ValueError(f"ETL of {self.index_name} has no ETL of movies to reload films.")
+        for films_ids in self.extractor.iter_films_ids(ids):
+            self.movies_etl.load_by_ids(films_ids)
+
+    @staticmethod
+    def get_persons_ids(data: list) -> list:
+        """
+        Get IDs of persons of films.
+        :param data: Transformed films.
+        :return: List of IDs.
+        """
+        return sorted(
+            {
+                person["id"]
+                for document in data
+                for role in PERSON_ROLES
+                for person in document["_source"].get(role) or []
+            }
+        )
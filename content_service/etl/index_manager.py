@@ -22,3 +22,19 @@ class IndexManager:
                     f"Index {self.index_name} was created successfully.")
             else:
                 logging.error("Error of creating index.")
+        else:
+            # Add new fields to the mapping of existing index.
+            mapping_before = client.indices.get_mapping(index=self.index_name)
+            client.indices.put_mapping(
+                index=self.index_name, **self.index["mappings"])
+            mapping_after = client.indices.get_mapping(index=self.index_name)
+
+            # Documents are indexed again in background, so new sub-fields are filled.
+            if mapping_before.body != mapping_after.body:
+                client.update_by_query(
+                    index=self.index_name,
+                    conflicts="proceed",
+                    wait_for_completion=False,
+                )
+                logging.info(
+                    f"Mapping of index {self.index_name} was changed, reindexing documents.")
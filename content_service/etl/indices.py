@@ -46,7 +46,11 @@ movie_index = {
             "title": {
                 "type": "text",
                 "analyzer": "ru_en",
-                "fields": {"raw": {"type": "keyword"}},
+                "fields": {
+                    "raw": {"type": "keyword"},
+                    # Prefixes of words for autocomplete.
+                    "suggest": {"type": "search_as_you_type"},
+                },
             },
             "description": {"type": "text", "analyzer": "ru_en"},
             "directors": {
@@ -73,6 +77,8 @@ movie_index = {
                     "name": {"type": "text", "analyzer": "ru_en"},
                 },
             },
+            # IDs of similar films, computed by ETL.
+            "similar": {"type": "keyword", "index": False},
         },
     },
 }
@@ -89,6 +95,8 @@ genre_index = {
                 "fields": {"raw": {"type": "keyword"}},
             },
             "description": {"type": "text", "analyzer": "ru_en"},
+            # IDs of the most rated films of genre, computed by ETL.
+            "popular": {"type": "keyword", "index": False},
         },
     },
 }
@@ -102,7 +110,19 @@ person_index = {
             "name": {
                 "type": "text",
                 "analyzer": "ru_en",
-                "fields": {"raw": {"type": "keyword"}},
+                "fields": {
+                    "raw": {"type": "keyword"},
+                    # Prefixes of words for autocomplete.
+                    "suggest": {"type": "search_as_you_type"},
+                },
+            },
+            "films": {
+                "type": "object",
+                "dynamic": "strict",
+                "properties": {
+                    "id": {"type": "keyword"},
+                    "roles": {"type": "keyword"},
+                },
             },
         },
     },
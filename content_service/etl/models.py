@@ -19,6 +19,14 @@ class PersonData(Base):
     name: str
 
 
+class PersonFilm(Base):
+    roles: List[str] = []
+
+
+class PersonWithFilms(PersonData):
+    films: List[PersonFilm] = []
+
+
 class Person(PersonData):
     role: List[str] = []
     film_ids: List[str] = []
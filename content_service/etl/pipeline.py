@@ -0,0 +1,91 @@
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Deque, Generator, Iterable, Iterator, Tuple
+
+# Marks the end of items in the queue.
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def prefetch(iterable: Iterable, size: int) -> Generator[Any, None, None]:
+    """
+    Generator of items of iterable which is consumed in a separate thread.
+    At most size items wait in the queue, so a slow consumer holds the producer.
+    :param iterable: Items, e.g. batches extracted from DB.
+    :param size: Size of the queue.
+    :return: Generator of items in the order of iterable.
+    """
+    items: queue.Queue = queue.Queue(maxsize=size)
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        # Put waits for free space, but gives up if the consumer stopped.
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            # Generator is closed in the thread where it runs.
+            close = getattr(iterator, "close", None)
+            if close:
+                close()
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stopped.set()
+        producer.join()
+
+
+def ordered_map(
+    executor: Executor, func: Callable, iterable: Iterable, concurrency: int
+) -> Iterator:
+    """
+    Generator of results of func applied to items in the executor.
+    At most concurrency items are processed at once, results keep the order of items.
+    :param executor: Executor running func.
+    :param func: Function of one item.
+    :param iterable: Items.
+    :param concurrency: Number of items processed at once.
+    :return: Generator of (item, result).
+    """
+    running: Deque[Tuple[Any, Future]] = deque()
+    try:
+        for item in iterable:
+            running.append((item, executor.submit(func, item)))
+            if len(running) >= concurrency:
+                item, future = running.popleft()
+                yield item, future.result()
+        while running:
+            item, future = running.popleft()
+            yield item, future.result()
+    finally:
+        for _, future in running:
+            future.cancel()
@@ -0,0 +1,90 @@
+import logging
+
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import bulk, scan
+
+from backoff import backoff
+
+
+class PopularFilmsBuilder:
+    """
+    Computes top films of each genre by IMDb rating and stores their IDs in "popular" field
+    of genre documents, so popular films of genre are read without a nested query.
+    """
+
+    def __init__(
+        self,
+        elasticsearch_host: str,
+        movies_index: str,
+        genres_index: str,
+        popular_films_count: int,
+    ):
+        self.elasticsearch_host = elasticsearch_host
+        self.movies_index = movies_index
+        self.genres_index = genres_index
+        self.popular_films_count = popular_films_count
+
+    def popular_films_query(self, genre_id: str) -> dict:
+        """
+        Query of the most rated films of the genre.
+        :param genre_id: ID of genre.
+        :return: Query body.
+        """
+        return {
+            "size": self.popular_films_count,
+            "_source": False,
+            "query": {
+                "nested": {
+                    "path": "genres",
+                    "query": {"term": {"genres.id": genre_id}},
+                }
+            },
+            # "id" is a tie-breaker, so the order is the same in every run.
+            "sort": [{"imdb_rating": {"order": "desc"}}, {"id": {"order": "asc"}}],
+        }
+
+    @backoff(limit_of_retries=10)
+    def build(self) -> list:
+        """
+        Compute popular films of all genres and save the rankings which changed.
+        :return: IDs of genres whose rankings were updated.
+        """
+        client = Elasticsearch(hosts=self.elasticsearch_host)
+        # Make loaded films searchable.
+        client.indices.refresh(index=self.movies_index)
+
+        genres = {
+            hit["_id"]: hit.get("_source", {}).get("popular")
+            for hit in scan(
+                client, index=self.genres_index, _source=["popular"]
+            )
+        }
+        if not genres:
+            return []
+
+        searches = []
+        for genre_id in genres:
+            searches.append({"index": self.movies_index})
+            searches.append(self.popular_films_query(genre_id))
+        responses = client.msearch(searches=searches)["responses"]
+
+        actions = []
+        for (genre_id, popular), response in zip(genres.items(), responses):
+            if "hits" not in response:
+                continue
+            films_ids = [hit["_id"] for hit in response["hits"]["hits"]]
+            # Unchanged rankings are not written, so cache of their pages is kept.
+            if films_ids != popular:
+                actions.append(
+                    {
+                        "_op_type": "update",
+                        "_index": self.genres_index,
+                        "_id": genre_id,
+                        "doc": {"popular": films_ids},
+                    }
+                )
+        if not actions:
+            return []
+        success, _ = bulk(client, actions)
+        logging.info(f"Popular films were updated for {success} genres.")
+        return [action["_id"] for action in actions]
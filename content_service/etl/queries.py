@@ -1,11 +1,5 @@
-def generate_filmwork_query(last_modified, size_of_batch):
-    """
-    Function generate filmwork query.
-    :param last_modified: Last modified datetime for query.
-    :param size_of_batch: Size of batch.
-    :return: Query
-    """
-    query = f"""
+# Films with genres and persons, conditions and order are added by queries below.
+FILMWORK_SELECT = """
                 SELECT
                     fw.id, 
                     fw.title, 
@@ -38,29 +32,104 @@ def generate_filmwork_query(last_modified, size_of_batch):
                 LEFT JOIN person_film_work as pfw ON pfw.film_work_id = fw.id
                 LEFT JOIN genre as g ON g.id = gfw.genre_id
                 LEFT JOIN person as p ON p.id = pfw.person_id
-                WHERE fw.modified > '{last_modified}'
+"""
+
+
+def generate_filmwork_query(last_modified, last_id):
+    """
+    Function generate filmwork query. The query isn't limited,
+    it is read batch by batch from a server-side cursor.
+    :param last_modified: Last modified datetime for query.
+    :param last_id: ID of the last entry with last modified, entries with equal modified go by ID.
+    :return: Query
+    """
+    query = f"""{FILMWORK_SELECT}
+                WHERE (fw.modified, fw.id) > ('{last_modified}', '{last_id}')
                 GROUP BY fw.id
-                ORDER BY fw.modified
-                LIMIT {size_of_batch};
+                ORDER BY fw.modified, fw.id;
+            """
+    return query
+
+
+def generate_filmwork_by_ids_query():
+    """
+    Function generate query of films by IDs, IDs are passed as the parameter of query.
+    :return: Query
+    """
+    query = f"""{FILMWORK_SELECT}
+                WHERE fw.id = ANY(%s::uuid[])
+                GROUP BY fw.id;
             """
     return query
 
 
-def generate_person_query(last_modified, size_of_batch):
-    query = f"""SELECT person.id, person.full_name as name, person.modified
+def generate_films_ids_query(link_table: str, link_column: str):
+    """
+    Function generate query of IDs of films linked with entries by the link table.
+    Parameters of query are IDs of entries, the last ID of the previous page and size of page,
+    so films of a prolific person are read page by page.
+    :param link_table: Table linking entries with films, e.g. person_film_work.
+    :param link_column: Column of entry ID in the link table, e.g. person_id.
+    :return: Query
+    """
+    query = f"""SELECT DISTINCT link.film_work_id
+                FROM {link_table} AS link
+                WHERE link.{link_column} = ANY(%s::uuid[])
+                    AND link.film_work_id > %s::uuid
+                ORDER BY link.film_work_id
+                LIMIT %s;
+            """
+    return query
+
+
+# Films of person with roles of person in every film.
+PERSON_FILMS_COLUMN = """
+    COALESCE(
+        (
+            -- Ordered, so pages of films of a person are stable slices of the array.
+            SELECT JSON_AGG(
+                JSONB_BUILD_OBJECT('id', pf.film_work_id, 'roles', pf.roles)
+                ORDER BY pf.film_work_id
+            )
+            FROM (
+                SELECT pfw.film_work_id, ARRAY_AGG(DISTINCT pfw.role) AS roles
+                FROM person_film_work AS pfw
+                WHERE pfw.person_id = person.id
+                GROUP BY pfw.film_work_id
+            ) AS pf
+        ),
+        '[]'
+    ) AS films
+"""
+
+
+def generate_person_query(last_modified, last_id):
+    query = f"""SELECT person.id, person.full_name as name, person.modified,
+                                            {PERSON_FILMS_COLUMN}
+                                            FROM person
+                                            WHERE (person.modified, person.id) > ('{last_modified}', '{last_id}')
+                                            ORDER BY person.modified, person.id;
+                                            """
+    return query
+
+
+def generate_person_by_ids_query():
+    """
+    Function generate query of persons by IDs, IDs are passed as the parameter of query.
+    :return: Query
+    """
+    query = f"""SELECT person.id, person.full_name as name, person.modified,
+                                            {PERSON_FILMS_COLUMN}
                                             FROM person
-                                            WHERE person.modified > '{last_modified}'
-                                            ORDER BY person.modified
-                                            LIMIT {size_of_batch};
+                                            WHERE person.id = ANY(%s::uuid[]);
                                             """
     return query
 
 
-def generate_genre_query(last_modified, size_of_batch):
+def generate_genre_query(last_modified, last_id):
     query = f"""SELECT genre.id, genre.name, genre.description, genre.modified
                                                             FROM genre
-                                                            WHERE genre.modified > '{last_modified}'
-                                                            ORDER BY genre.modified
-                                                            LIMIT {size_of_batch};
+                                                            WHERE (genre.modified, genre.id) > ('{last_modified}', '{last_id}')
+                                                            ORDER BY genre.modified, genre.id;
                                                             """
     return query
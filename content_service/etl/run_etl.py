@@ -1,71 +1,146 @@
+import argparse
 import time
+from concurrent.futures import ThreadPoolExecutor
 
+from redis import StrictRedis
+
+from changes_publisher import ChangesPublisher
 from data_extractor import DataExtractor
 from data_loader import DataLoader
 from data_transformer import DataTransformer
 from etl import ETL
 from index_manager import IndexManager
 from indices import movie_index, genre_index, person_index
+from popular_films import PopularFilmsBuilder
 from settings import BaseConfigs
+from similar_films import SimilarFilmsBuilder
 
 
-def run_etl_indefinitely():
+def run_etl_indefinitely(full_rebuild: bool = False):
     # Initialize configs and settings
     configs = BaseConfigs()
+    if full_rebuild:
+        # Checkpoints are dropped before ETLs read them, so everything is reloaded.
+        configs.etl_state.reset_state()
+    changes_publisher = ChangesPublisher(
+        StrictRedis(
+            host=configs.redis_settings["redis_host"],
+            port=configs.redis_settings["redis_port"],
+        ),
+        configs.changes_stream,
+    )
+
+    # Instantiate the components for persons
+    index_manager_persons = IndexManager(
+        configs.es_url, "persons", person_index)
+    extractor_persons = DataExtractor("person", configs.dsn, configs.batch)
+    transformer_persons = DataTransformer()
+    loader_persons = DataLoader(
+        configs.es_url,
+        "persons",
+        chunk_size=configs.bulk_chunk_size,
+        max_chunk_bytes=configs.bulk_chunk_bytes,
+        thread_count=configs.bulk_threads,
+    )
+    etl_persons = ETL(
+        index_manager_persons,
+        extractor_persons,
+        transformer_persons,
+        loader_persons,
+        changes_publisher,
+        configs.etl_state,
+        configs.batch,
+        "persons",
+        queue_size=configs.etl_queue_size,
+        workers=configs.etl_workers,
+    )
 
     # Instantiate the components for movies
     index_manager_movies = IndexManager(configs.es_url, "movies", movie_index)
     extractor_movies = DataExtractor("film_work", configs.dsn, configs.batch)
     transformer_movies = DataTransformer()
-    loader_movies = DataLoader(configs.es_url, "movies")
+    loader_movies = DataLoader(
+        configs.es_url,
+        "movies",
+        chunk_size=configs.bulk_chunk_size,
+        max_chunk_bytes=configs.bulk_chunk_bytes,
+        thread_count=configs.bulk_threads,
+    )
+    similar_films_builder = SimilarFilmsBuilder(
+        configs.es_url, "movies", configs.similar_films_count
+    )
     etl_movies = ETL(
         index_manager_movies,
         extractor_movies,
         transformer_movies,
         loader_movies,
+        changes_publisher,
         configs.etl_state,
         configs.batch,
         "movies",
+        similar_films_builder,
+        persons_etl=etl_persons,
+        queue_size=configs.etl_queue_size,
+        workers=configs.etl_workers,
     )
+    etl_persons.movies_etl = etl_movies
 
     # Instantiate the components for genres
     index_manager_genres = IndexManager(configs.es_url, "genres", genre_index)
     extractor_genres = DataExtractor("genre", configs.dsn, configs.batch)
     transformer_genres = DataTransformer()
-    loader_genres = DataLoader(configs.es_url, "genres")
+    loader_genres = DataLoader(
+        configs.es_url,
+        "genres",
+        chunk_size=configs.bulk_chunk_size,
+        max_chunk_bytes=configs.bulk_chunk_bytes,
+        thread_count=configs.bulk_threads,
+    )
     etl_genres = ETL(
         index_manager_genres,
         extractor_genres,
         transformer_genres,
         loader_genres,
+        changes_publisher,
         configs.etl_state,
         configs.batch,
         "genres",
+        movies_etl=etl_movies,
+        queue_size=configs.etl_queue_size,
+        workers=configs.etl_workers,
     )
 
-    # Instantiate the components for persons
-    index_manager_persons = IndexManager(
-        configs.es_url, "persons", person_index)
-    extractor_persons = DataExtractor("person", configs.dsn, configs.batch)
-    transformer_persons = DataTransformer()
-    loader_persons = DataLoader(configs.es_url, "persons")
-    etl_persons = ETL(
-        index_manager_persons,
-        extractor_persons,
-        transformer_persons,
-        loader_persons,
-        configs.etl_state,
-        configs.batch,
-        "persons",
+    popular_films_builder = PopularFilmsBuilder(
+        configs.es_url, "movies", "genres", configs.popular_films_count
     )
 
-    # Run the ETL processes indefinitely
-    while True:
-        etl_movies.run_etl()
-        etl_genres.run_etl()
-        etl_persons.run_etl()
-        time.sleep(configs.run_etl_every_seconds)
+    # Run the ETL processes indefinitely, stages of every index are pipelined inside it.
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        while True:
+            # Genres and persons are loaded in parallel, each reloads films from the DB.
+            # Movies go after them, so a stream of movies can't overwrite a reloaded film
+            # with names from its older snapshot, and its first run loads their new names.
+            genres_run = executor.submit(etl_genres.run_etl)
+            persons_run = executor.submit(etl_persons.run_etl)
+            loaded_genres = genres_run.result()
+            persons_run.result()
+            loaded_movies = etl_movies.run_etl()
+            # Films loaded and reloaded by all runs are searchable together, cached similar
+            # films of them are evicted once their lists are saved.
+            changes_publisher.publish("movies", similar_films_builder.build())
+            # Rankings change only with loaded films, reloaded genres lose their rankings.
+            if loaded_movies or loaded_genres:
+                changes_publisher.publish(
+                    "genres", popular_films_builder.build())
+            time.sleep(configs.run_etl_every_seconds)
 
 
 if __name__ == "__main__":
-    run_etl_indefinitely()
+    parser = argparse.ArgumentParser(description="Load films, genres and persons to ES.")
+    parser.add_argument(
+        "--full-rebuild",
+        action="store_true",
+        help="Ignore saved checkpoints and reload all entries.",
+    )
+    args = parser.parse_args()
+    run_etl_indefinitely(full_rebuild=args.full_rebuild)
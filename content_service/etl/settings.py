@@ -38,6 +38,14 @@ class BaseConfigs(BaseSettings):
     batch: int = Field(100, env="BATCH_SIZE")
     border_sleep_time: float = Field(10.0, env="BORDER_SLEEP_TIME")
     run_etl_every_seconds: int = Field(60, env="RUN_ETL_EVERY_SECONDS")
+    similar_films_count: int = Field(50, env="SIMILAR_FILMS_COUNT")
+    popular_films_count: int = Field(1000, env="POPULAR_FILMS_COUNT")
+    changes_stream: str = Field("content-changes", env="CONTENT_CHANGES_STREAM")
+    etl_queue_size: int = Field(4, env="ETL_QUEUE_SIZE")
+    etl_workers: int = Field(2, env="ETL_WORKERS")
+    bulk_chunk_size: int = Field(500, env="ES_BULK_CHUNK_SIZE")
+    bulk_chunk_bytes: int = Field(10 * 1024 * 1024, env="ES_BULK_CHUNK_BYTES")
+    bulk_threads: int = Field(2, env="ES_BULK_THREADS")
     es_url: str = EsSettings().get_url()
     redis_settings: dict = RedisSettings().dict()
     dsn: dict = DbSettings().dict()
@@ -0,0 +1,134 @@
+import logging
+from typing import Dict
+
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import bulk
+
+from backoff import backoff
+
+
+class SimilarFilmsBuilder:
+    """
+    Computes top similar films for loaded films and stores their IDs in "similar" field.
+    Similarity is a weighted number of common genres, directors, actors and writers.
+    Loaded films are collected by add and computed by build once per run of ETL,
+    so the index is refreshed once, after all films of the run are loaded.
+    Only loaded films are recomputed: lists of other films don't get films loaded later,
+    until those films change themselves or all films are reloaded by --full-rebuild.
+    """
+
+    # Weight of one common entity of each type.
+    weights = {"genres": 1, "directors": 3, "actors": 2, "writers": 1}
+    # Number of films whose similar films are computed by one request.
+    chunk_size = 100
+
+    def __init__(self, elasticsearch_host: str, index_name: str, similar_films_count: int):
+        self.elasticsearch_host = elasticsearch_host
+        self.index_name = index_name
+        self.similar_films_count = similar_films_count
+        # Client is kept between runs, so connections are reused.
+        self.client = Elasticsearch(hosts=elasticsearch_host)
+        # IDs of films loaded since the last build, in order of loading without repeats.
+        self.pending: Dict[str, None] = {}
+
+    def similar_films_query(self, film: dict) -> dict:
+        """
+        Query of films similar to the film.
+        :param film: Source of film document.
+        :return: Query body.
+        """
+        should = []
+        for field, weight in self.weights.items():
+            ids = [entity["id"] for entity in film.get(field) or []]
+            if ids:
+                should.append(
+                    {
+                        "nested": {
+                            "path": field,
+                            "query": {"terms": {f"{field}.id": ids}},
+                            # Every common entity adds its weight to the score.
+                            "score_mode": "sum",
+                            "boost": weight,
+                        }
+                    }
+                )
+        return {
+            "size": self.similar_films_count,
+            "_source": False,
+            "query": {
+                "bool": {
+                    "should": should,
+                    "minimum_should_match": 1,
+                    "must_not": [{"term": {"id": film["id"]}}],
+                }
+            },
+            "sort": ["_score", {"imdb_rating": {"order": "desc"}}],
+        }
+
+    def add(self, data: list) -> None:
+        """
+        Remember loaded films, their similar films are computed by build.
+        :param data: Documents loaded to Elasticsearch.
+        :return: None
+        """
+        for document in data:
+            self.pending[document["_id"]] = None
+
+    def build(self) -> list:
+        """
+        Compute similar films for the films loaded since the previous build and save them.
+        :return: IDs of updated films.
+        """
+        if not self.pending:
+            return []
+        self.refresh()
+        updated = []
+        films_ids = list(self.pending)
+        for start in range(0, len(films_ids), self.chunk_size):
+            updated += self.build_chunk(films_ids[start: start + self.chunk_size])
+        self.pending.clear()
+        logging.info(f"Similar films were computed for {len(updated)} films.")
+        return updated
+
+    @backoff(limit_of_retries=10)
+    def refresh(self) -> None:
+        # Make loaded films searchable.
+        self.client.indices.refresh(index=self.index_name)
+
+    @backoff(limit_of_retries=10)
+    def build_chunk(self, films_ids: list) -> list:
+        """
+        Compute similar films for the films and save them.
+        :param films_ids: IDs of films.
+        :return: IDs of updated films.
+        """
+        films = [
+            doc["_source"]
+            for doc in self.client.mget(
+                index=self.index_name,
+                ids=films_ids,
+                source_includes=["id", *self.weights],
+            )["docs"]
+            if doc.get("found")
+        ]
+        if not films:
+            return []
+
+        searches = []
+        for film in films:
+            searches.append({"index": self.index_name})
+            searches.append(self.similar_films_query(film))
+        responses = self.client.msearch(searches=searches)["responses"]
+
+        actions = [
+            {
+                "_op_type": "update",
+                "_index": self.index_name,
+                "_id": film["id"],
+                "doc": {"similar": [hit["_id"] for hit in response["hits"]["hits"]]},
+            }
+            for film, response in zip(films, responses)
+            if "hits" in response
+        ]
+        bulk(self.client, actions)
+        return [action["_id"] for action in actions]
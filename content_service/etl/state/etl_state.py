@@ -1,54 +1,58 @@
 import logging
+from typing import Tuple
 
 from backoff import backoff
 
 from .redis_state_storage import State
 
+# Position before all entries: (modified, id) of the last loaded entry.
+INITIAL_CHECKPOINT = ("1970-01-01 00:00:00", "00000000-0000-0000-0000-000000000000")
+TABLES = ("film_work", "genre", "person")
+
 
 class StateETL:
     def __init__(self, state: State):
         self.state = state
 
     @backoff(limit_of_retries=10)
-    def get_last_state(self, table_name: str) -> str:
+    def get_checkpoint(self, table_name: str) -> Tuple[str, str]:
         """
-        Method gets last modified time.
+        Method gets modified time and ID of the last loaded entry.
         :param table_name: The name of DB table.
-        :return: Last modified time in string format.
+        :return: Modified time in string format and ID.
         """
-        # Get last modified datetime.
-        state_modified = self.state.get_state(f"{table_name}")
+        state_modified = self.state.get_state(table_name)
+        state_id = self.state.get_state(f"{table_name}:id")
 
-        # Set date if state doesn't exist.
         if state_modified:
             logging.info(
-                "State received successfully. The ETL process continues.")
-        else:
-            state_modified = "1800-01-01"
-            self.state.set_state(f"{table_name}", state_modified)
-            logging.info(
-                f"There is no state for {table_name} ETL process. State was successfully created. The ETL "
-                f"process begins."
-            )
+                f"State of {table_name} received successfully, "
+                f"the ETL process continues from {state_modified}.")
+            # States saved before IDs were added continue from the first ID.
+            return state_modified, state_id or INITIAL_CHECKPOINT[1]
 
-        return state_modified
+        logging.info(
+            f"There is no state for {table_name} ETL process. The ETL process begins.")
+        return INITIAL_CHECKPOINT
 
     @backoff(limit_of_retries=10)
-    def set_last_state(self, table_name: str, last_modified: str) -> None:
+    def set_checkpoint(self, table_name: str, last_modified: str, last_id: str) -> None:
         """
-        Method sets last modified time of entry in the batch data from DB.
+        Method sets modified time and ID of the last loaded entry.
+        Both are saved by one command, so the checkpoint is never half-written.
         :param table_name: The name of DB table.
-        :param last_modified: Last modified time of entry in the batch data from DB.
+        :param last_modified: Modified time of the last entry of loaded batch.
+        :param last_id: ID of the last entry of loaded batch.
         :return: None
         """
-        self.state.set_state(f"{table_name}", last_modified)
+        self.state.set_states(
+            {table_name: last_modified, f"{table_name}:id": last_id})
 
     @backoff(limit_of_retries=10)
     def reset_state(self) -> None:
         """
-        Method resets all states.
+        Method resets all states, so the next run loads everything.
         :return: None
         """
-        self.state.set_state("film_work", "1800-01-01")
-        self.state.set_state("genre", "1800-01-01")
-        self.state.set_state("person", "1800-01-01")
+        for table_name in TABLES:
+            self.set_checkpoint(table_name, *INITIAL_CHECKPOINT)
@@ -40,6 +40,10 @@ class State:
         """Set state for key"""
         self.storage.save_state({key: value})
 
+    def set_states(self, states: Dict[str, Any]) -> None:
+        """Set states of several keys at once"""
+        self.storage.save_state(states)
+
     def get_state(self, key: str) -> Any:
         """Get state by key"""
         state = self.storage.retrieve_state()
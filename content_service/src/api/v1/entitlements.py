@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Body, Depends
+from models.entitlement import FilmPurchase, FilmPurchaseResult
+from services.bearer import security_service_token
+from services.permission_service import warm_entitlement
+from utils.request_metrics import TimedRoute
+
+router = APIRouter(route_class=TimedRoute)
+
+
+@router.post(
+    "/purchases",
+    response_model=FilmPurchaseResult,
+    summary="Film purchase succeeded, put it to the cache of permissions.",
+    dependencies=[Depends(security_service_token)],
+)
+async def film_purchase_succeeded(
+    purchase: FilmPurchase = Body(..., description="User and bought film."),
+) -> FilmPurchaseResult:
+    result = await warm_entitlement(purchase.user_id, purchase.film_id)
+    return FilmPurchaseResult(result=result)
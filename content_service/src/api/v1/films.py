@@ -1,19 +1,53 @@
 from http import HTTPStatus
-from typing import List, Optional, Annotated
+from typing import Dict, List, Optional, Annotated, Union
 
-from core.pagination import PaginationParams
-from fastapi import APIRouter, Depends, HTTPException, Query, Path
+import orjson
+
+from core.config import config
+from core.pagination import PaginationParams, CursorPaginationParams
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Path
+from fastapi_cache import FastAPICache
+from fastapi_cache.coder import JsonCoder
 from fastapi_cache.decorator import cache
-from models.film import FilmDetail, FilmListOutput
+from db.cache_backend import (
+    RawJsonCoder,
+    cache_get_many,
+    cache_set_many,
+    cache_unless_cursor,
+    build_cache_key,
+    normalized_query_key_builder,
+)
+from models.film import (
+    FilmBatch,
+    FilmBatchRequest,
+    FilmDetail,
+    FilmDetailPartial,
+    FilmFacets,
+    FilmListOutput,
+    FilmCursorPage,
+    FilmSuggestion,
+)
 from models.genre import GenreUUID
 from models.person import PersonUUID
 from services.bearer import security_jwt
-from services.film import FilmService, get_film_service
-from services.permission_service import check_user_permission_for_film
+from services.cache_invalidator import CACHED_PATHS_OF_INDEX
+from services.film import (
+    FILM_DETAIL_FIELDS,
+    FILM_PUBLIC_FIELDS,
+    FilmService,
+    get_film_service,
+)
+from services.permission_service import (
+    check_user_permission_for_film,
+    check_user_permission_for_films,
+)
+from utils.raw_json import raw_json_response
+from utils.request_metrics import TimedRoute
 
 from starlette import status
+from starlette.responses import Response, StreamingResponse
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get(
@@ -21,13 +55,25 @@ router = APIRouter()
     response_model=List[FilmListOutput],
     summary="Retrieve a list of films by search",
 )
-@cache(expire=60)
+@cache(expire=config.cache_expire, coder=RawJsonCoder)
 async def search_films(
     query: Optional[str] = Query(
         None, description="Search query for film titles"),
     film_service: FilmService = Depends(get_film_service),
     pagination: PaginationParams = Depends(PaginationParams),
-) -> List[FilmListOutput]:
+) -> Union[List[FilmListOutput], Response]:
+    if config.raw_responses:
+        films_json = await film_service.get_films_list_raw(
+            query=query,
+            page_size=pagination.page_size,
+            page_number=pagination.page,
+        )
+        if films_json is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="No films found"
+            )
+        return raw_json_response(films_json)
+
     films = await film_service.get_films_list_filtered_searched_sorted(
         query=query,
         page_size=pagination.page_size,
@@ -47,61 +93,241 @@ async def search_films(
 
 
 @router.get(
-    "/{film_id}",
-    response_model=FilmDetail,
-    summary="Retrieve detailed information about a film",
+    "/suggest",
+    response_model=List[FilmSuggestion],
+    summary="Suggest films by the beginning of title",
 )
-@cache(expire=60)
-async def film_details(
-    film_id: str = Path(..., description="The ID of the film."),
+@cache(expire=config.cache_expire, coder=RawJsonCoder)
+async def suggest_films(
+    q: str = Query(..., min_length=1,
+                   description="Beginning of film title typed by user"),
+    size: int = Query(10, ge=1, le=20, description="Number of suggestions"),
     film_service: FilmService = Depends(get_film_service),
-    user: Annotated[dict, Depends(security_jwt)] = None,
-) -> FilmDetail:
-    film = await film_service.get_by_id(film_id)
+) -> Union[List[FilmSuggestion], Response]:
+    return raw_json_response(await film_service.suggest(query=q, size=size))
 
-    # Check if the movie exists.
-    if not film:
+
+@router.get(
+    "/facets",
+    response_model=FilmFacets,
+    summary="Count films by genres, IMDb rating and premium, with optional search and filter by genre",
+)
+@cache(expire=config.cache_expire, key_builder=normalized_query_key_builder)
+async def film_facets(
+    query: Optional[str] = Query(
+        None, description="Search query for film titles"),
+    genre: Optional[str] = Query(None, description="Filter by genre ID"),
+    film_service: FilmService = Depends(get_film_service),
+) -> FilmFacets:
+    facets = await film_service.get_facets(query=query, genre_id=genre)
+
+    if facets is None:
         raise HTTPException(
-            status_code=HTTPStatus.NOT_FOUND, detail="The film not found."
+            status_code=status.HTTP_404_NOT_FOUND, detail="No films found"
         )
 
-    # Check if the user has permissions to watch film.
-    if not await check_user_permission_for_film(user, film):
+    return facets
+
+
+@router.get(
+    "/export",
+    summary="Export all films as NDJSON, one film per line",
+    response_class=StreamingResponse,
+)
+async def export_films(
+    fields: Optional[List[str]] = Query(
+        None, description="Fields of the films to export, uuid, title and imdb_rating by default."
+    ),
+    film_service: FilmService = Depends(get_film_service),
+    user: dict = Depends(security_jwt),
+) -> StreamingResponse:
+    if fields:
+        _check_film_fields(fields)
+    else:
+        fields = FILM_PUBLIC_FIELDS
+
+    # Premium films are exported with all fields only for premium users.
+    return StreamingResponse(
+        film_service.export_films(
+            fields=fields,
+            with_premium_details=user["is_premium"],
+            page_size=config.export_page_size,
+        ),
+        media_type="application/x-ndjson",
+    )
+
+
+def _check_film_fields(fields: List[str]) -> None:
+    unknown_fields = set(fields) - set(FilmDetail.__fields__)
+    if unknown_fields:
         raise HTTPException(
-            status_code=HTTPStatus.UNAUTHORIZED,
-            detail="This film only for premium users.",
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown_fields))}.",
         )
 
-    return FilmDetail(
+
+def _film_detail(film: dict) -> dict:
+    """Build film detail from ES document."""
+    return dict(
         uuid=film.get("id"),
         title=film.get("title"),
         imdb_rating=film.get("imdb_rating"),
         description=film.get("description"),
         genres=[
             GenreUUID(uuid=genre.get("id"), name=genre.get("name"))
-            for genre in film.get("genres")
+            for genre in film.get("genres") or []
         ],
         actors=[
             PersonUUID(uuid=actor.get("id"), full_name=actor.get("name"))
-            for actor in film.get("actors")
+            for actor in film.get("actors") or []
         ],
         writers=[
             PersonUUID(uuid=writer.get("id"), full_name=writer.get("name"))
-            for writer in film.get("writers")
+            for writer in film.get("writers") or []
         ],
         directors=[
             PersonUUID(uuid=director.get("id"), full_name=director.get("name"))
-            for director in film.get("directors")
+            for director in film.get("directors") or []
+        ],
+    )
+
+
+@router.get(
+    "/{film_id}",
+    response_model=FilmDetail,
+    summary="Retrieve detailed information about a film",
+    description="With fields, only the requested fields of FilmDetail are returned.",
+)
+@cache(expire=config.cache_detail_expire, coder=RawJsonCoder)
+async def film_details(
+    film_id: str = Path(..., description="The ID of the film."),
+    fields: Optional[List[str]] = Query(
+        None, description="Fields of the film to return, all fields by default."
+    ),
+    film_service: FilmService = Depends(get_film_service),
+    user: Annotated[dict, Depends(security_jwt)] = None,
+) -> Union[FilmDetail, Response]:
+    source_includes = None
+    if fields:
+        _check_film_fields(fields)
+        # "id" and "premium" are always needed for checking permissions.
+        source_includes = ["id", "premium"] + [
+            "id" if field == "uuid" else field for field in fields
+        ]
+
+    film = await film_service.get_by_id(film_id, source_includes=source_includes)
+
+    # Check if the movie exists.
+    if not film:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail="The film not found."
+        )
+
+    # Check if the user has permissions to watch film.
+    if not await check_user_permission_for_film(user, film):
+        raise HTTPException(
+            status_code=HTTPStatus.UNAUTHORIZED,
+            detail="This film only for premium users.",
+        )
+
+    film_detail = _film_detail(film)
+    if fields:
+        # Only requested fields are returned, with null values too.
+        film_detail = {field: film_detail[field] for field in fields}
+        return raw_json_response(
+            orjson.dumps(FilmDetailPartial(**film_detail).dict(exclude_unset=True))
+        )
+
+    return FilmDetail(**film_detail)
+
+
+def _film_details_cache_key(film_id: str, user: dict) -> str:
+    """Key of cached response of film_details without query parameters."""
+    return build_cache_key(
+        f"{FastAPICache.get_prefix()}:",
+        film_details,
+        CACHED_PATHS_OF_INDEX["movies"].format(id=film_id),
+        [],
+        user,
+    )
+
+
+@router.post(
+    "/batch",
+    response_model=FilmBatch,
+    response_model_exclude_none=True,
+    summary="Retrieve detailed information about several films in one request",
+)
+async def films_batch(
+    batch: FilmBatchRequest = Body(..., description="IDs of the films."),
+    film_service: FilmService = Depends(get_film_service),
+    user: dict = Depends(security_jwt),
+) -> FilmBatch:
+    film_ids = list(dict.fromkeys(batch.ids))
+    if len(film_ids) > config.films_batch_max_ids:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"No more than {config.films_batch_max_ids} films in one request.",
+        )
+
+    # Reuse responses of /films/{film_id} cached for the user, they passed the check of permissions.
+    film_details_by_id: Dict[str, FilmDetailPartial] = {}
+    cache_enabled = FastAPICache.get_enable()
+    if cache_enabled:
+        cached_values = await cache_get_many(
+            FastAPICache.get_backend(),
+            [_film_details_cache_key(film_id, user) for film_id in film_ids],
+        )
+        for film_id, cached_value in zip(film_ids, cached_values):
+            if cached_value is not None:
+                film_details_by_id[film_id] = FilmDetailPartial(
+                    **JsonCoder.decode(cached_value)
+                )
+
+    # Get the other films with one request and check permissions for all of them at once.
+    missed_ids = [
+        film_id for film_id in film_ids if film_id not in film_details_by_id]
+    films = await film_service.get_many(missed_ids, source_includes=FILM_DETAIL_FIELDS)
+    permissions = await check_user_permission_for_films(user, films)
+
+    forbidden = []
+    missed_cache = {}
+    for film, permitted in zip(films, permissions):
+        if not permitted:
+            forbidden.append(film["id"])
+            continue
+        film_detail = FilmDetailPartial(**_film_detail(film))
+        film_details_by_id[film["id"]] = film_detail
+        missed_cache[_film_details_cache_key(film["id"], user)] = JsonCoder.encode(
+            film_detail
+        )
+    if cache_enabled:
+        # Written in one round trip, like they are read by get_many.
+        await cache_set_many(
+            FastAPICache.get_backend(), missed_cache, config.cache_detail_expire
+        )
+
+    return FilmBatch(
+        items=[
+            film_details_by_id[film_id]
+            for film_id in film_ids
+            if film_id in film_details_by_id
+        ],
+        not_found=[
+            film_id
+            for film_id in missed_ids
+            if film_id not in film_details_by_id and film_id not in forbidden
         ],
+        forbidden=forbidden,
     )
 
 
 @router.get(
     "/",
-    response_model=List[FilmListOutput],
+    response_model=Union[List[FilmListOutput], FilmCursorPage],
     summary="Retrieve a list of films with optional search, filter by genre, and sorting options",
 )
-@cache(expire=60)
+@cache_unless_cursor(expire=config.cache_expire, coder=RawJsonCoder)
 async def list_films_imbd_sorted(
     query: Optional[str] = Query(
         None, description="Search query for film titles"),
@@ -110,8 +336,37 @@ async def list_films_imbd_sorted(
     ),
     genre: Optional[str] = Query(None, description="Filter by genre ID"),
     film_service: FilmService = Depends(get_film_service),
-    pagination: PaginationParams = Depends(PaginationParams),
-) -> List[FilmListOutput]:
+    pagination: CursorPaginationParams = Depends(CursorPaginationParams),
+) -> List[FilmListOutput] | FilmCursorPage:
+    if pagination.cursor is not None:
+        films_page = await film_service.get_films_list_by_cursor(
+            cursor=pagination.cursor,
+            query=query,
+            sort=sort,
+            genre_id=genre,
+            page_size=pagination.page_size,
+            track_total_hits=pagination.track_total_hits,
+        )
+        if films_page is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="No films found"
+            )
+        return films_page
+
+    if config.raw_responses:
+        films_json = await film_service.get_films_list_raw(
+            query=query,
+            sort=sort,
+            page_size=pagination.page_size,
+            page_number=pagination.page,
+            genre_id=genre,
+        )
+        if films_json is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="No films found"
+            )
+        return raw_json_response(films_json)
+
     films = await film_service.get_films_list_filtered_searched_sorted(
         query=query,
         sort=sort,
@@ -134,17 +389,30 @@ async def list_films_imbd_sorted(
 
 @router.get(
     "/{film_id}/similar",
-    response_model=List[FilmListOutput],
+    response_model=Union[List[FilmListOutput], FilmCursorPage],
     summary="Get films similar to a specified film",
 )
-@cache(expire=60)
+@cache_unless_cursor(expire=config.cache_expire)
 async def list_films_imbd_sorted(
     film_id: str = Path(
         ..., description="The ID of the film for which to find similar films"
     ),
-    pagination: PaginationParams = Depends(PaginationParams),
+    pagination: CursorPaginationParams = Depends(CursorPaginationParams),
     film_service: FilmService = Depends(get_film_service),
-) -> List[FilmListOutput]:
+) -> List[FilmListOutput] | FilmCursorPage:
+    if pagination.cursor is not None:
+        films_page = await film_service.get_similar_films_by_cursor(
+            film_id=film_id,
+            cursor=pagination.cursor,
+            page_size=pagination.page_size,
+            track_total_hits=pagination.track_total_hits,
+        )
+        if films_page is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="No films found"
+            )
+        return films_page
+
     films = await film_service.get_similar_films(
         film_id=film_id, page_size=pagination.page_size, page_number=pagination.page
     )
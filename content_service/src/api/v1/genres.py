@@ -1,28 +1,53 @@
-from typing import List, Annotated
+from typing import List, Annotated, Union
 
-from core.pagination import PaginationParams
+from core.config import config
+from core.pagination import PaginationParams, CursorPaginationParams
 from fastapi import APIRouter, Depends, HTTPException, Path
 from fastapi_cache.decorator import cache
+from db.cache_backend import RawJsonCoder, cache_unless_cursor
 from models.film import FilmListOutput
-from models.genre import Genre
+from models.genre import Genre, GenreCursorPage
 from services.bearer import security_jwt
-from services.genres import GenreService, get_genre_service
+from services.genres import GENRE_FIELDS, GenreService, get_genre_service
 from starlette import status
+from starlette.responses import Response
+from utils.raw_json import raw_json_response
+from utils.request_metrics import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get(
     "/",
-    response_model=list[Genre],
+    response_model=Union[list[Genre], GenreCursorPage],
     response_model_by_alias=False,
     summary="Список жанров",
 )
-@cache(expire=60)
+@cache_unless_cursor(expire=config.cache_expire, coder=RawJsonCoder)
 async def genres(
     genre_service: GenreService = Depends(get_genre_service),
-    pagination: PaginationParams = Depends(PaginationParams),
-) -> list[Genre]:
+    pagination: CursorPaginationParams = Depends(CursorPaginationParams),
+) -> list[Genre] | GenreCursorPage:
+    if pagination.cursor is not None:
+        genres_page = await genre_service.genre_list_by_cursor(
+            pagination.cursor, pagination.page_size, pagination.track_total_hits
+        )
+        if genres_page is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="There is no genres."
+            )
+        return genres_page
+
+    if config.raw_responses:
+        genres_json = await genre_service.genre_list_raw(
+            pagination.page, pagination.page_size
+        )
+        if genres_json is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="There is no genres."
+            )
+        return raw_json_response(genres_json)
+
     genres_list = await genre_service.genre_list(pagination.page, pagination.page_size)
     if not genres_list:
         raise HTTPException(
@@ -38,12 +63,12 @@ async def genres(
     response_model_by_alias=False,
     summary="Деталка жанра",
 )
-@cache(expire=60)
+@cache(expire=config.cache_detail_expire)
 async def genres(
     genre_id: str,
     genre_service: GenreService = Depends(get_genre_service),
 ) -> Genre:
-    genre = await genre_service.get_by_id(genre_id)
+    genre = await genre_service.get_by_id(genre_id, source_includes=GENRE_FIELDS)
     if not genre:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="There is no such genre."
@@ -57,14 +82,25 @@ async def genres(
     response_model=List[FilmListOutput],
     summary="Get popular films by genre",
 )
-@cache(expire=60)
+@cache(expire=config.cache_expire, coder=RawJsonCoder)
 async def genres(
     genre_id: str = Path(
         ..., description="The ID of the genre for which to find films"
     ),
     pagination: PaginationParams = Depends(PaginationParams),
     genre_service: GenreService = Depends(get_genre_service),
-) -> List[FilmListOutput]:
+) -> Union[List[FilmListOutput], Response]:
+    if config.raw_responses:
+        films_json = await genre_service.get_popular_films_raw(
+            genre_id=genre_id, page_number=pagination.page, page_size=pagination.page_size
+        )
+        if films_json is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="There is no films of such genre.",
+            )
+        return raw_json_response(films_json)
+
     films = await genre_service.get_popular_films(
         genre_id=genre_id, page_number=pagination.page, page_size=pagination.page_size
     )
@@ -1,15 +1,20 @@
-from typing import List, Annotated
+from typing import List, Annotated, Union
 
-from core.pagination import PaginationParams
+from core.config import config
+from core.pagination import PaginationParams, CursorPaginationParams
 from fastapi import APIRouter, Depends, HTTPException, Query, Path
 from fastapi_cache.decorator import cache
+from db.cache_backend import RawJsonCoder, cache_unless_cursor
 from models.film import FilmListOutput
-from models.person import PersonUUID, PersonWithFilms
+from models.person import PersonUUID, PersonWithFilms, PersonCursorPage
 from services.bearer import security_jwt
 from services.persons import PersonService, get_person_service
 from starlette import status
+from starlette.responses import Response
+from utils.raw_json import raw_json_response
+from utils.request_metrics import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get(
@@ -17,7 +22,7 @@ router = APIRouter()
     response_model=List[PersonWithFilms],
     summary="Search for person, return person detail with films and roles in those films.",
 )
-@cache(expire=60)
+@cache(expire=config.cache_expire)
 async def person_search(
     query: str = Query("", description="Search query for person name"),
     pagination: PaginationParams = Depends(PaginationParams),
@@ -35,16 +40,53 @@ async def person_search(
     return found_persons
 
 
+@router.get(
+    "/suggest",
+    response_model=List[PersonUUID],
+    summary="Suggest persons by the beginning of name.",
+)
+@cache(expire=config.cache_expire, coder=RawJsonCoder)
+async def person_suggest(
+    q: str = Query(..., min_length=1,
+                   description="Beginning of person name typed by user"),
+    size: int = Query(10, ge=1, le=20, description="Number of suggestions"),
+    person_service: PersonService = Depends(get_person_service),
+) -> Union[list[PersonUUID], Response]:
+    return raw_json_response(await person_service.person_suggest(query=q, size=size))
+
+
 @router.get(
     "/",
-    response_model=list[PersonUUID],
+    response_model=Union[list[PersonUUID], PersonCursorPage],
     summary="List of all persons.",
 )
-@cache(expire=60)
+@cache_unless_cursor(expire=config.cache_expire, coder=RawJsonCoder)
 async def person(
-    pagination: PaginationParams = Depends(PaginationParams),
+    pagination: CursorPaginationParams = Depends(CursorPaginationParams),
     person_service: PersonService = Depends(get_person_service),
-) -> list[PersonUUID]:
+) -> list[PersonUUID] | PersonCursorPage | Response:
+    if pagination.cursor is not None:
+        persons_page = await person_service.person_list_by_cursor(
+            cursor=pagination.cursor,
+            page_size=pagination.page_size,
+            track_total_hits=pagination.track_total_hits,
+        )
+        if persons_page is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail=f"There is no persons."
+            )
+        return persons_page
+
+    if config.raw_responses:
+        persons_json = await person_service.person_list_raw(
+            page_size=pagination.page_size, page_number=pagination.page
+        )
+        if persons_json is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail=f"There is no persons."
+            )
+        return raw_json_response(persons_json)
+
     person_list = await person_service.person_list(
         page_size=pagination.page_size, page_number=pagination.page
     )
@@ -62,7 +104,7 @@ async def person(
     response_model=PersonWithFilms,
     summary="Person detail with films and roles in those films.",
 )
-@cache(expire=60)
+@cache(expire=config.cache_detail_expire)
 async def persons(
     person_id: str = Path(
         ..., description="The ID of person to find films with this person."
@@ -88,7 +130,7 @@ async def persons(
     response_model=List[FilmListOutput],
     summary="Films with person.",
 )
-@cache(expire=60)
+@cache(expire=config.cache_detail_expire)
 async def films_with_person(
     person_id: str,
     pagination: PaginationParams = Depends(PaginationParams),
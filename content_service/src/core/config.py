@@ -18,18 +18,80 @@ class Settings(BaseSettings):
     elastic_port: int = Field(env="ES_PORT", default=9200)
     elastic_schema = os.getenv("ES_SCHEMA", "http://")
 
+    # Pool of connections to Elasticsearch, shared by all requests of the worker.
+    es_connections_per_node: int = Field(
+        env="ES_CONNECTIONS_PER_NODE", default=10)
+    es_request_timeout: float = Field(env="ES_REQUEST_TIMEOUT", default=10.0)
+    es_max_retries: int = Field(env="ES_MAX_RETRIES", default=3)
+    es_retry_on_timeout: bool = Field(env="ES_RETRY_ON_TIMEOUT", default=True)
+
+    # Time to keep point in time of cursor pagination alive between requests.
+    es_cursor_keep_alive: str = Field(env="ES_CURSOR_KEEP_ALIVE", default="1m")
+
     redis_host: str = Field(env="REDIS_HOST", default="127.0.0.1")
     redis_port: int = Field(env="REDIS_PORT", default=6379)
 
+    # Time to keep responses in cache. Responses of one document live longer,
+    # they are evicted by changes published by ETL.
+    cache_expire: int = Field(env="CACHE_EXPIRE", default=60)
+    cache_detail_expire: int = Field(
+        env="CACHE_DETAIL_EXPIRE", default=6 * 60 * 60)
+    content_changes_stream: str = Field(
+        env="CONTENT_CHANGES_STREAM", default="content-changes")
+    # Number of popular films of genre precomputed by ETL, the same as in ETL.
+    popular_films_count: int = Field(env="POPULAR_FILMS_COUNT", default=1000)
+
+    # In-process cache in front of Redis cache.
+    cache_l1_ttl: int = Field(env="CACHE_L1_TTL", default=5)
+    cache_l1_max_items: int = Field(env="CACHE_L1_MAX_ITEMS", default=10000)
+    cache_l1_max_bytes: int = Field(
+        env="CACHE_L1_MAX_BYTES", default=64 * 1024 * 1024)
+    # Only one worker of the fleet recomputes a missed key, others wait up to timeout.
+    cache_fleet_lock: bool = Field(env="CACHE_FLEET_LOCK", default=False)
+    cache_fleet_lock_timeout: float = Field(
+        env="CACHE_FLEET_LOCK_TIMEOUT", default=2.0)
+
+    # Number of films read from ES at once while exporting catalog.
+    export_page_size: int = Field(env="EXPORT_PAGE_SIZE", default=1000)
+
+    # Max number of films in one request to /films/batch.
+    films_batch_max_ids: int = Field(env="FILMS_BATCH_MAX_IDS", default=100)
+
+    # List endpoints serialize documents of ES straight to JSON without pydantic models.
+    raw_responses: bool = Field(env="RAW_RESPONSES", default=False)
+
     secret_key: str = os.getenv("SECRET_KEY", "practix")
+    # Token of requests from other services, e.g. purchases reported by billing.
+    service_token: str = os.getenv("SERVICE_TOKEN", "")
 
     limit_of_requests_per_minute: int = os.getenv(
         "LIMIT_OF_REQUESTS_PER_MINUTE", 20)
+    # Max number of requests in a burst, tokens of bucket are refilled at limit per minute.
+    limit_of_requests_burst: int = Field(
+        env="LIMIT_OF_REQUESTS_BURST", default=20)
+    # Clients rejected by Redis are rejected in process until the bucket refills.
+    limit_of_requests_max_blocked_clients: int = Field(
+        env="LIMIT_OF_REQUESTS_MAX_BLOCKED_CLIENTS", default=100000)
 
     billing_service_url: str = os.getenv(
         "BILLING_SERVICE_URL", "http://billing_service:8082/")
     billing_service_check_whether_user_bought_film: str = os.getenv("BILLING_SERVICE_CHECK_WHETHER_USER_BOUGHT_FILM",
                                                                     "api/v1/order/check-user-film")
+    # Pool of connections to billing service shared by all requests of worker.
+    billing_connections: int = Field(env="BILLING_CONNECTIONS", default=100)
+    billing_keepalive_timeout: float = Field(
+        env="BILLING_KEEPALIVE_TIMEOUT", default=60.0)
+    billing_request_timeout: float = Field(
+        env="BILLING_REQUEST_TIMEOUT", default=5.0)
+
+    # Cache of films bought by users. Purchases are permanent, so they are cached for long,
+    # "not bought" is cached for a short time, so a new purchase is seen soon even without event.
+    entitlement_cache_expire: int = Field(
+        env="ENTITLEMENT_CACHE_EXPIRE", default=24 * 60 * 60)
+    entitlement_negative_cache_expire: int = Field(
+        env="ENTITLEMENT_NEGATIVE_CACHE_EXPIRE", default=30)
+    entitlement_cache_l1_max_items: int = Field(
+        env="ENTITLEMENT_CACHE_L1_MAX_ITEMS", default=100000)
 
     def es_url(self):
         return f"{self.elastic_schema}{self.elastic_host}:{self.elastic_port}"
@@ -1,18 +1,26 @@
+import asyncio
 from contextlib import asynccontextmanager
+from typing import Set
 
 import uvicorn
-from elasticsearch import AsyncElasticsearch
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import ORJSONResponse
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
+from prometheus_client import make_asgi_app
 from redis.asyncio import Redis
 
-from api.v1 import films, genres, persons
+from api.v1 import entitlements, films, genres, persons
 from core.config import config
+from core.metrics import metrics_registry
 from db import redis, elastic
+from db.cache_backend import TwoTierCacheBackend, cache_key_builder, held_locks
+from services import permission_service
+from services.cache_invalidator import CacheInvalidator, cache_tags_of_key
+from utils.conditional_get import conditional_response
 from utils.limit_of_requests import check_limit_of_requests
+from utils.request_metrics import observe_request
 
 
 @asynccontextmanager
@@ -20,14 +28,45 @@ async def lifespan(app: FastAPI):
     # Startup: initialize Redis and Elasticsearch
     redis.redis = Redis(host=config.redis_host, port=config.redis_port)
     await redis.redis.ping()  # Ensure Redis is ready
-    FastAPICache.init(RedisBackend(redis.redis), prefix="fastapi-cache")
-    elastic.es = AsyncElasticsearch(hosts=[config.es_url()])
+    cache_backend = TwoTierCacheBackend(
+        RedisBackend(redis.redis),
+        ttl=config.cache_l1_ttl,
+        max_items=config.cache_l1_max_items,
+        max_bytes=config.cache_l1_max_bytes,
+        redis_lock=redis.redis if config.cache_fleet_lock else None,
+        lock_timeout=config.cache_fleet_lock_timeout,
+        key_tags=cache_tags_of_key,
+    )
+    FastAPICache.init(
+        cache_backend, prefix="fastapi-cache", key_builder=cache_key_builder
+    )
+    elastic.es = elastic.create_elastic()
+    permission_service.billing_session = permission_service.create_billing_session()
+    permission_service.entitlement_cache = TwoTierCacheBackend(
+        RedisBackend(redis.redis),
+        ttl=config.cache_l1_ttl,
+        max_items=config.entitlement_cache_l1_max_items,
+        max_bytes=config.cache_l1_max_bytes,
+        name="entitlements",
+    )
+
+    # Evict cache of documents changed by ETL.
+    cache_invalidation = asyncio.create_task(
+        CacheInvalidator(
+            redis.redis,
+            cache_backend,
+            stream_name=config.content_changes_stream,
+            prefix="fastapi-cache",
+        ).run()
+    )
 
     yield
 
+    cache_invalidation.cancel()
     # Shutdown: close Redis and Elasticsearch connections
     await redis.redis.close()
     await elastic.es.close()
+    await permission_service.get_billing_session().close()
 
 
 app = FastAPI(
@@ -39,23 +78,45 @@ app = FastAPI(
 )
 
 
+# Added first, so it is the innermost http middleware and sees locks taken by the handler.
 @app.middleware("http")
-async def before_request(request: Request, call_next):
-    user_ip = request.headers.get("X-Forwarded-For")
+async def release_cache_locks(request: Request, call_next):
+    locks: Set[str] = set()
+    token = held_locks.set(locks)
+    try:
+        return await call_next(request)
+    finally:
+        held_locks.reset(token)
+        backend = FastAPICache.get_backend()
+        # Locks are taken only by TwoTierCacheBackend.
+        if locks and isinstance(backend, TwoTierCacheBackend):
+            await backend.release_locks(locks)
 
-    response = await call_next(request)
 
-    result_of_checking_limit_of_requests = await check_limit_of_requests(
-        user_ip=user_ip
-    )
+@app.middleware("http")
+async def before_request(request: Request, call_next):
+    # Check the limit before the request is handled, so rejected requests don't query ES.
+    retry_after = await check_limit_of_requests(request)
 
-    if result_of_checking_limit_of_requests:
+    if retry_after:
         return ORJSONResponse(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             content={"detail": "Too many requests"},
+            headers={"Retry-After": str(retry_after)},
         )
 
-    return response
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def etag(request: Request, call_next):
+    return await conditional_response(request, await call_next(request))
+
+
+# Added after the other http middlewares, so it wraps them and their time is measured too.
+@app.middleware("http")
+async def metrics(request: Request, call_next):
+    return await observe_request(request, call_next)
 
 
 origins = ["http://localhost",
@@ -69,11 +130,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.mount("/metrics", make_asgi_app(metrics_registry()))
+
 app.include_router(films.router, prefix="/movies/api/v1/films", tags=["films"])
 app.include_router(
     genres.router, prefix="/movies/api/v1/genres", tags=["genres"])
 app.include_router(
     persons.router, prefix="/movies/api/v1/persons", tags=["persons"])
+app.include_router(
+    entitlements.router, prefix="/movies/api/v1/entitlements", tags=["entitlements"])
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8080)
@@ -0,0 +1,84 @@
+import os
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    multiprocess,
+)
+
+# Buckets in seconds, from sub-millisecond cache hits to slow ES queries.
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Gauges of worker are summed over live workers when gunicorn runs several of them.
+ES_POOL_SIZE = Gauge(
+    "es_pool_size",
+    "Maximum number of connections to Elasticsearch.",
+    multiprocess_mode="livesum",
+)
+ES_REQUESTS_IN_FLIGHT = Gauge(
+    "es_requests_in_flight",
+    "Number of requests to Elasticsearch in flight, not connections: requests above "
+    "es_pool_size wait for a free connection, so the pool is saturated when it is higher.",
+    multiprocess_mode="livesum",
+)
+ES_TOOK = Histogram(
+    "es_took_seconds",
+    "Time of query reported by Elasticsearch, compare with wall-clock time "
+    "of dependency_request_duration_seconds.",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Lookups of cache.", ["cache", "tier", "result"]
+)
+CACHE_L1_SIZE_BYTES = Gauge(
+    "cache_l1_size_bytes",
+    "Size of in-process cache.",
+    ["cache"],
+    multiprocess_mode="livesum",
+)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time of handling request, including middlewares.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Number of requests being handled.",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+RESPONSE_SERIALIZATION_LATENCY = Histogram(
+    "http_response_serialization_duration_seconds",
+    "Time of validating value returned by endpoint with response model and rendering "
+    "it to JSON, zero for responses returned as is.",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+DEPENDENCY_LATENCY = Histogram(
+    "dependency_request_duration_seconds",
+    "Wall-clock time of requests to Elasticsearch, Redis and billing service.",
+    ["dependency", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def metrics_registry() -> CollectorRegistry:
+    """
+    Registry of /metrics endpoint. With PROMETHEUS_MULTIPROC_DIR set, metrics of
+    all gunicorn workers are collected from the directory, not only of the worker
+    which handles the scrape.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
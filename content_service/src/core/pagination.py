@@ -1,4 +1,92 @@
+import base64
+import binascii
+import hashlib
+from http import HTTPStatus
+from typing import Optional
+
+import orjson
+from fastapi import HTTPException, Query
+
+
 class PaginationParams:
     def __init__(self, page: int = 1, page_size: int = 10):
         self.page = page
         self.page_size = page_size
+
+
+class CursorPaginationParams(PaginationParams):
+    """
+    Pagination which also supports cursor mode.
+    An empty cursor opens a new cursor, next pages are requested with next_cursor of the previous page.
+    """
+
+    def __init__(
+        self,
+        page: int = 1,
+        page_size: int = 10,
+        cursor: Optional[str] = Query(
+            None, description="Cursor of the page, pass an empty value to open a cursor"
+        ),
+        track_total_hits: bool = Query(
+            True, description="Count total number of hits in cursor mode"
+        ),
+    ):
+        super().__init__(page, page_size)
+        self.cursor = cursor
+        self.track_total_hits = track_total_hits
+
+
+def query_fingerprint(index: str, query_body: dict) -> str:
+    """Short hash of index and query with sort, a cursor is valid only for its query."""
+    return hashlib.sha256(
+        orjson.dumps({"index": index, "query": query_body}, option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()[:16]
+
+
+def encode_cursor(pit_id: str, search_after: list, fingerprint: str) -> str:
+    """Pack point in time, sort values of the last hit and fingerprint of query to cursor."""
+    return base64.urlsafe_b64encode(
+        orjson.dumps(
+            {"pit_id": pit_id, "search_after": search_after, "query": fingerprint}
+        )
+    ).decode()
+
+
+def encode_offset_cursor(offset: int) -> str:
+    """Pack position in a stored list of IDs to opaque cursor."""
+    return base64.urlsafe_b64encode(orjson.dumps({"offset": offset})).decode()
+
+
+def decode_offset_cursor(cursor: str) -> int:
+    """Unpack position in a stored list of IDs, an empty cursor starts from 0."""
+    if not cursor:
+        return 0
+    try:
+        offset = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))["offset"]
+    except (binascii.Error, orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+        offset = None
+    if not isinstance(offset, int) or offset < 0:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor."
+        )
+    return offset
+
+
+def decode_cursor(cursor: str, fingerprint: str) -> Optional[dict]:
+    """
+    Unpack cursor, return None for an empty cursor.
+    Cursors of other queries, e.g. of other endpoints, are invalid.
+    """
+    if not cursor:
+        return None
+    try:
+        data = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        decoded_cursor = {"pit_id": data["pit_id"], "search_after": data["search_after"]}
+        valid = data["query"] == fingerprint and isinstance(data["search_after"], list)
+    except (binascii.Error, orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+        valid = False
+    if not valid:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor."
+        )
+    return decoded_cursor
@@ -1,14 +1,80 @@
 from abc import ABC, abstractmethod
-from typing import Any, List, Optional
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+
+class SearchError(Exception):
+    """Search engine failed to run a query, e.g. one of queries of a multi-search."""
+
+
+class InvalidQueryError(SearchError):
+    """Search engine rejected query, e.g. search_after which doesn't match its sort."""
+
+
+@dataclass
+class SearchPage:
+    """One page of a point-in-time search."""
+
+    hits: List[Any]
+    pit_id: str
+    search_after: Optional[list]
+    total: Optional[int]
 
 
 class AsyncSearchEngine(ABC):
     @abstractmethod
-    async def get_by_id(self, index: str, _id: str) -> Any | None:
+    async def get_by_id(
+        self,
+        index: str,
+        _id: str,
+        source_includes: Optional[List[str]] = None,
+        source_excludes: Optional[List[str]] = None,
+    ) -> Any | None:
+        pass
+
+    @abstractmethod
+    async def get_many(
+        self,
+        index: str,
+        ids: List[str],
+        source_includes: Optional[List[str]] = None,
+    ) -> List[Any]:
         pass
 
     @abstractmethod
     async def search_by_query(
-        self, index: str, query_body: dict
+        self,
+        index: str,
+        query_body: dict,
+        source_includes: Optional[List[str]] = None,
+        source_excludes: Optional[List[str]] = None,
     ) -> Optional[List[Any]]:
         pass
+
+    @abstractmethod
+    async def search_by_query_raw(
+        self, index: str, query_body: dict, fields: Dict[str, str]
+    ) -> Optional[bytes]:
+        pass
+
+    @abstractmethod
+    async def aggregate(self, index: str, query_body: dict) -> Optional[dict]:
+        pass
+
+    @abstractmethod
+    async def multi_search(
+        self, index: str, query_bodies: List[dict]
+    ) -> Optional[List[List[Any]]]:
+        pass
+
+    @abstractmethod
+    async def open_point_in_time(self, index: str, keep_alive: str) -> str:
+        pass
+
+    @abstractmethod
+    async def close_point_in_time(self, pit_id: str) -> None:
+        pass
+
+    @abstractmethod
+    async def search_by_point_in_time(self, query_body: dict) -> Optional[SearchPage]:
+        pass
@@ -0,0 +1,408 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from functools import wraps
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi_cache.backends import Backend
+from fastapi_cache.backends.redis import RedisBackend
+from fastapi_cache.coder import JsonCoder
+from fastapi_cache.decorator import cache
+from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
+from starlette.requests import Request
+from starlette.responses import Response
+
+from core.metrics import CACHE_L1_SIZE_BYTES, CACHE_REQUESTS, DEPENDENCY_LATENCY
+
+# Add key to sets of its tags. A tag lives as long as its longest-living key,
+# ARGV[2] = 0 means the key doesn't expire.
+TAG_KEY_SCRIPT = """
+local expire = tonumber(ARGV[2])
+for _, tag in ipairs(KEYS) do
+    local existed = redis.call('EXISTS', tag)
+    redis.call('SADD', tag, ARGV[1])
+    local ttl = redis.call('TTL', tag)
+    if expire == 0 then
+        redis.call('PERSIST', tag)
+    elseif existed == 0 or (ttl >= 0 and ttl < expire) then
+        redis.call('EXPIRE', tag, expire)
+    end
+end
+return 0
+"""
+
+# Locks of recomputing taken while handling the current request, they are released by
+# release_locks if the response isn't cached, e.g. the handler failed or returned 404.
+held_locks: ContextVar[Optional[Set[str]]] = ContextVar("held_locks", default=None)
+
+
+class TwoTierCacheBackend(Backend):
+    """
+    Cache backend with in-process LRU cache (L1) in front of shared backend (L2).
+    L1 keeps entries for a short time, so hot keys are served without a round trip to L2.
+    If redis_lock is set, only one worker of the fleet recomputes a missed key,
+    the others wait until it is in L2 or the lock is released or expires.
+    Metrics of the cache are labeled by its name.
+    If key_tags is set, keys stored in Redis L2 are added to Redis sets of their tags,
+    so keys of a tag are found without scanning the keyspace.
+    """
+
+    # Interval of checking L2 while other worker recomputes the key.
+    lock_poll_interval = 0.05
+
+    def __init__(
+        self,
+        backend: Backend,
+        ttl: int,
+        max_items: int,
+        max_bytes: int,
+        redis_lock: Optional[Redis] = None,
+        lock_timeout: float = 2.0,
+        name: str = "responses",
+        key_tags: Optional[Callable[[str], List[str]]] = None,
+    ):
+        self.backend = backend
+        self.key_tags = key_tags
+        self.tag_script: Optional[AsyncScript] = None
+        self.name = name
+        self.redis_lock = redis_lock
+        self.lock_timeout = lock_timeout
+        self.ttl = ttl
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        # key -> (L1 expiration time, L2 expiration time, value)
+        self.entries: OrderedDict[str, Tuple[float, float, bytes]] = OrderedDict()
+
+    def _l1_get(self, key: str) -> Optional[Tuple[int, bytes]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        l1_expires_at, l2_expires_at, value = entry
+        now = time.monotonic()
+        if l1_expires_at <= now:
+            self._l1_delete(key)
+            return None
+        self.entries.move_to_end(key)
+        return int(l2_expires_at - now), value
+
+    def _l1_set(self, key: str, value: bytes, expire: Optional[int]) -> None:
+        entry_size = len(key) + len(value)
+        if entry_size > self.max_bytes:
+            return
+        self._l1_delete(key)
+        now = time.monotonic()
+        l1_ttl = min(self.ttl, expire) if expire else self.ttl
+        l2_ttl = expire if expire else self.ttl
+        self.entries[key] = (now + l1_ttl, now + l2_ttl, value)
+        self.size_bytes += entry_size
+
+        # Evict least recently used entries.
+        while len(self.entries) > self.max_items or self.size_bytes > self.max_bytes:
+            self._l1_delete(next(iter(self.entries)))
+        CACHE_L1_SIZE_BYTES.labels(cache=self.name).set(self.size_bytes)
+
+    def _l1_delete(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= len(key) + len(entry[2])
+            CACHE_L1_SIZE_BYTES.labels(cache=self.name).set(self.size_bytes)
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        l1_entry = self._l1_get(key)
+        if l1_entry is not None:
+            CACHE_REQUESTS.labels(cache=self.name, tier="l1", result="hit").inc()
+            return l1_entry
+        CACHE_REQUESTS.labels(cache=self.name, tier="l1", result="miss").inc()
+
+        with DEPENDENCY_LATENCY.labels(dependency="redis", operation="get").time():
+            ttl, value = await self.backend.get_with_ttl(key)
+        if value is None and self.redis_lock is not None:
+            ttl, value = await self._wait_for_recompute(key, self.redis_lock)
+        if value is None:
+            CACHE_REQUESTS.labels(cache=self.name, tier="l2", result="miss").inc()
+            return ttl, value
+        CACHE_REQUESTS.labels(cache=self.name, tier="l2", result="hit").inc()
+
+        self._l1_set(key, value, ttl if ttl and ttl > 0 else None)
+        return ttl, value
+
+    async def _wait_for_recompute(
+        self, key: str, redis_lock: Redis
+    ) -> Tuple[int, Optional[bytes]]:
+        """Take the lock of key or wait until the lock owner puts the key to L2."""
+        lock_key = f"{key}:lock"
+        lock_acquired = await redis_lock.set(
+            lock_key, 1, nx=True, px=int(self.lock_timeout * 1000)
+        )
+        if lock_acquired:
+            locks = held_locks.get()
+            if locks is not None:
+                locks.add(lock_key)
+            return 0, None
+
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.lock_poll_interval)
+            ttl, value = await self.backend.get_with_ttl(key)
+            if value is not None:
+                return ttl, value
+            # The owner released the lock without caching the key, it won't appear.
+            if not await redis_lock.exists(lock_key):
+                break
+        return 0, None
+
+    async def release_locks(self, locks: Set[str]) -> None:
+        """Release locks of keys which weren't cached by the request."""
+        if self.redis_lock is not None and locks:
+            await self.redis_lock.delete(*locks)
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        """
+        Get values of several keys, keys missed in L1 are got from L2 in one request.
+        Unlike get_with_ttl, misses don't take the lock of recomputing.
+        """
+        values: Dict[str, Optional[bytes]] = {}
+        missed_keys = []
+        for key in keys:
+            l1_entry = self._l1_get(key)
+            if l1_entry is None:
+                missed_keys.append(key)
+            else:
+                values[key] = l1_entry[1]
+        CACHE_REQUESTS.labels(cache=self.name, tier="l1", result="hit").inc(len(values))
+        CACHE_REQUESTS.labels(cache=self.name, tier="l1", result="miss").inc(len(missed_keys))
+
+        if missed_keys:
+            with DEPENDENCY_LATENCY.labels(dependency="redis", operation="mget").time():
+                if isinstance(self.backend, RedisBackend):
+                    l2_values = await self.backend.redis.mget(missed_keys)
+                else:
+                    l2_values = await asyncio.gather(
+                        *(self.backend.get(key) for key in missed_keys)
+                    )
+            for key, value in zip(missed_keys, l2_values):
+                values[key] = value
+                if value is None:
+                    CACHE_REQUESTS.labels(cache=self.name, tier="l2", result="miss").inc()
+                else:
+                    CACHE_REQUESTS.labels(cache=self.name, tier="l2", result="hit").inc()
+                    self._l1_set(key, value, None)
+
+        return [values[key] for key in keys]
+
+    def clear_l1(self, keys_filter: Callable[[str], bool]) -> None:
+        """Evict entries of L1 whose keys pass the filter."""
+        for cached_key in [k for k in self.entries if keys_filter(k)]:
+            self._l1_delete(cached_key)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        _, value = await self.get_with_ttl(key)
+        return value
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        self._l1_set(key, value, expire)
+        with DEPENDENCY_LATENCY.labels(dependency="redis", operation="set").time():
+            await self.backend.set(key, value, expire)
+        await self._tag(key, expire)
+        if self.redis_lock is not None:
+            await self.redis_lock.delete(f"{key}:lock")
+            locks = held_locks.get()
+            if locks is not None:
+                locks.discard(f"{key}:lock")
+
+    async def set_many(self, items: Dict[str, bytes], expire: Optional[int] = None) -> None:
+        """Set values of several keys, they are put to L2 in one round trip."""
+        if not items:
+            return
+        for key, value in items.items():
+            self._l1_set(key, value, expire)
+        with DEPENDENCY_LATENCY.labels(dependency="redis", operation="mset").time():
+            if isinstance(self.backend, RedisBackend):
+                async with self.backend.redis.pipeline(transaction=False) as pipe:
+                    for key, value in items.items():
+                        pipe.set(key, value, ex=expire)
+                        await self._tag(key, expire, client=pipe)
+                    await pipe.execute()
+            else:
+                await asyncio.gather(
+                    *(self.backend.set(key, value, expire) for key, value in items.items())
+                )
+        if self.redis_lock is not None:
+            lock_keys = [f"{key}:lock" for key in items]
+            await self.redis_lock.delete(*lock_keys)
+            locks = held_locks.get()
+            if locks is not None:
+                locks.difference_update(lock_keys)
+
+    async def _tag(self, key: str, expire: Optional[int], client: Any = None) -> None:
+        """Add key stored in Redis L2 to sets of its tags, client may be a pipeline."""
+        # Script takes keys of several tags, so it runs on a single Redis, not on a cluster.
+        if (
+            self.key_tags is None
+            or not isinstance(self.backend, RedisBackend)
+            or not isinstance(self.backend.redis, Redis)
+        ):
+            return
+        tags = self.key_tags(key)
+        if not tags:
+            return
+        if self.tag_script is None:
+            self.tag_script = self.backend.redis.register_script(TAG_KEY_SCRIPT)
+        if client is not None:
+            await self.tag_script(keys=tags, args=[key, expire or 0], client=client)
+            return
+        with DEPENDENCY_LATENCY.labels(dependency="redis", operation="tag").time():
+            await self.tag_script(keys=tags, args=[key, expire or 0])
+
+    async def clear(
+        self, namespace: Optional[str] = None, key: Optional[str] = None
+    ) -> int:
+        if namespace:
+            for cached_key in [k for k in self.entries if k.startswith(f"{namespace}:")]:
+                self._l1_delete(cached_key)
+        elif key:
+            self._l1_delete(key)
+        return await self.backend.clear(namespace, key)
+
+
+async def cache_get_many(backend: Backend, keys: List[str]) -> List[Optional[bytes]]:
+    """Values of keys, TwoTierCacheBackend reads them in one round trip, others key by key."""
+    if isinstance(backend, TwoTierCacheBackend):
+        return await backend.get_many(keys)
+    return list(await asyncio.gather(*(backend.get(key) for key in keys)))
+
+
+async def cache_set_many(
+    backend: Backend, items: Dict[str, bytes], expire: Optional[int] = None
+) -> None:
+    """Set values of keys, TwoTierCacheBackend writes them in one round trip, others key by key."""
+    if isinstance(backend, TwoTierCacheBackend):
+        await backend.set_many(items, expire)
+        return
+    await asyncio.gather(*(backend.set(key, value, expire) for key, value in items.items()))
+
+
+class RawJsonCoder(JsonCoder):
+    """
+    Coder keeping body of Response returned by endpoint as is,
+    so a cache hit is sent without decoding to models and validation.
+    Other values are coded by JsonCoder.
+    """
+
+    raw_prefix = b"raw:"
+
+    @classmethod
+    def encode(cls, value: Any) -> bytes:
+        if isinstance(value, Response):
+            return cls.raw_prefix + value.body
+        return super().encode(value)
+
+    @classmethod
+    def decode_as_type(cls, value: bytes, *, type_: Any) -> Any:
+        if value.startswith(cls.raw_prefix):
+            return Response(
+                content=value[len(cls.raw_prefix):], media_type="application/json"
+            )
+        return super().decode_as_type(value, type_=type_)
+
+
+def build_cache_key(
+    namespace: str,
+    func: Callable[..., Any],
+    path: str,
+    query_params: List[Tuple[str, str]],
+    user: Optional[dict] = None,
+) -> str:
+    """Build cache key of response of endpoint func, the same as cache_key_builder."""
+    user_key = f"{user.get('sub')}:{user.get('is_premium')}" if user else ""
+    params_hash = hashlib.md5(
+        f"{func.__module__}:{func.__name__}:{query_params}:{user_key}".encode()
+    ).hexdigest()
+    return f"{namespace}:{path}:{params_hash}"
+
+
+def cache_key_builder(
+    func: Callable[..., Any],
+    namespace: str = "",
+    *,
+    request: Optional[Request] = None,
+    response: Optional[Response] = None,
+    args: Tuple[Any, ...],
+    kwargs: Dict[str, Any],
+) -> str:
+    """
+    Build cache key from path and query parameters of request.
+    Services passed to endpoints are new objects on every request, so they can't be a part of the key.
+    Responses which depend on user are cached per user.
+    """
+    path = request.url.path if request else ""
+    query_params = sorted(request.query_params.multi_items()) if request else []
+    return build_cache_key(namespace, func, path, query_params, kwargs.get("user"))
+
+
+def normalized_query_key_builder(
+    func: Callable[..., Any],
+    namespace: str = "",
+    *,
+    request: Optional[Request] = None,
+    response: Optional[Response] = None,
+    args: Tuple[Any, ...],
+    kwargs: Dict[str, Any],
+) -> str:
+    """
+    Build cache key like cache_key_builder, but from normalized query parameters:
+    empty parameters are dropped, "query" is lowercased and its whitespace is collapsed,
+    so requests with the same search share the cache entry.
+    """
+    path = request.url.path if request else ""
+    query_params = []
+    for name, value in request.query_params.multi_items() if request else []:
+        if name == "query":
+            value = " ".join(value.lower().split())
+        if value:
+            query_params.append((name, value))
+    return build_cache_key(
+        namespace, func, path, sorted(query_params), kwargs.get("user")
+    )
+
+
+def path_of_key(key: str) -> str:
+    """Get path of request from key built by cache_key_builder."""
+    path_start = key.find(":/")
+    if path_start == -1:
+        return ""
+    return key[path_start + 1: key.rindex(":")]
+
+
+def cache_unless_cursor(**cache_kwargs) -> Callable:
+    """
+    Cache decorator of endpoints with CursorPaginationParams named "pagination",
+    responses are cached as by cache(**cache_kwargs) except pages of cursor pagination.
+    Point in time of a cursor is closed after its last page, so a cached page shared by
+    clients would lead them to an expired cursor.
+    """
+
+    def wrapper(func: Callable) -> Callable:
+        cached = cache(**cache_kwargs)(func)
+
+        # Signature of cached, with parameters injected by cache, is copied by wraps.
+        @wraps(cached)
+        async def inner(*args, **kwargs):
+            if kwargs["pagination"].cursor is None:
+                return await cached(*args, **kwargs)
+            return await func(
+                *args,
+                **{
+                    name: value
+                    for name, value in kwargs.items()
+                    if not name.startswith("__fastapi_cache")
+                },
+            )
+
+        return inner
+
+    return wrapper
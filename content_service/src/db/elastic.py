@@ -1,16 +1,53 @@
 from typing import Optional
 
-from core.config import config
+from elastic_transport import AiohttpHttpNode
 from elasticsearch import AsyncElasticsearch
 
+from core.config import config
+from core.metrics import ES_POOL_SIZE, ES_REQUESTS_IN_FLIGHT
+
 es: Optional[AsyncElasticsearch] = None
 
 
+class MeteredAiohttpHttpNode(AiohttpHttpNode):
+    """
+    Elasticsearch node counting requests in flight. Connections of the pool aren't
+    exposed by elastic-transport, so it's requests, not connections in use: requests
+    above the pool size wait for a free connection.
+    """
+
+    async def perform_request(self, *args, **kwargs):
+        ES_REQUESTS_IN_FLIGHT.inc()
+        try:
+            return await super().perform_request(*args, **kwargs)
+        finally:
+            ES_REQUESTS_IN_FLIGHT.dec()
+
+
+def create_elastic() -> AsyncElasticsearch:
+    """
+    Create client, it must be created once per worker and shared between requests.
+    Keep-alive of pooled connections isn't configurable: elastic-transport has no public
+    option for it, so idle connections are closed after the default timeout of aiohttp.
+    """
+    ES_POOL_SIZE.set(config.es_connections_per_node)
+    return AsyncElasticsearch(
+        hosts=[config.es_url()],
+        node_class=MeteredAiohttpHttpNode,
+        connections_per_node=config.es_connections_per_node,
+        request_timeout=config.es_request_timeout,
+        max_retries=config.es_max_retries,
+        retry_on_timeout=config.es_retry_on_timeout,
+    )
+
+
 # Функция понадобится при внедрении зависимостей
 async def get_elastic() -> AsyncElasticsearch:
-    return AsyncElasticsearch(hosts=[f"{config.es_url()}"])
+    return get_elastic_client()
 
 
-# Dependency function to create the Elasticsearch client
+# Dependency function to get the shared Elasticsearch client
 def get_elastic_client() -> AsyncElasticsearch:
-    return AsyncElasticsearch(hosts=[f"{config.es_url()}"])
+    if es is None:
+        raise RuntimeError("Elasticsearch client is created on startup of the app.")
+    return es
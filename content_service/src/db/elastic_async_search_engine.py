@@ -1,27 +1,86 @@
-from typing import Any, List, Optional
+import logging
+from typing import Any, Dict, List, Optional
 
-from db.async_search_engine import AsyncSearchEngine
+from core.metrics import DEPENDENCY_LATENCY, ES_TOOK
+from db.async_search_engine import (
+    AsyncSearchEngine,
+    InvalidQueryError,
+    SearchError,
+    SearchPage,
+)
 from db.elastic import get_elastic_client
-from elasticsearch import AsyncElasticsearch, NotFoundError
+from elasticsearch import AsyncElasticsearch, BadRequestError, NotFoundError
 from fastapi import Depends
+from utils.raw_json import dump_documents
 
 
 class ElasticAsyncSearchEngine(AsyncSearchEngine):
     def __init__(self, elastic: AsyncElasticsearch):
         self.elastic = elastic
 
-    async def get_by_id(self, index: str, _id: str) -> Any | None:
+    @staticmethod
+    async def _request(operation: str, method, **kwargs):
+        """Call method of client, record wall-clock time and time reported by ES."""
+        with DEPENDENCY_LATENCY.labels(
+            dependency="elasticsearch", operation=operation
+        ).time():
+            response = await method(**kwargs)
+        if "took" in response:
+            ES_TOOK.labels(operation=operation).observe(response["took"] / 1000)
+        return response
+
+    async def get_by_id(
+        self,
+        index: str,
+        _id: str,
+        source_includes: Optional[List[str]] = None,
+        source_excludes: Optional[List[str]] = None,
+    ) -> Any | None:
         try:
-            doc = await self.elastic.get(index=index, id=_id)
+            doc = await self._request(
+                "get",
+                self.elastic.get,
+                index=index,
+                id=_id,
+                source_includes=source_includes,
+                source_excludes=source_excludes,
+            )
             return doc["_source"]
         except NotFoundError:
             return None
 
+    async def get_many(
+        self,
+        index: str,
+        ids: List[str],
+        source_includes: Optional[List[str]] = None,
+    ) -> List[Any]:
+        """Get documents by ids in one request, missing documents are skipped."""
+        if not ids:
+            return []
+        response = await self._request(
+            "mget",
+            self.elastic.mget,
+            index=index, ids=ids, source_includes=source_includes
+        )
+        return [doc["_source"] for doc in response["docs"] if doc.get("found")]
+
     async def search_by_query(
-        self, index: str, query_body: dict
+        self,
+        index: str,
+        query_body: dict,
+        source_includes: Optional[List[str]] = None,
+        source_excludes: Optional[List[str]] = None,
     ) -> Optional[List[Any]]:
         try:
-            response = await self.elastic.search(index=index, body=query_body)
+            response = await self._request(
+                "search",
+                self.elastic.search,
+                index=index,
+                body=query_body,
+                source_includes=source_includes,
+                source_excludes=source_excludes,
+            )
             hits = response["hits"]["hits"]
             if not hits:
                 return []
@@ -29,6 +88,116 @@ class ElasticAsyncSearchEngine(AsyncSearchEngine):
         except NotFoundError:
             return None
 
+    async def search_by_query_raw(
+        self, index: str, query_body: dict, fields: Dict[str, str]
+    ) -> Optional[bytes]:
+        """
+        Search and serialize found documents to JSON without models.
+        :param fields: Keys of output documents mapped to fields of ES documents.
+        :return: JSON array of documents or None if nothing is found.
+        """
+        try:
+            # filter_path cuts everything but documents and took from the response of ES.
+            response = await self._request(
+                "search_raw",
+                self.elastic.search,
+                index=index,
+                body=query_body,
+                source_includes=list(fields.values()),
+                filter_path=["hits.hits._source", "took"],
+            )
+        except NotFoundError:
+            return None
+        hits = response.get("hits", {}).get("hits")
+        if not hits:
+            return None
+        return dump_documents((hit["_source"] for hit in hits), fields)
+
+    async def aggregate(self, index: str, query_body: dict) -> Optional[dict]:
+        """Run aggregations without hits, results are kept in the shard request cache."""
+        try:
+            response = await self._request(
+                "aggregate",
+                self.elastic.search,
+                index=index,
+                body={**query_body, "size": 0},
+                request_cache=True,
+                filter_path=["aggregations", "hits.total", "took"],
+            )
+        except NotFoundError:
+            return None
+        total = response.get("hits", {}).get("total")
+        return {
+            **response.get("aggregations", {}),
+            "total": total["value"] if total else 0,
+        }
+
+    async def multi_search(
+        self, index: str, query_bodies: List[dict]
+    ) -> Optional[List[List[Any]]]:
+        """
+        Run several queries in one round trip, results keep the order of query_bodies.
+        A failed query fails all of them, so its empty result isn't taken for no hits.
+        """
+        if not query_bodies:
+            return []
+        searches = []
+        for query_body in query_bodies:
+            searches.append({"index": index})
+            searches.append(query_body)
+        try:
+            response = await self._request(
+                "msearch", self.elastic.msearch, searches=searches
+            )
+        except NotFoundError:
+            return None
+        errors = [item["error"] for item in response["responses"] if "error" in item]
+        if errors:
+            logging.error(
+                f"{len(errors)} of {len(query_bodies)} searches of msearch failed: {errors[:3]}"
+            )
+            raise SearchError(f"{len(errors)} searches of msearch failed.")
+        return [
+            [hit["_source"] for hit in item["hits"]["hits"]]
+            for item in response["responses"]
+        ]
+
+    async def open_point_in_time(self, index: str, keep_alive: str) -> str:
+        response = await self._request(
+            "open_point_in_time",
+            self.elastic.open_point_in_time,
+            index=index,
+            keep_alive=keep_alive,
+        )
+        return response["id"]
+
+    async def close_point_in_time(self, pit_id: str) -> None:
+        try:
+            await self._request(
+                "close_point_in_time", self.elastic.close_point_in_time, id=pit_id
+            )
+        except NotFoundError:
+            pass
+
+    async def search_by_point_in_time(self, query_body: dict) -> Optional[SearchPage]:
+        """Search inside point in time, query_body must contain "pit" and "sort"."""
+        try:
+            response = await self._request(
+                "search_point_in_time", self.elastic.search, body=query_body
+            )
+        except NotFoundError:
+            return None
+        except BadRequestError as e:
+            raise InvalidQueryError(str(e)) from e
+        hits = response["hits"]["hits"]
+        total = response["hits"].get("total")
+        return SearchPage(
+            hits=[hit["_source"] for hit in hits],
+            pit_id=response.get("pit_id", query_body["pit"]["id"]),
+            search_after=hits[-1]["sort"] if hits else None,
+            total=total["value"] if total else None,
+        )
+
 
 # Dependency function to create the ElasticAsyncSearchEngine
 def get_search_engine(
@@ -5,6 +5,7 @@ import threading
 import traceback
 
 from gunicorn.arbiter import Arbiter
+from prometheus_client import multiprocess
 from uvicorn.workers import UvicornWorker
 
 bind = "0.0.0.0:8080"
@@ -39,6 +40,12 @@ def when_ready(server: Arbiter) -> None:
     server.log.info("Server is ready. Spawning workers")
 
 
+def child_exit(server: Arbiter, worker: UvicornWorker) -> None:
+    """Хука, запускающаяся после завершения воркера в мастер-процессе."""
+    # Gauges of the dead worker are no longer summed up.
+    multiprocess.mark_process_dead(worker.pid)
+
+
 def worker_int(worker: UvicornWorker) -> None:
     """Хука, запускающаяся при завершении работы воркера."""
     worker.log.info("worker received INT or QUIT signal")
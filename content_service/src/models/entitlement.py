@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+
+
+class FilmPurchase(BaseModel):
+    """Film bought by user, reported by billing service."""
+
+    user_id: str
+    film_id: str
+
+
+class FilmPurchaseResult(BaseModel):
+    """Whether the purchase is confirmed by billing service."""
+
+    result: bool
@@ -12,13 +12,27 @@ class FilmDetail(BaseModel):
     uuid: str
     title: str
     imdb_rating: float
-    description: str
+    # Films may have no description, like in ETL.
+    description: Optional[str]
     genres: List[GenreUUID]
     actors: List[PersonUUID]
     writers: List[PersonUUID]
     directors: List[PersonUUID]
 
 
+class FilmDetailPartial(BaseModel):
+    """Film detail with only the fields requested by client."""
+
+    uuid: Optional[str]
+    title: Optional[str]
+    imdb_rating: Optional[float]
+    description: Optional[str]
+    genres: Optional[List[GenreUUID]]
+    actors: Optional[List[PersonUUID]]
+    writers: Optional[List[PersonUUID]]
+    directors: Optional[List[PersonUUID]]
+
+
 class FilmListInput(BaseModel):
     """Model for film data used for input purposes from Elasticsearch."""
 
@@ -33,3 +47,57 @@ class FilmListOutput(BaseModel):
     uuid: str
     title: Optional[str]
     imdb_rating: Optional[float]
+
+
+class FilmSuggestion(BaseModel):
+    """Film suggested while typing its title."""
+
+    uuid: str
+    title: Optional[str]
+
+
+class GenreFacet(BaseModel):
+    """Number of films of genre."""
+
+    uuid: str
+    name: Optional[str]
+    count: int
+
+
+class RatingFacet(BaseModel):
+    """Number of films with IMDb rating from rating to rating + 1."""
+
+    rating: float
+    count: int
+
+
+class FilmFacets(BaseModel):
+    """Counts of films matching query and filters."""
+
+    total: int
+    genres: List[GenreFacet]
+    imdb_rating: List[RatingFacet]
+    premium: int
+    free: int
+
+
+class FilmCursorPage(BaseModel):
+    """Page of films for cursor pagination."""
+
+    items: List[FilmListOutput]
+    next_cursor: Optional[str]
+    total: Optional[int]
+
+
+class FilmBatchRequest(BaseModel):
+    """Ids of films to get in one request."""
+
+    ids: List[str]
+
+
+class FilmBatch(BaseModel):
+    """Films of batch request, ids of films which are not found or not permitted are listed apart."""
+
+    items: List[FilmDetailPartial]
+    not_found: List[str]
+    forbidden: List[str]
@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -13,3 +15,11 @@ class GenreUUID(BaseModel):
 
     uuid: str
     name: str
+
+
+class GenreCursorPage(BaseModel):
+    """Страница жанров для пагинации по курсору."""
+
+    items: List[Genre]
+    next_cursor: Optional[str]
+    total: Optional[int]
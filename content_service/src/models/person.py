@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -28,3 +28,11 @@ class PersonWithFilms(PersonUUID):
     """Модель персоны c UUID."""
 
     films: List[FilmWithPersonRoles]
+
+
+class PersonCursorPage(BaseModel):
+    """Страница персон для пагинации по курсору."""
+
+    items: List[PersonUUID]
+    next_cursor: Optional[str]
+    total: Optional[int]
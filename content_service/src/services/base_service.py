@@ -1,7 +1,13 @@
 import abc
-from typing import Optional, Any, List
+from http import HTTPStatus
+from typing import Optional, Any, Dict, List, Tuple
 
-from db.async_search_engine import AsyncSearchEngine
+from fastapi import HTTPException
+
+from core.config import config
+from core.pagination import decode_cursor, encode_cursor, query_fingerprint
+from db.async_search_engine import AsyncSearchEngine, InvalidQueryError
+from utils.single_flight import make_key, search_engine_calls
 
 
 class BaseService(abc.ABC):
@@ -9,15 +15,143 @@ class BaseService(abc.ABC):
         self.search_engine = search_engine
         self.index = index
 
-    async def get_by_id(self, obj_id: str) -> Optional[Any]:
-        obj = await self.search_engine.get_by_id(self.index, obj_id)
+    async def get_by_id(
+        self, obj_id: str, source_includes: Optional[List[str]] = None
+    ) -> Optional[Any]:
+        obj = await search_engine_calls.do(
+            make_key("get_by_id", self.index, obj_id, source_includes),
+            lambda: self.search_engine.get_by_id(
+                self.index, obj_id, source_includes=source_includes
+            ),
+        )
         return obj
 
+    async def get_many(
+        self,
+        ids: List[str],
+        index: Optional[str] = None,
+        source_includes: Optional[List[str]] = None,
+    ) -> List[Any]:
+        index_to_use = index or self.index
+        objs = await self.search_engine.get_many(
+            index_to_use, ids, source_includes=source_includes
+        )
+        return objs
+
     async def search(
-        self, query_body: dict, index: Optional[str] = None
+        self,
+        query_body: dict,
+        index: Optional[str] = None,
+        source_includes: Optional[List[str]] = None,
     ) -> Optional[List[Any]]:
         index_to_use = index or self.index
-        results = await self.search_engine.search_by_query(
-            index_to_use, query_body=query_body
+        results = await search_engine_calls.do(
+            make_key("search", index_to_use, query_body, source_includes),
+            lambda: self.search_engine.search_by_query(
+                index_to_use, query_body=query_body, source_includes=source_includes
+            ),
         )
         return results
+
+    async def search_raw(
+        self, query_body: dict, fields: Dict[str, str], index: Optional[str] = None
+    ) -> Optional[bytes]:
+        """Search and return found documents as JSON with keys of fields."""
+        index_to_use = index or self.index
+        results = await search_engine_calls.do(
+            make_key("search_raw", index_to_use, query_body, fields),
+            lambda: self.search_engine.search_by_query_raw(
+                index_to_use, query_body=query_body, fields=fields
+            ),
+        )
+        return results
+
+    async def aggregate(
+        self, query_body: dict, index: Optional[str] = None
+    ) -> Optional[dict]:
+        index_to_use = index or self.index
+        results = await search_engine_calls.do(
+            make_key("aggregate", index_to_use, query_body),
+            lambda: self.search_engine.aggregate(
+                index_to_use, query_body=query_body),
+        )
+        return results
+
+    async def multi_search(
+        self,
+        query_bodies: List[dict],
+        index: Optional[str] = None,
+        source_includes: Optional[List[str]] = None,
+    ) -> Optional[List[List[Any]]]:
+        index_to_use = index or self.index
+        if source_includes:
+            query_bodies = [
+                {**query_body, "_source": source_includes} for query_body in query_bodies
+            ]
+        results = await self.search_engine.multi_search(
+            index_to_use, query_bodies=query_bodies
+        )
+        return results
+
+    async def search_by_cursor(
+        self,
+        query_body: dict,
+        cursor: str,
+        page_size: int,
+        track_total_hits: bool = True,
+        index: Optional[str] = None,
+        source_includes: Optional[List[str]] = None,
+    ) -> Optional[Tuple[List[Any], Optional[str], Optional[int]]]:
+        """
+        Search with point in time and search_after instead of from/size.
+        :return: Hits, cursor of the next page and total number of hits.
+        """
+        index_to_use = index or self.index
+        query_body = {k: v for k, v in query_body.items() if k != "from"}
+        # "id" is a tie-breaker, so documents with equal sort values are not skipped.
+        query_body["sort"] = query_body.get("sort", ["_score"]) + [
+            {"id": {"order": "asc"}}
+        ]
+        fingerprint = query_fingerprint(index_to_use, query_body)
+
+        decoded_cursor = decode_cursor(cursor, fingerprint)
+        if decoded_cursor:
+            pit_id = decoded_cursor["pit_id"]
+        else:
+            pit_id = await self.search_engine.open_point_in_time(
+                index_to_use, keep_alive=config.es_cursor_keep_alive
+            )
+
+        query_body["size"] = page_size
+        query_body["track_total_hits"] = track_total_hits
+        query_body["pit"] = {"id": pit_id,
+                             "keep_alive": config.es_cursor_keep_alive}
+        if source_includes:
+            query_body["_source"] = source_includes
+        if decoded_cursor:
+            query_body["search_after"] = decoded_cursor["search_after"]
+
+        try:
+            page = await self.search_engine.search_by_point_in_time(query_body)
+        except InvalidQueryError:
+            if not decoded_cursor:
+                raise
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor."
+            )
+        if page is None:
+            if decoded_cursor:
+                # Point in time of the cursor was closed or its keep_alive passed.
+                raise HTTPException(
+                    status_code=HTTPStatus.GONE,
+                    detail="Cursor expired, start from the first page.",
+                )
+            return None
+
+        next_cursor = None
+        if len(page.hits) == page_size and page.search_after is not None:
+            next_cursor = encode_cursor(page.pit_id, page.search_after, fingerprint)
+        else:
+            # The last page, search context isn't kept until keep_alive passes.
+            await self.search_engine.close_point_in_time(page.pit_id)
+        return page.hits, next_cursor, page.total if track_total_hits else None
@@ -1,9 +1,10 @@
+import hmac
 import http
 import time
 from typing import Optional
 
 from jose import jwt
-from fastapi import HTTPException, Request
+from fastapi import Header, HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 from core.config import config
@@ -48,3 +49,16 @@ class JWTBearer(HTTPBearer):
 
 
 security_jwt = JWTBearer()
+
+
+async def security_service_token(
+    x_service_token: str = Header(default="", description="Token of internal services."),
+) -> None:
+    """Allow only internal services knowing SERVICE_TOKEN, no token is accepted if it isn't set."""
+    if not config.service_token or not hmac.compare_digest(
+        x_service_token, config.service_token
+    ):
+        raise HTTPException(
+            status_code=http.HTTPStatus.FORBIDDEN,
+            detail="Invalid service token.",
+        )
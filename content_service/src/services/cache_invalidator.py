@@ -0,0 +1,106 @@
+import asyncio
+import json
+import logging
+import re
+from typing import List
+
+from redis.asyncio import Redis
+
+from db.cache_backend import TwoTierCacheBackend, path_of_key
+
+# Paths of cached responses built from a document of the index.
+# Nested paths like /films/{id}/similar are evicted too.
+CACHED_PATHS_OF_INDEX = {
+    "movies": "/movies/api/v1/films/{id}",
+    "persons": "/movies/api/v1/persons/{id}",
+    "genres": "/movies/api/v1/genres/{id}",
+}
+# Path of document at the start of path of cached response, IDs are 36 characters long.
+DOCUMENT_PATH = re.compile(
+    "|".join(
+        re.escape(template).replace(re.escape("{id}"), "[0-9a-zA-Z-]{36}")
+        for template in CACHED_PATHS_OF_INDEX.values()
+    )
+)
+TAG_PREFIX = "fastapi-cache-tag"
+
+
+def cache_tag(document_path: str) -> str:
+    """Redis set of keys of responses built from the document."""
+    return f"{TAG_PREFIX}:{document_path}"
+
+
+def cache_tags_of_key(key: str) -> List[str]:
+    """Tags of cached response, only responses of one document are tagged."""
+    match = DOCUMENT_PATH.match(path_of_key(key))
+    return [cache_tag(match.group(0))] if match else []
+
+
+class CacheInvalidator:
+    """Consumes changes published by ETL and evicts cached responses of changed documents."""
+
+    # Time to wait for new events in one request to Redis, in milliseconds.
+    block_ms = 5000
+    events_per_read = 100
+
+    def __init__(
+        self, redis: Redis, backend: TwoTierCacheBackend, stream_name: str, prefix: str
+    ):
+        self.redis = redis
+        self.backend = backend
+        self.stream_name = stream_name
+        self.prefix = prefix
+
+    async def run(self) -> None:
+        last_event_id = "$"
+        while True:
+            try:
+                response = await self.redis.xread(
+                    {self.stream_name: last_event_id},
+                    count=self.events_per_read,
+                    block=self.block_ms,
+                )
+                for _, events in response:
+                    for event_id, event in events:
+                        last_event_id = event_id
+                        await self.invalidate(event_id, event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Error of cache invalidation. {e}")
+                await asyncio.sleep(1)
+
+    async def invalidate(self, event_id: bytes, event: dict) -> None:
+        """
+        Evict cached responses of documents changed in the event.
+        Every worker evicts its own L1 cache, Redis is cleaned by one of them.
+        Keys in Redis are found by tags of document paths, see cache_tags_of_key.
+        """
+        path_template = CACHED_PATHS_OF_INDEX.get(event[b"index"].decode())
+        if not path_template:
+            return
+        stale_paths = {
+            path_template.format(id=document_id)
+            for document_id in json.loads(event[b"ids"])
+        }
+
+        stale_tags = {cache_tag(path) for path in stale_paths}
+
+        def is_stale(key: str) -> bool:
+            return any(tag in stale_tags for tag in cache_tags_of_key(key))
+
+        self.backend.clear_l1(is_stale)
+
+        event_lock = await self.redis.set(
+            f"{self.stream_name}:{event_id.decode()}:evicted", 1, nx=True, ex=60
+        )
+        if not event_lock:
+            return
+        # Keys are found in sets of tags filled by the backend, the keyspace isn't scanned.
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for tag in stale_tags:
+                pipe.smembers(tag)
+            keys_of_tags = await pipe.execute()
+        stale_keys = set().union(*keys_of_tags)
+        await self.redis.unlink(*stale_keys, *stale_tags)
+        logging.info(f"{len(stale_keys)} cached responses were evicted.")
@@ -1,13 +1,70 @@
-from typing import Optional, List
+from typing import Any, AsyncIterator, Dict, Optional, List
 
+import orjson
 from fastapi import Depends
-from models.film import FilmListInput
+from models.film import (
+    FilmListInput,
+    FilmListOutput,
+    FilmCursorPage,
+    FilmFacets,
+    GenreFacet,
+    RatingFacet,
+)
 
+from core.config import config
+from core.pagination import decode_offset_cursor, encode_offset_cursor
 from db.async_search_engine import AsyncSearchEngine
 from db.elastic_async_search_engine import ElasticAsyncSearchEngine
 from db.elastic_async_search_engine import get_search_engine
 from services.base_service import BaseService
 
+# Fields of ES document needed by FilmListInput.
+FILM_LIST_FIELDS = ["id", "title", "imdb_rating"]
+# Fields of ES document needed for film detail and checking permissions.
+FILM_DETAIL_FIELDS = [
+    "id",
+    "premium",
+    "title",
+    "imdb_rating",
+    "description",
+    "genres",
+    "actors",
+    "writers",
+    "directors",
+]
+# Keys of FilmListOutput mapped to fields of ES document.
+FILM_LIST_OUTPUT_FIELDS = {"uuid": "id",
+                           "title": "title", "imdb_rating": "imdb_rating"}
+
+
+# Fields of films shown by list endpoints, they are exported for all films.
+FILM_PUBLIC_FIELDS = ["uuid", "title", "imdb_rating"]
+# Nested objects of film and keys of their fields in output.
+FILM_NESTED_FIELDS = {
+    "genres": {"uuid": "id", "name": "name"},
+    "actors": {"uuid": "id", "full_name": "name"},
+    "writers": {"uuid": "id", "full_name": "name"},
+    "directors": {"uuid": "id", "full_name": "name"},
+}
+
+# Keys of FilmSuggestion mapped to fields of ES document.
+FILM_SUGGEST_FIELDS = {"uuid": "id", "title": "title"}
+
+
+def suggest_query(field: str, query: str, size: int) -> dict:
+    """Build query matching prefixes of words of search_as_you_type field."""
+    return {
+        "size": size,
+        "track_total_hits": False,
+        "query": {
+            "multi_match": {
+                "query": query,
+                "type": "bool_prefix",
+                "fields": [field, f"{field}._2gram", f"{field}._3gram"],
+            }
+        },
+    }
+
 
 class FilmService(BaseService):
     """Film Service."""
@@ -17,15 +74,13 @@ class FilmService(BaseService):
     def __init__(self, search_engine: AsyncSearchEngine):
         super().__init__(search_engine, self.index)
 
-    async def get_films_list_filtered_searched_sorted(
-        self,
+    @staticmethod
+    def _films_query(
         query: Optional[str] = None,
         genre_id: Optional[str] = None,
         sort: Optional[str] = None,
-        page_number: int = 1,
-        page_size: int = 50,
-    ) -> List[FilmListInput] | None:
-        """Retrieve a list of films with optional sorting, genre filtering, and full-text search."""
+    ) -> dict:
+        """Build query of films with optional sorting, genre filtering, and full-text search."""
 
         sort_dict = {"+": "asc", "-": "desc"}
 
@@ -49,10 +104,8 @@ class FilmService(BaseService):
             search_conditions.append({"match": {"title": query}})
 
         # Build the query
-        query_body = {
-            "size": page_size,
+        query_body: Dict[str, Any] = {
             "query": {"bool": {"must": search_conditions, "filter": filter_conditions}},
-            "from": (page_number - 1) * page_size,
         }
 
         # Add sorting if provided
@@ -66,27 +119,326 @@ class FilmService(BaseService):
             )
             query_body["sort"] = [{sort_field: {"order": sort_order}}]
 
-        search_results = await self.search(query_body=query_body)
+        return query_body
+
+    async def get_films_list_filtered_searched_sorted(
+        self,
+        query: Optional[str] = None,
+        genre_id: Optional[str] = None,
+        sort: Optional[str] = None,
+        page_number: int = 1,
+        page_size: int = 50,
+    ) -> List[FilmListInput] | None:
+        """Retrieve a list of films with optional sorting, genre filtering, and full-text search."""
+
+        query_body = self._films_query(query, genre_id, sort)
+        query_body["size"] = page_size
+        query_body["from"] = (page_number - 1) * page_size
+
+        search_results = await self.search(
+            query_body=query_body, source_includes=FILM_LIST_FIELDS
+        )
         if search_results:
             return [FilmListInput(**item) for item in search_results]
         return None
 
+    async def get_films_list_raw(
+        self,
+        query: Optional[str] = None,
+        genre_id: Optional[str] = None,
+        sort: Optional[str] = None,
+        page_number: int = 1,
+        page_size: int = 50,
+    ) -> bytes | None:
+        """The same list of films as JSON of FilmListOutput, without models."""
+
+        query_body = self._films_query(query, genre_id, sort)
+        query_body["size"] = page_size
+        query_body["from"] = (page_number - 1) * page_size
+
+        return await self.search_raw(
+            query_body=query_body, fields=FILM_LIST_OUTPUT_FIELDS
+        )
+
+    async def suggest(self, query: str, size: int = 10) -> bytes:
+        """Films with title starting with the query, as JSON of FilmSuggestion."""
+
+        films_json = await self.search_raw(
+            query_body=suggest_query("title.suggest", query, size),
+            fields=FILM_SUGGEST_FIELDS,
+        )
+        return films_json or b"[]"
+
+    @staticmethod
+    def _facets_aggregations() -> dict:
+        return {
+            "genres": {
+                "nested": {"path": "genres"},
+                "aggs": {
+                    "ids": {
+                        "terms": {"field": "genres.id", "size": 100},
+                        # Name of genre is taken from any film of the genre.
+                        "aggs": {
+                            "name": {
+                                "top_hits": {"size": 1, "_source": ["genres.name"]}
+                            }
+                        },
+                    }
+                },
+            },
+            "imdb_rating": {
+                "histogram": {
+                    "field": "imdb_rating",
+                    "interval": 1,
+                    "min_doc_count": 0,
+                    "extended_bounds": {"min": 0, "max": 10},
+                }
+            },
+            "premium": {
+                "filters": {
+                    "filters": {
+                        "premium": {"term": {"premium": True}},
+                        "free": {"bool": {"must_not": {"term": {"premium": True}}}},
+                    }
+                }
+            },
+        }
+
+    async def get_facets(
+        self, query: Optional[str] = None, genre_id: Optional[str] = None
+    ) -> FilmFacets | None:
+        """Count films matching the query and genre by genres, IMDb rating and premium in one request."""
+
+        query_body = self._films_query(query, genre_id)
+        query_body["aggs"] = self._facets_aggregations()
+
+        aggregations = await self.aggregate(query_body=query_body)
+        if aggregations is None:
+            return None
+
+        genres = []
+        for bucket in aggregations["genres"]["ids"]["buckets"]:
+            name_hits = bucket["name"]["hits"]["hits"]
+            genres.append(
+                GenreFacet(
+                    uuid=bucket["key"],
+                    name=name_hits[0]["_source"].get(
+                        "name") if name_hits else None,
+                    count=bucket["doc_count"],
+                )
+            )
+        premium_buckets = aggregations["premium"]["buckets"]
+        return FilmFacets(
+            total=aggregations["total"],
+            genres=genres,
+            imdb_rating=[
+                RatingFacet(rating=bucket["key"], count=bucket["doc_count"])
+                for bucket in aggregations["imdb_rating"]["buckets"]
+            ],
+            premium=premium_buckets["premium"]["doc_count"],
+            free=premium_buckets["free"]["doc_count"],
+        )
+
+    @staticmethod
+    def _export_document(film: dict, fields: List[str]) -> dict:
+        """Shape ES document like FilmDetail with only the fields."""
+        document = {}
+        for field in fields:
+            if field == "uuid":
+                document[field] = film.get("id")
+            elif field in FILM_NESTED_FIELDS:
+                document[field] = [
+                    {key: item.get(es_field)
+                     for key, es_field in FILM_NESTED_FIELDS[field].items()}
+                    for item in film.get(field) or []
+                ]
+            else:
+                document[field] = film.get(field)
+        return document
+
+    async def export_films(
+        self, fields: List[str], with_premium_details: bool, page_size: int
+    ) -> AsyncIterator[bytes]:
+        """
+        Iterate over all films in point in time, page by page, as NDJSON.
+        Only one page is kept in memory, the next page is read when the previous one is sent.
+        :param fields: Fields of FilmDetail to export.
+        :param with_premium_details: Whether to export all fields of premium films
+            or only the fields shown by list endpoints.
+        """
+        # Premium films hidden from the user keep "uuid", so their lines are never empty.
+        public_fields = ["uuid"] + [
+            field for field in fields if field in FILM_PUBLIC_FIELDS and field != "uuid"
+        ]
+        source_includes = ["id", "premium"] + [
+            field for field in fields if field != "uuid"
+        ]
+
+        pit_id = await self.search_engine.open_point_in_time(
+            self.index, keep_alive=config.es_cursor_keep_alive
+        )
+        try:
+            query_body = {
+                "size": page_size,
+                "query": {"match_all": {}},
+                # The cheapest order of documents in point in time.
+                "sort": ["_shard_doc"],
+                "track_total_hits": False,
+                "_source": source_includes,
+            }
+            while True:
+                query_body["pit"] = {
+                    "id": pit_id, "keep_alive": config.es_cursor_keep_alive}
+                page = await self.search_engine.search_by_point_in_time(query_body)
+                if page is None or not page.hits:
+                    return
+                pit_id = page.pit_id
+
+                yield b"".join(
+                    orjson.dumps(
+                        self._export_document(
+                            film,
+                            fields
+                            if with_premium_details or not film.get("premium")
+                            else public_fields,
+                        ),
+                        option=orjson.OPT_APPEND_NEWLINE,
+                    )
+                    for film in page.hits
+                )
+
+                if len(page.hits) < page_size:
+                    return
+                query_body["search_after"] = page.search_after
+        finally:
+            await self.search_engine.close_point_in_time(pit_id)
+
+    async def get_films_list_by_cursor(
+        self,
+        cursor: str,
+        query: Optional[str] = None,
+        genre_id: Optional[str] = None,
+        sort: Optional[str] = None,
+        page_size: int = 50,
+        track_total_hits: bool = True,
+    ) -> FilmCursorPage | None:
+        """Retrieve a page of films by cursor."""
+
+        result = await self.search_by_cursor(
+            query_body=self._films_query(query, genre_id, sort),
+            cursor=cursor,
+            page_size=page_size,
+            track_total_hits=track_total_hits,
+            source_includes=FILM_LIST_FIELDS,
+        )
+        return self._films_cursor_page(result)
+
+    @staticmethod
+    def _films_cursor_page(result) -> FilmCursorPage | None:
+        if result is None:
+            return None
+        hits, next_cursor, total = result
+        items = []
+        for item in hits:
+            film = FilmListInput(**item)
+            items.append(
+                FilmListOutput(
+                    uuid=film.uuid, title=film.title, imdb_rating=film.imdb_rating
+                )
+            )
+        return FilmCursorPage(items=items, next_cursor=next_cursor, total=total)
+
     async def get_similar_films(
         self, film_id: str, page_number: int = 1, page_size: int = 50
     ) -> List[FilmListInput] | None:
-        """Retrieve similar films based on genre."""
+        """
+        Retrieve similar films precomputed by ETL.
+        Films without precomputed list get similar films based on genre.
+        """
 
         # Retrieve the film details from Elasticsearch
-        film = await self.get_by_id(film_id)
-        if not film:
+        film = await self.get_by_id(
+            film_id, source_includes=["genres.id", "similar"])
+        # A film without genres and similar films has empty source, but it exists.
+        if film is None:
             return []
 
+        if film.get("similar") is not None:
+            similar_ids = film["similar"][
+                (page_number - 1) * page_size: page_number * page_size
+            ]
+            similar_films = await self.get_many(
+                similar_ids, source_includes=FILM_LIST_FIELDS
+            )
+            if similar_films:
+                return [FilmListInput(**item) for item in similar_films]
+            return None
+
+        query_body = self._similar_films_query(film_id, film)
+        query_body["size"] = page_size
+        query_body["from"] = (page_number - 1) * page_size  # Pagination
+
+        search_results = await self.search(
+            query_body=query_body, source_includes=FILM_LIST_FIELDS
+        )
+        if search_results:
+            return [FilmListInput(**item) for item in search_results]
+        return None
+
+    async def get_similar_films_by_cursor(
+        self,
+        film_id: str,
+        cursor: str,
+        page_size: int = 50,
+        track_total_hits: bool = True,
+    ) -> FilmCursorPage | None:
+        """
+        Retrieve a page of similar films by cursor.
+        Precomputed similar films are paged by position in the stored list,
+        the same films in the same order as in page mode.
+        """
+
+        film = await self.get_by_id(
+            film_id, source_includes=["genres.id", "similar"])
+        if film is None:
+            return None
+
+        if film.get("similar") is not None:
+            similar_ids = film["similar"]
+            offset = decode_offset_cursor(cursor)
+            page_ids = similar_ids[offset: offset + page_size]
+            if not page_ids:
+                return None
+            similar_films = await self.get_many(
+                page_ids, source_includes=FILM_LIST_FIELDS)
+            if not similar_films:
+                return None
+            next_offset = offset + page_size
+            next_cursor = (
+                encode_offset_cursor(next_offset) if next_offset < len(similar_ids) else None
+            )
+            return self._films_cursor_page(
+                (similar_films, next_cursor, len(similar_ids) if track_total_hits else None)
+            )
+
+        result = await self.search_by_cursor(
+            query_body=self._similar_films_query(film_id, film),
+            cursor=cursor,
+            page_size=page_size,
+            track_total_hits=track_total_hits,
+            source_includes=FILM_LIST_FIELDS,
+        )
+        return self._films_cursor_page(result)
+
+    @staticmethod
+    def _similar_films_query(film_id: str, film: dict) -> dict:
+        """Build query of films similar to the film based on genre."""
+
         # Extract genres from the retrieved film
         genres = [genre["id"] for genre in film.get("genres", [])]
 
         # Build the query to find similar films based on the extracted genres
-        query_body = {
-            "size": page_size,
+        return {
             "query": {
                 "bool": {
                     "must": [
@@ -110,14 +462,8 @@ class FilmService(BaseService):
                     ],
                 }
             },
-            "from": (page_number - 1) * page_size,  # Pagination
         }
 
-        search_results = await self.search(query_body=query_body)
-        if search_results:
-            return [FilmListInput(**item) for item in search_results]
-        return None
-
 
 # The main dependency function to create the FilmService
 def get_film_service(
@@ -4,13 +4,21 @@ from typing import Optional, List
 from elasticsearch import AsyncElasticsearch
 from fastapi import Depends
 from models.film import FilmListInput
-from models.genre import Genre
+from models.genre import Genre, GenreCursorPage
 
 from db.async_search_engine import AsyncSearchEngine
 from db.elastic import get_elastic
 from db.elastic_async_search_engine import ElasticAsyncSearchEngine
 from db.elastic_async_search_engine import get_search_engine
 from services.base_service import BaseService
+from core.config import config
+from services.film import FILM_LIST_FIELDS, FILM_LIST_OUTPUT_FIELDS
+from utils.raw_json import dump_documents
+
+# Fields of Genre model, genre documents also contain long list of popular films.
+GENRE_FIELDS = ["id", "name"]
+# Keys of Genre output mapped to fields of ES document.
+GENRE_OUTPUT_FIELDS = {"uuid": "id", "name": "name"}
 
 
 class GenreService(BaseService):
@@ -21,28 +29,58 @@ class GenreService(BaseService):
     def __init__(self, search_engine: AsyncSearchEngine):
         super().__init__(search_engine, self.index)
 
-    async def genre_list(self, page_number: int, page_size: int) -> list[Genre] | None:
-        """Получение списка жанров."""
-
-        query_body = {
+    @staticmethod
+    def _genre_list_query(page_number: int, page_size: int) -> dict:
+        return {
             "size": page_size,
             "query": {"match_all": {}},
             "from": (page_number - 1) * page_size,
         }
 
-        search_results = await self.search(query_body=query_body)
+    async def genre_list(self, page_number: int, page_size: int) -> list[Genre] | None:
+        """Получение списка жанров."""
+
+        search_results = await self.search(
+            query_body=self._genre_list_query(page_number, page_size),
+            source_includes=GENRE_FIELDS,
+        )
 
         if search_results:
             return [Genre(**item) for item in search_results]
         return None
 
-    async def get_popular_films(
-        self, genre_id: str, page_number: int = 1, page_size: int = 50
-    ) -> Optional[List[FilmListInput]]:
-        """Retrieve films sorted by IMDb rating based on genre ID."""
-
+    async def genre_list_raw(self, page_number: int, page_size: int) -> bytes | None:
+        """Получение списка жанров в виде JSON без моделей."""
+
+        return await self.search_raw(
+            query_body=self._genre_list_query(page_number, page_size),
+            fields=GENRE_OUTPUT_FIELDS,
+        )
+
+    async def genre_list_by_cursor(
+        self, cursor: str, page_size: int, track_total_hits: bool = True
+    ) -> GenreCursorPage | None:
+        """Получение страницы жанров по курсору."""
+
+        result = await self.search_by_cursor(
+            query_body={"query": {"match_all": {}}},
+            cursor=cursor,
+            page_size=page_size,
+            track_total_hits=track_total_hits,
+            source_includes=GENRE_FIELDS,
+        )
+        if result is None:
+            return None
+
+        hits, next_cursor, total = result
+        return GenreCursorPage(
+            items=[Genre(**item) for item in hits], next_cursor=next_cursor, total=total
+        )
+
+    @staticmethod
+    def _popular_films_query(genre_id: str, page_number: int, page_size: int) -> dict:
         # Build the query to filter by nested genre and sort by IMDb rating
-        query_body = {
+        return {
             "size": page_size,
             "query": {
                 "bool": {
@@ -67,17 +105,80 @@ class GenreService(BaseService):
             "sort": [
                 {
                     "imdb_rating": {"order": "desc"}
-                }  # Sort by IMDb rating in descending order
+                },  # Sort by IMDb rating in descending order
+                # Same order of films with equal rating as in the top built by ETL.
+                {"id": {"order": "asc"}},
             ],
             "from": (page_number - 1) * page_size,  # Pagination
         }
 
-        search_results = await self.search(query_body=query_body, index="movies")
+    async def _get_popular_films_ids(
+        self, genre_id: str, page_number: int, page_size: int
+    ) -> Optional[List[str]]:
+        """
+        Get IDs of page of popular films precomputed by ETL.
+        The whole stored top is read and sliced here, it is at most popular_films_count IDs.
+        :return: IDs or None if the page isn't precomputed and must be searched.
+        """
+        genre = await self.get_by_id(genre_id, source_includes=["popular"])
+        if not genre or genre.get("popular") is None:
+            return None
+        popular = genre["popular"]
+        page_end = page_number * page_size
+        # ETL keeps only the top of films of genre, the rest is searched.
+        if page_end > len(popular) and len(popular) >= config.popular_films_count:
+            return None
+        return popular[page_end - page_size: page_end]
+
+    async def get_popular_films(
+        self, genre_id: str, page_number: int = 1, page_size: int = 50
+    ) -> Optional[List[FilmListInput]]:
+        """
+        Retrieve films sorted by IMDb rating based on genre ID.
+        Genres without precomputed list get films by nested query.
+        """
+
+        films_ids = await self._get_popular_films_ids(
+            genre_id, page_number, page_size)
+        if films_ids is not None:
+            films = await self.get_many(
+                films_ids, index="movies", source_includes=FILM_LIST_FIELDS
+            )
+            if films:
+                return [FilmListInput(**item) for item in films]
+            return None
+
+        query_body = self._popular_films_query(genre_id, page_number, page_size)
+
+        search_results = await self.search(
+            query_body=query_body, index="movies", source_includes=FILM_LIST_FIELDS
+        )
 
         if search_results:
             return [FilmListInput(**item) for item in search_results]
         return None
 
+    async def get_popular_films_raw(
+        self, genre_id: str, page_number: int = 1, page_size: int = 50
+    ) -> Optional[bytes]:
+        """Retrieve films sorted by IMDb rating as JSON of FilmListOutput."""
+
+        films_ids = await self._get_popular_films_ids(
+            genre_id, page_number, page_size)
+        if films_ids is not None:
+            films = await self.get_many(
+                films_ids, index="movies", source_includes=FILM_LIST_FIELDS
+            )
+            if films:
+                return dump_documents(films, FILM_LIST_OUTPUT_FIELDS)
+            return None
+
+        return await self.search_raw(
+            query_body=self._popular_films_query(genre_id, page_number, page_size),
+            fields=FILM_LIST_OUTPUT_FIELDS,
+            index="movies",
+        )
+
 
 # The main dependency function to create the GenreService
 def get_genre_service(
@@ -1,10 +1,49 @@
+import asyncio
 import json
+from typing import List, Optional
 
-from aiohttp import ClientSession
-from fastapi import HTTPException
-from http import HTTPStatus
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
 
 from core.config import config
+from core.metrics import DEPENDENCY_LATENCY
+from db.cache_backend import TwoTierCacheBackend
+from utils.single_flight import SingleFlight, make_key
+
+# Created on startup, shared by all requests of worker.
+billing_session: Optional[ClientSession] = None
+entitlement_cache: Optional[TwoTierCacheBackend] = None
+
+billing_calls = SingleFlight()
+
+BOUGHT = b"1"
+NOT_BOUGHT = b"0"
+
+
+def create_billing_session() -> ClientSession:
+    return ClientSession(
+        connector=TCPConnector(
+            limit=config.billing_connections,
+            keepalive_timeout=config.billing_keepalive_timeout,
+        ),
+        timeout=ClientTimeout(total=config.billing_request_timeout),
+        headers={"Content-Type": "application/json"},
+    )
+
+
+def get_billing_session() -> ClientSession:
+    if billing_session is None:
+        raise RuntimeError("Session of Billing service is created on startup of the app.")
+    return billing_session
+
+
+def get_entitlement_cache() -> TwoTierCacheBackend:
+    if entitlement_cache is None:
+        raise RuntimeError("Cache of entitlements is created on startup of the app.")
+    return entitlement_cache
+
+
+def entitlement_key(user_id: str, film_id: str) -> str:
+    return f"entitlement:{user_id}:{film_id}"
 
 
 async def check_whether_user_bought_film(user_id: str, film_id: str) -> bool:
@@ -19,20 +58,60 @@ async def check_whether_user_bought_film(user_id: str, film_id: str) -> bool:
         "user_id": user_id,
     }
 
-    # try:
     # Make async request to Billing service
-    async with ClientSession() as session:
-        async with session.post(
+    with DEPENDENCY_LATENCY.labels(
+        dependency="billing", operation="check_whether_user_bought_film"
+    ).time():
+        async with get_billing_session().post(
                 url=config.billing_service_url +
-            config.billing_service_check_whether_user_bought_film,
+                config.billing_service_check_whether_user_bought_film,
                 data=json.dumps(body),
-                headers={"Content-Type": "application/json"},
         ) as response:
             response_json = await response.json()
-            return response_json['result']
+    return response_json['result']
 
-    # except Exception as e:
-    #     return False
+
+async def cache_entitlement(user_id: str, film_id: str, bought: bool) -> None:
+    await get_entitlement_cache().set(
+        entitlement_key(user_id, film_id),
+        BOUGHT if bought else NOT_BOUGHT,
+        expire=config.entitlement_cache_expire
+        if bought
+        else config.entitlement_negative_cache_expire,
+    )
+
+
+async def check_whether_user_bought_film_cached(user_id: str, film_id: str) -> bool:
+    """
+    Function check whether the user bought film in the cache and asks Billing service on a miss.
+    Concurrent misses of the same user and film make one request to Billing service.
+    :param user_id:
+    :param film_id:
+    :return: bool
+    """
+    _, cached = await get_entitlement_cache().get_with_ttl(entitlement_key(user_id, film_id))
+    if cached is not None:
+        return cached == BOUGHT
+
+    async def check_and_cache() -> bool:
+        bought = await check_whether_user_bought_film(user_id, film_id)
+        await cache_entitlement(user_id, film_id, bought)
+        return bought
+
+    return await billing_calls.do(make_key(user_id, film_id), check_and_cache)
+
+
+async def warm_entitlement(user_id: str, film_id: str) -> bool:
+    """
+    Function put purchase of film to the cache when Billing service reports it.
+    The event is not trusted, the purchase is confirmed by Billing service before caching.
+    :param user_id:
+    :param film_id:
+    :return: bool
+    """
+    bought = await check_whether_user_bought_film(user_id, film_id)
+    await cache_entitlement(user_id, film_id, bought)
+    return bought
 
 
 async def check_user_permission_for_film(user: dict, film: dict) -> bool:
@@ -48,6 +127,21 @@ async def check_user_permission_for_film(user: dict, film: dict) -> bool:
             return True
         else:
             # Check whether the user bought film.
-            result = await check_whether_user_bought_film(user['sub'], film['id'])
+            result = await check_whether_user_bought_film_cached(user['sub'], film['id'])
             return result
     return True
+
+
+async def check_user_permission_for_films(user: dict, films: List[dict]) -> List[bool]:
+    """
+    Function check permissions of user for several films at once.
+    Films which need a check of purchase are checked concurrently.
+    :param user:
+    :param films:
+    :return: list of bool in order of films
+    """
+    return list(
+        await asyncio.gather(
+            *(check_user_permission_for_film(user, film) for film in films)
+        )
+    )
@@ -2,11 +2,19 @@ from typing import Optional
 
 from fastapi import Depends
 from models.film import FilmListOutput
-from models.person import PersonUUID, PersonWithFilms, FilmWithPersonRoles
+from models.person import PersonUUID, PersonWithFilms, FilmWithPersonRoles, PersonCursorPage
 
 from db.async_search_engine import AsyncSearchEngine
 from db.elastic_async_search_engine import ElasticAsyncSearchEngine, get_search_engine
 from services.base_service import BaseService
+from services.film import FILM_LIST_FIELDS, suggest_query
+
+# Fields of films needed to get roles of person.
+FILM_ROLES_FIELDS = ["id", "actors.id", "directors.id", "writers.id"]
+# Fields of person without films.
+PERSON_FIELDS = ["id", "name"]
+# Keys of PersonUUID mapped to fields of ES document.
+PERSON_OUTPUT_FIELDS = {"uuid": "id", "full_name": "name"}
 
 
 class PersonService(BaseService):
@@ -17,14 +25,15 @@ class PersonService(BaseService):
     def __init__(self, search_engine: AsyncSearchEngine):
         super().__init__(search_engine, self.index)
 
-    async def _get_films_with_person(
-        self, person_id: str, page_size: int, page_number: int
+    @staticmethod
+    def _films_with_person_query(
+        person_id: str, page_size: int, page_number: int
     ) -> dict:
         """
         Query to ES for getting films with person.
-        :return: Hits of ElasticSearch query.
+        :return: Query body.
         """
-        query_films_with_person = {
+        return {
             "size": page_size,
             "query": {
                 "bool": {
@@ -71,10 +80,49 @@ class PersonService(BaseService):
             "from": (page_number - 1) * page_size,  # Pagination
         }
 
+    async def _get_films_with_person(
+        self,
+        person_id: str,
+        page_size: int,
+        page_number: int,
+        source_includes: list[str],
+    ) -> list[dict]:
+        """
+        Query to ES for getting films with person.
+        :return: Sources of hits of ElasticSearch query, empty if nothing is found.
+        """
         search_films_with_person = await self.search(
-            query_body=query_films_with_person, index="movies"
+            query_body=self._films_with_person_query(
+                person_id, page_size, page_number),
+            index="movies",
+            source_includes=source_includes,
         )
-        return search_films_with_person
+        return search_films_with_person or []
+
+    @staticmethod
+    def _films_with_person_roles(
+        person_id: str, films: list[dict]
+    ) -> list[FilmWithPersonRoles]:
+        """Get roles of person in every film."""
+        films_with_person_roles = []
+
+        for film_source in films:
+            person_roles = []
+            for role, field in (
+                ("actor", "actors"),
+                ("director", "directors"),
+                ("writer", "writers"),
+            ):
+                if film_source.get(field):
+                    for person in film_source[field]:
+                        if person["id"] == person_id:
+                            person_roles.append(role)
+
+            films_with_person_roles.append(
+                FilmWithPersonRoles(uuid=film_source["id"], roles=person_roles)
+            )
+
+        return films_with_person_roles
 
     async def person_detail(
         self, person_id: str, page_size: int = 999, page_number: int = 1
@@ -86,30 +134,20 @@ class PersonService(BaseService):
         if not search_results:
             return None
 
-        search_films_with_person = await self._get_films_with_person(
-            person_id, page_size, page_number
-        )
-
-        films_with_person_roles = []
-
-        for film_source in search_films_with_person:
-            person_roles = []
-            if film_source["actors"]:
-                for actor in film_source["actors"]:
-                    if actor["id"] == person_id:
-                        person_roles.append("actor")
-            if film_source["directors"]:
-                for director in film_source["directors"]:
-                    if director["id"] == person_id:
-                        person_roles.append("director")
-
-            if film_source["writers"]:
-                for writer in film_source["writers"]:
-                    if writer["id"] == person_id:
-                        person_roles.append("writer")
-
-            films_with_person_roles.append(
-                FilmWithPersonRoles(uuid=film_source["id"], roles=person_roles)
+        # Films with roles are stored in person by ETL.
+        if search_results.get("films") is not None:
+            films_with_person_roles = [
+                FilmWithPersonRoles(uuid=film["id"], roles=film["roles"])
+                for film in search_results["films"][
+                    (page_number - 1) * page_size: page_number * page_size
+                ]
+            ]
+        else:
+            search_films_with_person = await self._get_films_with_person(
+                person_id, page_size, page_number, source_includes=FILM_ROLES_FIELDS
+            )
+            films_with_person_roles = self._films_with_person_roles(
+                person_id, search_films_with_person
             )
 
         person = PersonWithFilms(
@@ -120,18 +158,24 @@ class PersonService(BaseService):
 
         return person
 
-    async def person_list(
-        self, page_number: int, page_size: int
-    ) -> list[PersonUUID] | None:
-        """Get list of person"""
-
-        query = {
+    @staticmethod
+    def _person_list_query(page_number: int, page_size: int) -> dict:
+        return {
             "size": page_size,
             "query": {"match_all": {}},
             "from": (page_number - 1) * page_size,
         }
 
-        search_results = await self.search(query_body=query, index=self.index)
+    async def person_list(
+        self, page_number: int, page_size: int
+    ) -> list[PersonUUID] | None:
+        """Get list of person"""
+
+        search_results = await self.search(
+            query_body=self._person_list_query(page_number, page_size),
+            index=self.index,
+            source_includes=PERSON_FIELDS,
+        )
 
         if search_results:
             return [
@@ -140,15 +184,72 @@ class PersonService(BaseService):
             ]
         return None
 
+    async def person_list_raw(self, page_number: int, page_size: int) -> bytes | None:
+        """Get list of person as JSON of PersonUUID"""
+
+        return await self.search_raw(
+            query_body=self._person_list_query(page_number, page_size),
+            fields=PERSON_OUTPUT_FIELDS,
+        )
+
+    async def person_suggest(self, query: str, size: int = 10) -> bytes:
+        """Get persons with name starting with the query as JSON of PersonUUID"""
+
+        persons_json = await self.search_raw(
+            query_body=suggest_query("name.suggest", query, size),
+            fields=PERSON_OUTPUT_FIELDS,
+        )
+        return persons_json or b"[]"
+
+    async def person_list_by_cursor(
+        self, cursor: str, page_size: int, track_total_hits: bool = True
+    ) -> PersonCursorPage | None:
+        """Get page of persons by cursor"""
+
+        result = await self.search_by_cursor(
+            query_body={"query": {"match_all": {}}},
+            cursor=cursor,
+            page_size=page_size,
+            track_total_hits=track_total_hits,
+            source_includes=PERSON_FIELDS,
+        )
+        if result is None:
+            return None
+
+        hits, next_cursor, total = result
+        return PersonCursorPage(
+            items=[
+                PersonUUID(uuid=item.get("id"), full_name=item.get("name"))
+                for item in hits
+            ],
+            next_cursor=next_cursor,
+            total=total,
+        )
+
     async def person_films(
         self, person_id, page_number: int = 1, page_size: int = 50
     ) -> list[FilmListOutput] | None:
         """
         Get films with person
         """
-        search_films_with_person = await self._get_films_with_person(
-            person_id, page_size, page_number
-        )
+        person = await self.get_by_id(person_id, source_includes=["films.id"])
+
+        # Films are stored in person by ETL.
+        if person and person.get("films") is not None:
+            search_films_with_person = await self.get_many(
+                [
+                    film["id"]
+                    for film in person["films"][
+                        (page_number - 1) * page_size: page_number * page_size
+                    ]
+                ],
+                index="movies",
+                source_includes=FILM_LIST_FIELDS,
+            )
+        else:
+            search_films_with_person = await self._get_films_with_person(
+                person_id, page_size, page_number, source_includes=FILM_LIST_FIELDS
+            )
 
         films = [
             FilmListOutput(
@@ -181,12 +282,47 @@ class PersonService(BaseService):
         if not search_results:
             return None
 
-        # Get ID of found persons.
-        founded_persons_id_list = [item.get("id") for item in search_results]
+        # Films with roles are stored in person by ETL.
+        films_with_roles_of_persons = {
+            person["id"]: [
+                FilmWithPersonRoles(uuid=film["id"], roles=film["roles"])
+                for film in person["films"]
+            ]
+            for person in search_results
+            if person.get("films") is not None
+        }
+
+        # Get films of other found persons with one multi search request.
+        persons_id_without_films = [
+            person["id"]
+            for person in search_results
+            if person["id"] not in films_with_roles_of_persons
+        ]
+        if persons_id_without_films:
+            films_of_persons = await self.multi_search(
+                query_bodies=[
+                    self._films_with_person_query(
+                        person_id, page_size=999, page_number=1)
+                    for person_id in persons_id_without_films
+                ],
+                index="movies",
+                source_includes=FILM_ROLES_FIELDS,
+            )
+            if films_of_persons is None:
+                films_of_persons = [[] for _ in persons_id_without_films]
+
+            for person_id, films in zip(persons_id_without_films, films_of_persons):
+                films_with_roles_of_persons[person_id] = self._films_with_person_roles(
+                    person_id, films
+                )
 
-        # Get detail(full_name, films) for found persons ID's
         founded_persons_with_details = [
-            await self.person_detail(person_id) for person_id in founded_persons_id_list
+            PersonWithFilms(
+                uuid=person.get("id"),
+                full_name=person.get("name"),
+                films=films_with_roles_of_persons[person["id"]],
+            )
+            for person in search_results
         ]
 
         return founded_persons_with_details
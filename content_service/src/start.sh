@@ -1,3 +1,9 @@
 #!/usr/bin/env bash
 
-gunicorn -k uvicorn.workers.UvicornWorker core.main:app --bind 0.0.0.0:8080
+# Workers write metrics to files of the directory, /metrics aggregates them.
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# Config file is read for its hooks, workers and timeout stay gunicorn defaults as before.
+gunicorn -c gunicorn.py --workers 1 --timeout 30 -k uvicorn.workers.UvicornWorker core.main:app --bind 0.0.0.0:8080
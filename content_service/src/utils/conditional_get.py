@@ -0,0 +1,55 @@
+import hashlib
+
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag of body, the same in all workers."""
+    return f'"{hashlib.md5(body).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check ETag against If-None-Match, which may list several ETags, weak ones or *."""
+    for client_etag in if_none_match.split(","):
+        client_etag = client_etag.strip()
+        if client_etag == "*" or client_etag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+async def conditional_response(request: Request, response: Response) -> Response:
+    """
+    Set ETag of JSON response of GET request and answer 304 if the client has the same body.
+    Responses of GET endpoints are cached, so revalidation is answered from the cache, without ES.
+    Pages of cursor pagination are not cached and a cursor is used once, so they get no ETag.
+    Streamed responses of other types are passed as is.
+    """
+    if (
+        request.method != "GET"
+        or "cursor" in request.query_params
+        or response.status_code != 200
+        or response.headers.get("content-type") != "application/json"
+        or not isinstance(response, StreamingResponse)
+    ):
+        return response
+
+    body = b"".join(
+        [
+            chunk if isinstance(chunk, bytes) else chunk.encode(response.charset)
+            async for chunk in response.body_iterator
+        ]
+    )
+    etag = make_etag(body)
+    headers = {
+        name: value
+        for name, value in response.headers.items()
+        if name not in ("etag", "content-length")
+    }
+    headers["etag"] = etag
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, status_code=200, headers=headers)
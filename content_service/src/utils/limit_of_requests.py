@@ -1,40 +1,164 @@
-import datetime
-from typing import Optional
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
 
 from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
+from starlette.requests import Request
 
 from core.config import config
+from core.metrics import DEPENDENCY_LATENCY
+from db import redis
 
-# Установим лимит на 20 запросов в минуту
-REQUEST_LIMIT_PER_MINUTE = 20
+# Cost of requests in tokens by path prefix, the first matching prefix is used.
+# Expensive requests cost more, scraping of metrics is free.
+ROUTE_COSTS: Tuple[Tuple[str, int], ...] = (
+    ("/metrics", 0),
+    ("/movies/api/v1/films/export", 10),
+    ("/movies/api/v1/films/batch", 5),
+    ("/movies/api/v1/persons/search", 3),
+    ("/movies/api/v1/films/search", 2),
+    ("/movies/api/v1/films/facets", 2),
+)
+DEFAULT_ROUTE_COST = 1
 
-redis_conn = Redis(host=config.redis_host, port=config.redis_port, db=0)
+# Token bucket: refill tokens for the time passed since the last request, then take the cost.
+# Returns 0 if the request is allowed, otherwise milliseconds until enough tokens are refilled.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local tokens_per_ms = tonumber(ARGV[2])
+local now_ms = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
 
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now_ms
+tokens = math.min(capacity, tokens + math.max(0, now_ms - updated_at) * tokens_per_ms)
 
-async def check_limit_of_requests(user_ip: str) -> Optional[bool]:
+local retry_after_ms = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    retry_after_ms = math.ceil((cost - tokens) / tokens_per_ms)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', now_ms)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / tokens_per_ms))
+return retry_after_ms
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def route_cost(path: str) -> int:
+    for prefix, cost in ROUTE_COSTS:
+        if path.startswith(prefix):
+            return cost
+    return DEFAULT_ROUTE_COST
+
+
+def client_ip(request: Request) -> Optional[str]:
+    """IP of user from headers set by nginx, or IP of connection."""
+    forwarded_for = request.headers.get("X-Forwarded-For")
+    if forwarded_for:
+        return forwarded_for.split(",")[0].strip()
+    return request.client.host if request.client else None
+
+
+class RateLimiter:
     """
-    Function for checking limit of requests for user's IP.
-    If the user has reached limit - return True.
-    :param user_ip: IP of user from headers.
-    :return: True or None.
+    Token bucket per client in Redis, checked and updated atomically by one EVALSHA call.
+    Clients rejected by Redis are remembered in process until their bucket refills,
+    so their requests are rejected without a round trip to Redis.
     """
-    # Create redis pipeline.
-    pipe = redis_conn.pipeline()
-    now = datetime.datetime.now()
 
-    # Create key user_ip:current_minute
-    key = f"{user_ip}:{now.minute}"
+    def __init__(self, capacity: int, tokens_per_minute: int, max_blocked_clients: int):
+        self.capacity = capacity
+        self.tokens_per_ms = tokens_per_minute / 60000
+        self.max_blocked_clients = max_blocked_clients
+        # client -> time when the client may make requests again
+        self.blocked_until: OrderedDict[str, float] = OrderedDict()
+        self.script: Optional[AsyncScript] = None
+        self.script_redis: Optional[Redis] = None
+
+    def _local_retry_after(self, client: str) -> Optional[float]:
+        blocked_until = self.blocked_until.get(client)
+        if blocked_until is None:
+            return None
+        retry_after = blocked_until - time.monotonic()
+        if retry_after <= 0:
+            del self.blocked_until[client]
+            return None
+        return retry_after
 
-    # Add pipline.
-    await pipe.incr(key, 1)
-    # Set life cycle for key 59 seconds
-    await pipe.expire(key, 59)
+    def _block(self, client: str, retry_after: float) -> None:
+        self.blocked_until[client] = time.monotonic() + retry_after
+        self.blocked_until.move_to_end(client)
+        while len(self.blocked_until) > self.max_blocked_clients:
+            self.blocked_until.popitem(last=False)
 
-    # Execute in redis
-    result = await pipe.execute()
+    async def check(self, client: str, cost: int) -> Optional[float]:
+        """
+        Take cost tokens from the bucket of client.
+        :return: Seconds until the request would be allowed or None if it is allowed.
+        """
+        # The bucket only gets emptier until the time of refill, so there is no need to ask Redis.
+        retry_after = self._local_retry_after(client)
+        if retry_after is not None:
+            return retry_after
+
+        connection = redis.redis
+        if connection is None:
+            raise RuntimeError("Redis client is created on startup of the app.")
+        # Script is registered on the current connection, it is loaded to Redis on the first call.
+        if self.script is None or self.script_redis is not connection:
+            self.script = connection.register_script(TOKEN_BUCKET_SCRIPT)
+            self.script_redis = connection
+
+        # A request costing more than the whole bucket would never be allowed.
+        cost = min(cost, self.capacity)
+        with DEPENDENCY_LATENCY.labels(dependency="redis", operation="rate_limit").time():
+            retry_after_ms = await self.script(
+                keys=[f"limit_of_requests:{client}"],
+                args=[self.capacity, self.tokens_per_ms,
+                      int(time.time() * 1000), cost],
+            )
+        if not retry_after_ms:
+            return None
+
+        retry_after = int(retry_after_ms) / 1000
+        self._block(client, retry_after)
+        return retry_after
+
+
+rate_limiter = RateLimiter(
+    capacity=config.limit_of_requests_burst,
+    tokens_per_minute=config.limit_of_requests_per_minute,
+    max_blocked_clients=config.limit_of_requests_max_blocked_clients,
+)
+
+
+async def check_limit_of_requests(request: Request) -> Optional[int]:
+    """
+    Function for checking limit of requests for user's IP, before the request is handled.
+    If the user has reached limit - return seconds to wait before the next request.
+    If Redis is unavailable, requests are allowed.
+    :param request: Request of user.
+    :return: Seconds or None.
+    """
+    cost = route_cost(request.url.path)
+    user_ip = client_ip(request)
+    if not cost or user_ip is None:
+        return None
 
-    # Get result of incr.
-    request_number = result[0]
+    try:
+        retry_after = await rate_limiter.check(user_ip, cost)
+    except Exception:
+        logger.warning("Error checking limit of requests:", exc_info=True)
+        return None
 
-    if request_number > config.limit_of_requests_per_minute:
-        return True
+    if retry_after is not None:
+        return max(1, math.ceil(retry_after))
+    return None
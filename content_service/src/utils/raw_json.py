@@ -0,0 +1,22 @@
+from typing import Any, Dict, Iterable
+
+import orjson
+from starlette.responses import Response
+
+
+def dump_documents(documents: Iterable[Dict[str, Any]], fields: Dict[str, str]) -> bytes:
+    """
+    Serialize documents to JSON array, keys of output documents are mapped to fields of documents.
+    Missing fields become null, the same as Optional fields of models.
+    """
+    return orjson.dumps(
+        [
+            {key: document.get(field) for key, field in fields.items()}
+            for document in documents
+        ]
+    )
+
+
+def raw_json_response(content: bytes) -> Response:
+    """Response with already serialized JSON, it is sent as is."""
+    return Response(content=content, media_type="application/json")
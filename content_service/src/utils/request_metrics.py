@@ -0,0 +1,109 @@
+import asyncio
+import time
+from functools import wraps
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import Response
+
+from core.metrics import (
+    REQUEST_LATENCY,
+    REQUESTS_IN_PROGRESS,
+    RESPONSE_SERIALIZATION_LATENCY,
+)
+
+# Label of requests which match no route, so scans of random paths don't add label values.
+UNMATCHED_ROUTE = "unmatched"
+
+# Time when endpoint of the current request returned. A list, so it is seen from
+# sync endpoints run in the thread pool with a copy of the context.
+endpoint_finished: ContextVar[Optional[List[float]]] = ContextVar(
+    "endpoint_finished", default=None
+)
+
+
+def route_of(request: Request) -> str:
+    """
+    Path template of route which handled request, e.g. /movies/api/v1/films/{film_id}.
+    Router puts the matched route to the scope, so it is known after the request is handled.
+    """
+    route = request.scope.get("route")
+    return getattr(route, "path", UNMATCHED_ROUTE)
+
+
+async def observe_request(request: Request, call_next) -> Response:
+    """
+    Count request in progress and record its latency by route and status.
+    Streamed responses are timed until their body starts.
+    """
+    in_progress = REQUESTS_IN_PROGRESS.labels(method=request.method)
+    in_progress.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        REQUEST_LATENCY.labels(
+            method=request.method, route=route_of(request), status=status
+        ).observe(time.perf_counter() - start)
+        in_progress.dec()
+
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    """Endpoint which records the time when it returned to endpoint_finished."""
+    if asyncio.iscoroutinefunction(endpoint):
+        @wraps(endpoint)
+        async def timed(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                _finish_endpoint()
+    else:
+        @wraps(endpoint)
+        def timed(*args, **kwargs):
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                _finish_endpoint()
+    return timed
+
+
+def _finish_endpoint() -> None:
+    finished = endpoint_finished.get()
+    if finished is not None:
+        finished.append(time.perf_counter())
+
+
+class TimedRoute(APIRoute):
+    """
+    Route recording time of serialization of response: validation of value returned
+    by endpoint with response model and rendering of it, which FastAPI does after
+    the endpoint returns.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Handler reads the call of dependant on every request.
+        self.dependant.call = _timed_endpoint(self.dependant.call)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            finished: List[float] = []
+            token = endpoint_finished.set(finished)
+            try:
+                response = await handler(request)
+            finally:
+                endpoint_finished.reset(token)
+            if finished:
+                RESPONSE_SERIALIZATION_LATENCY.labels(route=self.path).observe(
+                    time.perf_counter() - finished[-1]
+                )
+            return response
+
+        return timed_handler
@@ -0,0 +1,32 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+import orjson
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls: while a call with the key is in flight,
+    other callers with the same key wait for its result instead of making their own call.
+    """
+
+    def __init__(self):
+        self.calls: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self.calls[key] = task
+            task.add_done_callback(lambda _: self.calls.pop(key, None))
+        # Shield, so cancellation of one caller doesn't cancel the call for others.
+        return await asyncio.shield(task)
+
+
+def make_key(*parts: Any) -> bytes:
+    """Make key of call from its arguments."""
+    return orjson.dumps(parts, option=orjson.OPT_SORT_KEYS)
+
+
+# One registry per worker, shared by all requests.
+search_engine_calls = SingleFlight()
@@ -60,6 +60,17 @@ class TestFilmsAPI:
         assert response.status == HTTPStatus.OK
         assert updated_film_sorted == response_body_updated_sorted
 
+    async def test_film_by_id_fields(self, make_get_request):
+        film = random.choice(film_data)
+        film_id = film["id"]
+
+        response = await make_get_request(
+            f"{api_url}/{film_id}", {"fields": ["uuid", "title"]}
+        )
+
+        assert response.status == HTTPStatus.OK
+        assert response.body == {"uuid": film["id"], "title": film["title"]}
+
     async def test_search_films(self, make_get_request):
         film = random.choice(film_data)
         film_title = film["title"]
@@ -70,6 +81,26 @@ class TestFilmsAPI:
         assert response.body[0]["uuid"] == film["id"]
         assert response.body[0]["title"] == film_title
 
+    async def test_suggest_films(self, make_get_request):
+        film = random.choice(film_data)
+
+        response = await make_get_request(
+            f"{api_url}/suggest", {"q": film["title"][:-1], "size": 20}
+        )
+
+        assert response.status == HTTPStatus.OK
+        assert {"uuid": film["id"], "title": film["title"]} in response.body
+
+    async def test_film_facets(self, make_get_request):
+        response = await make_get_request(f"{api_url}/facets")
+
+        assert response.status == HTTPStatus.OK
+        assert response.body["total"] == len(film_data)
+        assert response.body["premium"] + response.body["free"] == len(film_data)
+        assert sum(bucket["count"] for bucket in response.body["imdb_rating"]) == len(
+            film_data
+        )
+
     async def test_sort_films(self, make_get_request):
         transformed_data = []
         for film in film_data:
@@ -143,6 +174,24 @@ class TestFilmsAPI:
         assert response.status == HTTPStatus.OK
         assert len(response.body) == last_pages_objects_number
 
+    async def test_films_cursor_pagination(self, make_get_request):
+        PAGE_SIZE = 3
+        films_ids = []
+        params = {"page_size": PAGE_SIZE, "cursor": ""}
+
+        while True:
+            response = await make_get_request(f"{api_url}", params)
+
+            assert response.status == HTTPStatus.OK
+            assert response.body["total"] == len(film_data)
+            films_ids.extend(film["uuid"] for film in response.body["items"])
+
+            if not response.body["next_cursor"]:
+                break
+            params["cursor"] = response.body["next_cursor"]
+
+        assert sorted(films_ids) == sorted(film["id"] for film in film_data)
+
     async def test_films_cache(self, redis_client, make_get_request):
         film = random.choice(film_data)
         film_id = film["id"]
@@ -45,7 +45,11 @@ movie_index = {
             "title": {
                 "type": "text",
                 "analyzer": "ru_en",
-                "fields": {"raw": {"type": "keyword"}},
+                "fields": {
+                    "raw": {"type": "keyword"},
+                    # Prefixes of words for autocomplete.
+                    "suggest": {"type": "search_as_you_type"},
+                },
             },
             "description": {"type": "text", "analyzer": "ru_en"},
             "directors": {
@@ -72,6 +76,7 @@ movie_index = {
                     "name": {"type": "text", "analyzer": "ru_en"},
                 },
             },
+            "similar": {"type": "keyword", "index": False},
         },
     },
 }
@@ -88,6 +93,7 @@ genre_index = {
                 "fields": {"raw": {"type": "keyword"}},
             },
             "description": {"type": "text", "analyzer": "ru_en"},
+            "popular": {"type": "keyword", "index": False},
         },
     },
 }
@@ -101,7 +107,19 @@ person_index = {
             "name": {
                 "type": "text",
                 "analyzer": "ru_en",
-                "fields": {"raw": {"type": "keyword"}},
+                "fields": {
+                    "raw": {"type": "keyword"},
+                    # Prefixes of words for autocomplete.
+                    "suggest": {"type": "search_as_you_type"},
+                },
+            },
+            "films": {
+                "type": "object",
+                "dynamic": "strict",
+                "properties": {
+                    "id": {"type": "keyword"},
+                    "roles": {"type": "keyword"},
+                },
             },
         },
     },
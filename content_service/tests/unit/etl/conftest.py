@@ -0,0 +1,9 @@
+import sys
+from pathlib import Path
+
+# Modules of ETL import each other by their names, like when ETL runs from its directory.
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "etl"))
+
+# Directory of ETL is a package too and pytest puts its parent first in path for test modules,
+# so module etl is imported while it is found first.
+import etl  # noqa: E402,F401
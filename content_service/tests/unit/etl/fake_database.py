@@ -0,0 +1,56 @@
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+
+
+class FakeCursor:
+    """Cursor which answers queries by rows of the answer function of its connection."""
+
+    def __init__(self, connection: "FakeConnection", name: Optional[str]):
+        self.connection = connection
+        self.name = name
+        self.itersize = 100
+        self.rows: Iterator[dict] = iter([])
+
+    def __enter__(self) -> "FakeCursor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+    def execute(self, query, params=None) -> None:
+        self.connection.queries.append((self.name, query, params))
+        self.rows = iter(self.connection.answer(query, params))
+
+    def fetchall(self) -> List[dict]:
+        return list(self.rows)
+
+    def fetchmany(self, size: int) -> List[dict]:
+        return [row for _, row in zip(range(size), self.rows)]
+
+
+class FakeConnection:
+    """Connection of psycopg which records queries and answers them by a function."""
+
+    def __init__(self, answer: Callable[..., List[dict]]):
+        self.answer = answer
+        self.queries: list = []
+        self.closed = False
+
+    def cursor(self, name: Optional[str] = None) -> FakeCursor:
+        return FakeCursor(self, name)
+
+    @contextmanager
+    def transaction(self):
+        yield
+
+
+def changes_after(rows: List[dict]) -> Callable[..., List[dict]]:
+    """
+    Answer of queries of changes made by extractor with generate_query returning checkpoint.
+    Rows are ordered by (modified, id), like the query orders them.
+    """
+
+    def answer(checkpoint: tuple, params=None) -> List[dict]:
+        return [row for row in rows if (row["modified"], row["id"]) > checkpoint]
+
+    return answer
@@ -0,0 +1,149 @@
+import psycopg
+import pytest
+
+from data_extractor import MIN_UUID, DataExtractor
+from state.etl_state import INITIAL_CHECKPOINT
+from tests.unit.etl.fake_database import FakeConnection, changes_after
+
+# Films linked with persons, IDs are ordered like UUIDs.
+FILMS_OF_PERSONS = {
+    "p1": [f"f{i}" for i in range(1, 8)],
+    "p2": ["f3", "f8"],
+}
+
+
+def answer_films_ids(query: str, params: tuple) -> list:
+    ids, after_film_id, limit = params
+    films_ids = sorted(
+        {film_id for person_id in ids for film_id in FILMS_OF_PERSONS.get(person_id, [])}
+    )
+    return [{"film_work_id": film_id} for film_id in films_ids if film_id > after_film_id][:limit]
+
+
+def make_extractor(monkeypatch, answer, batch_size: int = 3) -> DataExtractor:
+    extractor = DataExtractor("person", {}, batch_size)
+    connection = FakeConnection(answer)
+    monkeypatch.setattr(extractor, "connection", lambda purpose="lookup": connection)
+    return extractor
+
+
+class TestIterFilmsIds:
+
+    @pytest.mark.parametrize(
+        "ids, pages",
+        [
+            (["p1"], [["f1", "f2", "f3"], ["f4", "f5", "f6"], ["f7"]]),
+            (["p1", "p2"], [["f1", "f2", "f3"], ["f4", "f5", "f6"], ["f7", "f8"]]),
+            (["p2"], [["f3", "f8"]]),
+        ],
+    )
+    def test_films_are_split_to_batches(self, monkeypatch, ids, pages):
+        extractor = make_extractor(monkeypatch, answer_films_ids)
+
+        assert list(extractor.iter_films_ids(ids)) == pages
+
+    def test_page_continues_after_last_film_of_previous_one(self, monkeypatch):
+        extractor = make_extractor(monkeypatch, answer_films_ids)
+
+        list(extractor.iter_films_ids(["p1"]))
+
+        queries = extractor.connection().queries
+        assert [params[1] for _, _, params in queries] == [MIN_UUID, "f3", "f6"]
+        assert all(params[2] == 3 for _, _, params in queries)
+
+    def test_full_last_page_ends_with_empty_one(self, monkeypatch):
+        extractor = make_extractor(monkeypatch, answer_films_ids, batch_size=7)
+
+        assert list(extractor.iter_films_ids(["p1"])) == [FILMS_OF_PERSONS["p1"]]
+        assert len(extractor.connection().queries) == 2
+
+    @pytest.mark.parametrize("ids", [[], ["unknown"]])
+    def test_no_films(self, monkeypatch, ids):
+        extractor = make_extractor(monkeypatch, answer_films_ids)
+
+        assert list(extractor.iter_films_ids(ids)) == []
+
+
+CHANGES = [
+    {"id": f"g{i}", "modified": f"2024-01-01 00:00:0{(i + 1) // 2}"} for i in range(1, 8)
+]
+
+
+def losing_connection(answer, losses: int, after_rows: int):
+    """Answer which loses connection after some rows, the first losses times."""
+    calls = 0
+
+    def answer_until_lost(query, params=None):
+        nonlocal calls
+        calls += 1
+        for position, row in enumerate(answer(query, params)):
+            if calls <= losses and position == after_rows:
+                raise psycopg.OperationalError("server closed the connection unexpectedly")
+            yield row
+
+    return answer_until_lost
+
+
+def make_streaming_extractor(monkeypatch, answer) -> DataExtractor:
+    extractor = make_extractor(monkeypatch, answer)
+    extractor.table_name = "genre"
+    # Query is the checkpoint, the fake database answers with changes after it.
+    monkeypatch.setattr(
+        extractor, "generate_query", lambda last_modified, last_id: (last_modified, last_id))
+    return extractor
+
+
+def ids_of(batches: list) -> list:
+    return [[row["id"] for row in batch] for batch in batches]
+
+
+class TestStream:
+
+    def test_changes_are_read_by_batches_from_named_cursor(self, monkeypatch):
+        extractor = make_streaming_extractor(monkeypatch, changes_after(CHANGES))
+
+        batches = list(extractor.stream())
+
+        assert ids_of(batches) == [["g1", "g2", "g3"], ["g4", "g5", "g6"], ["g7"]]
+        assert extractor.connection().queries == [("etl_genre", INITIAL_CHECKPOINT, None)]
+
+    def test_checkpoint_moves_to_last_entry_of_yielded_batch(self, monkeypatch):
+        extractor = make_streaming_extractor(monkeypatch, changes_after(CHANGES))
+
+        checkpoints = [extractor.checkpoint for _ in extractor.stream()]
+
+        assert checkpoints == [
+            ("2024-01-01 00:00:02", "g3"),
+            ("2024-01-01 00:00:03", "g6"),
+            ("2024-01-01 00:00:04", "g7"),
+        ]
+
+    def test_stream_starts_after_checkpoint(self, monkeypatch):
+        extractor = make_streaming_extractor(monkeypatch, changes_after(CHANGES))
+        # g4 is modified at the same time as g3, so it isn't skipped.
+        extractor.set_checkpoint("2024-01-01 00:00:02", "g3")
+
+        assert ids_of(extractor.stream()) == [["g4", "g5", "g6"], ["g7"]]
+
+    def test_lost_connection_resumes_after_last_yielded_batch(self, monkeypatch):
+        extractor = make_streaming_extractor(
+            monkeypatch, losing_connection(changes_after(CHANGES), losses=2, after_rows=3))
+
+        batches = list(extractor.stream())
+
+        assert ids_of(batches) == [["g1", "g2", "g3"], ["g4", "g5", "g6"], ["g7"]]
+        assert [query for _, query, _ in extractor.connection().queries] == [
+            INITIAL_CHECKPOINT,
+            ("2024-01-01 00:00:02", "g3"),
+            ("2024-01-01 00:00:03", "g6"),
+        ]
+
+    def test_reconnections_are_limited(self, monkeypatch):
+        extractor = make_streaming_extractor(
+            monkeypatch, losing_connection(changes_after(CHANGES), losses=10, after_rows=0))
+        extractor.limit_of_retries = 2
+
+        with pytest.raises(psycopg.OperationalError):
+            list(extractor.stream())
+
+        assert len(extractor.connection().queries) == 3
@@ -0,0 +1,100 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+from elasticsearch.helpers import BulkIndexError
+
+from data_loader import DataLoader
+
+
+class FakeElasticsearch:
+    """Bulk API which fails documents with the given statuses, one status per request."""
+
+    def __init__(self, transport, failures: dict):
+        self.transport = transport
+        self.failures = failures
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def options(self, **kwargs):
+        return self
+
+    def bulk(self, operations: list, **kwargs) -> SimpleNamespace:
+        items = []
+        for line in operations:
+            action = json.loads(line)
+            op_type = next(iter(action))
+            if op_type not in ("index", "create", "update", "delete"):
+                continue
+            document_id = action[op_type]["_id"]
+            with self.lock:
+                self.sent.append(document_id)
+                statuses = self.failures.get(document_id)
+                status = statuses.pop(0) if statuses else 201
+            item = {"_index": action[op_type]["_index"], "_id": document_id, "status": status}
+            if status >= 300:
+                item["error"] = {"type": "error", "reason": str(status)}
+            items.append({op_type: item})
+        errors = any("error" in info for item in items for info in item.values())
+        return SimpleNamespace(body={"errors": errors, "items": items})
+
+
+@pytest.fixture
+def loader():
+    loader = DataLoader("http://elasticsearch:9200", "movies", chunk_size=3)
+    loader.start_sleep_time = 0
+    return loader
+
+
+def make_actions(count: int) -> list:
+    return [
+        {"_index": "movies", "_id": str(i), "_source": {"title": f"Film {i}"}}
+        for i in range(count)
+    ]
+
+
+def fake_client(loader: DataLoader, failures: dict) -> FakeElasticsearch:
+    loader.client = FakeElasticsearch(loader.client.transport, failures)
+    return loader.client
+
+
+class TestLoad:
+
+    def test_all_documents_are_sent_once(self, loader):
+        client = fake_client(loader, {})
+
+        assert loader.load(make_actions(10)) == 10
+
+        assert sorted(client.sent, key=int) == [str(i) for i in range(10)]
+        assert loader.stats()[0] == 10
+
+    def test_only_failed_documents_are_retried(self, loader):
+        client = fake_client(loader, {"2": [429], "7": [503, 429]})
+
+        assert loader.load(make_actions(10)) == 10
+
+        retried = client.sent[10:]
+        assert sorted(retried) == ["2", "7", "7"]
+        assert loader.stats()[0] == 10
+
+    def test_documents_which_cannot_be_indexed_are_not_retried(self, loader):
+        client = fake_client(loader, {"2": [429], "5": [400]})
+
+        with pytest.raises(BulkIndexError) as error:
+            loader.load(make_actions(10))
+
+        assert [item["index"]["_id"] for item in error.value.errors] == ["5"]
+        assert client.sent[10:] == []
+        # Documents which are loaded are counted, the failed ones aren't.
+        assert loader.stats()[0] == 8
+
+    def test_retries_are_limited(self, loader):
+        loader.limit_of_retries = 2
+        client = fake_client(loader, {"3": [429] * 10})
+
+        with pytest.raises(BulkIndexError) as error:
+            loader.load(make_actions(5))
+
+        assert [item["index"]["_id"] for item in error.value.errors] == ["3"]
+        assert client.sent.count("3") == 3
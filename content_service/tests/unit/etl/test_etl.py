@@ -0,0 +1,151 @@
+from typing import Any, Dict, List
+from unittest.mock import Mock
+
+import pytest
+
+from data_extractor import DataExtractor
+from etl import ETL
+from state.etl_state import INITIAL_CHECKPOINT, StateETL
+from state.redis_state_storage import BaseStorage, State
+from tests.unit.etl.fake_database import FakeConnection, changes_after
+from tests.unit.etl.test_data_extractor import answer_films_ids
+
+# Changed genres ordered by (modified, id), two of them are modified at the same time.
+CHANGES = [
+    {"id": "g1", "modified": "2024-01-01 00:00:01"},
+    {"id": "g2", "modified": "2024-01-01 00:00:02"},
+    {"id": "g3", "modified": "2024-01-01 00:00:02"},
+    {"id": "g4", "modified": "2024-01-01 00:00:03"},
+    {"id": "g5", "modified": "2024-01-01 00:00:04"},
+]
+
+
+class DictStorage(BaseStorage):
+    """Storage of state in memory, which remembers every save."""
+
+    def __init__(self):
+        self.state: Dict[str, Any] = {}
+        self.saves: List[Dict[str, Any]] = []
+
+    def save_state(self, state: Dict[str, Any]) -> None:
+        self.saves.append(state)
+        self.state.update(state)
+
+    def retrieve_state(self) -> Dict[str, Any]:
+        return dict(self.state)
+
+
+def make_etl(extractor: DataExtractor, etl_state=None, **kwargs) -> ETL:
+    if etl_state is None:
+        etl_state = Mock()
+        etl_state.get_checkpoint.return_value = INITIAL_CHECKPOINT
+    return ETL(
+        index_manager=Mock(),
+        extractor=extractor,
+        transformer=Mock(),
+        loader=Mock(),
+        changes_publisher=Mock(),
+        etl_state=etl_state,
+        batch_size=extractor.batch_size,
+        index_name=f"{extractor.table_name}s",
+        **kwargs,
+    )
+
+
+class TestReloadFilmsOf:
+
+    def test_films_are_reloaded_batch_by_batch(self, monkeypatch):
+        extractor = DataExtractor("person", {}, batch_size=3)
+        connection = FakeConnection(answer_films_ids)
+        monkeypatch.setattr(extractor, "connection", lambda purpose="lookup": connection)
+        movies_etl = Mock()
+        etl = make_etl(extractor, movies_etl=movies_etl)
+
+        etl.reload_films_of(["p1", "p2"])
+
+        assert [call.args[0] for call in movies_etl.load_by_ids.call_args_list] == [
+            ["f1", "f2", "f3"], ["f4", "f5", "f6"], ["f7", "f8"]]
+
+    def test_films_need_etl_of_movies(self):
+        etl = make_etl(DataExtractor("person", {}, batch_size=3))
+
+        with pytest.raises(ValueError):
+            etl.reload_films_of(["p1"])
+
+
+def make_genres_etl(monkeypatch, storage: DictStorage, rows: list = CHANGES) -> ETL:
+    extractor = DataExtractor("genre", {}, batch_size=2)
+    connection = FakeConnection(changes_after(rows))
+    monkeypatch.setattr(extractor, "connection", lambda purpose="lookup": connection)
+    monkeypatch.setattr(
+        extractor, "generate_query", lambda last_modified, last_id: (last_modified, last_id))
+    etl = make_etl(extractor, etl_state=StateETL(State(storage)))
+    etl.transformer.transform.side_effect = lambda index_name, data: [
+        {"_id": row["id"], "_source": row} for row in data]
+    etl.loader.stats.return_value = (0, 0)
+    return etl
+
+
+def loaded_ids(etl: ETL) -> list:
+    return [
+        document["_id"]
+        for call in etl.loader.load.call_args_list
+        for document in call.args[0]
+    ]
+
+
+class TestCheckpoints:
+
+    def test_state_without_checkpoint_starts_from_beginning(self):
+        assert StateETL(State(DictStorage())).get_checkpoint("genre") == INITIAL_CHECKPOINT
+
+    def test_checkpoint_is_saved_with_id(self):
+        etl_state = StateETL(State(DictStorage()))
+
+        etl_state.set_checkpoint("genre", "2024-01-01 00:00:02", "g2")
+
+        assert etl_state.get_checkpoint("genre") == ("2024-01-01 00:00:02", "g2")
+
+    def test_checkpoint_saved_before_ids_continues_from_first_id(self):
+        storage = DictStorage()
+        storage.save_state({"genre": "2024-01-01 00:00:02"})
+
+        assert StateETL(State(storage)).get_checkpoint("genre") == (
+            "2024-01-01 00:00:02", INITIAL_CHECKPOINT[1])
+
+    def test_checkpoint_is_saved_after_every_batch(self, monkeypatch):
+        storage = DictStorage()
+        etl = make_genres_etl(monkeypatch, storage)
+
+        assert etl.run_etl() == len(CHANGES)
+
+        assert storage.saves == [
+            {"genre": "2024-01-01 00:00:02", "genre:id": "g2"},
+            {"genre": "2024-01-01 00:00:03", "genre:id": "g4"},
+            {"genre": "2024-01-01 00:00:04", "genre:id": "g5"},
+        ]
+
+    def test_next_process_resumes_after_checkpoint(self, monkeypatch):
+        storage = DictStorage()
+        make_genres_etl(monkeypatch, storage, CHANGES[:2]).run_etl()
+
+        # The entry modified at the same time as the checkpoint is not skipped.
+        etl = make_genres_etl(monkeypatch, storage)
+        assert etl.run_etl() == 3
+
+        assert loaded_ids(etl) == ["g3", "g4", "g5"]
+        assert not etl.full_run
+
+    def test_failed_batch_is_repeated_by_next_process(self, monkeypatch):
+        storage = DictStorage()
+        etl = make_genres_etl(monkeypatch, storage)
+        etl.workers = 1
+        etl.loader.load.side_effect = [None, RuntimeError("ES is unavailable")]
+
+        with pytest.raises(RuntimeError):
+            etl.run_etl()
+
+        assert StateETL(State(storage)).get_checkpoint("genre") == ("2024-01-01 00:00:02", "g2")
+        etl = make_genres_etl(monkeypatch, storage)
+        etl.run_etl()
+        assert loaded_ids(etl) == ["g3", "g4", "g5"]
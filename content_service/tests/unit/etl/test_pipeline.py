@@ -0,0 +1,103 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pipeline import ordered_map, prefetch
+
+
+def slow_square(item: int) -> int:
+    # Earlier items are slower, so they finish after the later ones.
+    time.sleep(0.01 * (5 - item))
+    return item * item
+
+
+class TestPrefetch:
+
+    def test_items_keep_order(self):
+        assert list(prefetch(range(100), size=3)) == list(range(100))
+
+    def test_items_are_produced_in_other_thread(self):
+        threads = []
+
+        def produce():
+            for item in range(3):
+                threads.append(threading.current_thread())
+                yield item
+
+        assert list(prefetch(produce(), size=1)) == [0, 1, 2]
+        assert threading.current_thread() not in threads
+
+    def test_error_of_producer_is_raised_after_its_items(self):
+        def produce():
+            yield 1
+            yield 2
+            raise ValueError("lost connection")
+
+        items = []
+        with pytest.raises(ValueError, match="lost connection"):
+            for item in prefetch(produce(), size=4):
+                items.append(item)
+
+        assert items == [1, 2]
+
+    def test_producer_is_closed_when_consumer_stops(self):
+        closed = threading.Event()
+
+        def produce():
+            try:
+                for item in range(1000):
+                    yield item
+            finally:
+                closed.set()
+
+        prefetched = prefetch(produce(), size=2)
+        assert next(prefetched) == 0
+        prefetched.close()
+
+        assert closed.is_set()
+
+
+class TestOrderedMap:
+
+    def test_results_keep_order_of_items(self):
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            results = list(ordered_map(executor, slow_square, range(5), concurrency=5))
+
+        assert results == [(item, item * item) for item in range(5)]
+
+    def test_at_most_concurrency_items_run_at_once(self):
+        running = 0
+        max_running = 0
+        lock = threading.Lock()
+
+        def track(item: int) -> int:
+            nonlocal running, max_running
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+            return item
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(ordered_map(executor, track, range(20), concurrency=2))
+
+        assert [result for _, result in results] == list(range(20))
+        assert max_running <= 2
+
+    def test_error_is_raised_in_order_of_items(self):
+        def fail_on_three(item: int) -> int:
+            if item == 3:
+                raise ValueError(f"item {item} failed")
+            return item
+
+        results = []
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            with pytest.raises(ValueError, match="item 3 failed"):
+                for item, result in ordered_map(executor, fail_on_three, range(10), 4):
+                    results.append(result)
+
+        assert results == [0, 1, 2]
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Modules of the service import each other from src, like when the service runs from it.
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "src"))
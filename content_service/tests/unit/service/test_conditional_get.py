@@ -0,0 +1,97 @@
+from http import HTTPStatus
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+from utils.conditional_get import conditional_response, etag_matches, make_etag
+
+app = FastAPI()
+
+
+@app.middleware("http")
+async def etag(request: Request, call_next):
+    return await conditional_response(request, await call_next(request))
+
+
+@app.get("/films")
+async def films(cursor: str = None):
+    return [{"uuid": "1", "title": "Star Wars"}]
+
+
+@app.post("/films")
+async def films_batch():
+    return [{"uuid": "1", "title": "Star Wars"}]
+
+
+@app.get("/export", response_class=PlainTextResponse)
+async def export():
+    return '{"uuid": "1"}\n'
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+class TestEtagMatches:
+
+    @pytest.mark.parametrize(
+        "if_none_match",
+        ['"a"', 'W/"a"', '"b", "a"', '"b",W/"a"', "*"],
+    )
+    def test_matches(self, if_none_match):
+        assert etag_matches(if_none_match, '"a"')
+
+    @pytest.mark.parametrize("if_none_match", ['"b"', '"b", W/"c"', "a", '"a'])
+    def test_does_not_match(self, if_none_match):
+        assert not etag_matches(if_none_match, '"a"')
+
+
+class TestConditionalResponse:
+
+    def test_etag_is_hash_of_body(self, client):
+        response = client.get("/films")
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["etag"] == make_etag(response.content)
+
+    def test_not_modified(self, client):
+        etag = client.get("/films").headers["etag"]
+
+        response = client.get("/films", headers={"If-None-Match": etag})
+
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    @pytest.mark.parametrize("template", ['"other", {}', "W/{}", 'W/"other",W/{}'])
+    def test_not_modified_by_weak_and_listed_etags(self, client, template):
+        etag = client.get("/films").headers["etag"]
+
+        response = client.get("/films", headers={"If-None-Match": template.format(etag)})
+
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    def test_modified(self, client):
+        response = client.get("/films", headers={"If-None-Match": '"other"'})
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == [{"uuid": "1", "title": "Star Wars"}]
+
+    def test_cursor_pages_have_no_etag(self, client):
+        response = client.get("/films", params={"cursor": ""}, headers={"If-None-Match": "*"})
+
+        assert response.status_code == HTTPStatus.OK
+        assert "etag" not in response.headers
+
+    @pytest.mark.parametrize(
+        "method, url",
+        [("POST", "/films"), ("GET", "/export"), ("GET", "/missing")],
+    )
+    def test_other_responses_have_no_etag(self, client, method, url):
+        response = client.request(method, url, headers={"If-None-Match": "*"})
+
+        assert response.status_code != HTTPStatus.NOT_MODIFIED
+        assert "etag" not in response.headers
@@ -0,0 +1,52 @@
+import pytest
+
+from db.async_search_engine import SearchError
+from db.elastic_async_search_engine import ElasticAsyncSearchEngine
+
+
+class FakeElastic:
+    def __init__(self, responses: list):
+        self.responses = responses
+        self.searches = None
+
+    async def msearch(self, searches: list) -> dict:
+        self.searches = searches
+        return {"took": 1, "responses": self.responses}
+
+
+def hits(*sources: dict) -> dict:
+    return {"hits": {"hits": [{"_source": source} for source in sources]}}
+
+
+@pytest.mark.asyncio
+class TestMultiSearch:
+
+    async def test_results_keep_order_of_queries(self):
+        elastic = FakeElastic([hits({"id": "1"}, {"id": "2"}), hits()])
+        engine = ElasticAsyncSearchEngine(elastic)
+
+        results = await engine.multi_search(
+            "movies", [{"query": {"term": {"id": "1"}}}, {"query": {"match_all": {}}}]
+        )
+
+        assert results == [[{"id": "1"}, {"id": "2"}], []]
+        assert elastic.searches == [
+            {"index": "movies"},
+            {"query": {"term": {"id": "1"}}},
+            {"index": "movies"},
+            {"query": {"match_all": {}}},
+        ]
+
+    async def test_failed_query_is_not_empty_result(self):
+        elastic = FakeElastic(
+            [hits({"id": "1"}), {"error": {"type": "search_phase_execution_exception"}}]
+        )
+        engine = ElasticAsyncSearchEngine(elastic)
+
+        with pytest.raises(SearchError):
+            await engine.multi_search("movies", [{}, {}])
+
+    async def test_no_queries(self):
+        engine = ElasticAsyncSearchEngine(FakeElastic([]))
+
+        assert await engine.multi_search("movies", []) == []
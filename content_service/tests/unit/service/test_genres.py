@@ -0,0 +1,102 @@
+from typing import List, Optional
+
+import pytest
+
+from core.config import config
+from services.genres import GenreService
+
+POPULAR = ["f1", "f2", "f3", "f4", "f5"]
+
+
+def film(film_id: str) -> dict:
+    return {"id": film_id, "title": f"Film {film_id}", "imdb_rating": 5.0, "premium": False}
+
+
+class StubSearchEngine:
+    """Genres by ID and films of any search, which records searches of films."""
+
+    def __init__(self, genres: dict):
+        self.genres = genres
+        self.searches: List[dict] = []
+
+    async def get_by_id(self, index: str, _id: str, source_includes=None) -> Optional[dict]:
+        return self.genres.get(_id)
+
+    async def get_many(self, index: str, ids: List[str], source_includes=None) -> List[dict]:
+        return [film(film_id) for film_id in ids]
+
+    async def search_by_query(self, index: str, query_body: dict, source_includes=None):
+        self.searches.append(query_body)
+        return [film("searched")]
+
+    async def search_by_query_raw(self, index: str, query_body: dict, fields: dict):
+        self.searches.append(query_body)
+        return b"[]"
+
+
+@pytest.fixture(autouse=True)
+def popular_films_count(monkeypatch):
+    monkeypatch.setattr(config, "popular_films_count", len(POPULAR))
+
+
+def make_service(genre: dict) -> GenreService:
+    return GenreService(StubSearchEngine({genre["id"]: genre}))
+
+
+@pytest.mark.asyncio
+class TestPopularFilms:
+
+    @pytest.mark.parametrize(
+        "page_number, page_size, ids",
+        [(1, 2, ["f1", "f2"]), (2, 2, ["f3", "f4"]), (1, 5, POPULAR)],
+    )
+    async def test_page_is_sliced_from_stored_top(self, page_number, page_size, ids):
+        service = make_service({"id": "g", "popular": POPULAR})
+
+        films = await service.get_popular_films("g", page_number, page_size)
+
+        assert [film.uuid for film in films] == ids
+        assert service.search_engine.searches == []
+
+    # The last page crosses the end of the top, films past it are only found by search.
+    @pytest.mark.parametrize("page_number, page_size, offset", [(3, 2, 4), (2, 3, 3), (2, 5, 5)])
+    async def test_page_past_full_top_is_searched(self, page_number, page_size, offset):
+        service = make_service({"id": "g", "popular": POPULAR})
+
+        films = await service.get_popular_films("g", page_number, page_size)
+
+        assert [film.uuid for film in films] == ["searched"]
+        [query] = service.search_engine.searches
+        assert query["from"] == offset
+        assert query["size"] == page_size
+        assert query["sort"] == [{"imdb_rating": {"order": "desc"}}, {"id": {"order": "asc"}}]
+
+    async def test_page_past_all_films_of_genre_is_empty(self):
+        # Genre has fewer films than the top, so all of them are stored.
+        service = make_service({"id": "g", "popular": ["f1", "f2"]})
+
+        assert await service.get_popular_films("g", page_number=2, page_size=2) is None
+        assert service.search_engine.searches == []
+
+    @pytest.mark.parametrize("genre", [{"id": "g"}, {"id": "other", "popular": POPULAR}])
+    async def test_genre_without_stored_top_is_searched(self, genre):
+        service = make_service(genre)
+
+        films = await service.get_popular_films("g", page_number=1, page_size=2)
+
+        assert [film.uuid for film in films] == ["searched"]
+        assert len(service.search_engine.searches) == 1
+
+    async def test_raw_page_is_sliced_from_stored_top(self):
+        service = make_service({"id": "g", "popular": POPULAR})
+
+        body = await service.get_popular_films_raw("g", page_number=2, page_size=2)
+
+        assert b'"f3"' in body and b'"f4"' in body and b'"f1"' not in body
+        assert service.search_engine.searches == []
+
+    async def test_raw_page_past_full_top_is_searched(self):
+        service = make_service({"id": "g", "popular": POPULAR})
+
+        assert await service.get_popular_films_raw("g", page_number=3, page_size=2) == b"[]"
+        assert service.search_engine.searches[0]["from"] == 4
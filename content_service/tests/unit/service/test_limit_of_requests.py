@@ -0,0 +1,162 @@
+import fakeredis
+import pytest
+from starlette.requests import Request
+
+from db import redis
+from utils import limit_of_requests
+from utils.limit_of_requests import (
+    DEFAULT_ROUTE_COST,
+    RateLimiter,
+    check_limit_of_requests,
+    client_ip,
+    route_cost,
+)
+
+API = "/movies/api/v1"
+
+
+class FakeClock:
+    """Wall and monotonic time which move only when the test says so."""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(limit_of_requests, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    connection = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(redis, "redis", connection)
+    return connection
+
+
+@pytest.fixture
+def limiter(clock, fake_redis):
+    # Bucket of 3 tokens refilled by 1 token per second.
+    return RateLimiter(capacity=3, tokens_per_minute=60, max_blocked_clients=2)
+
+
+def make_request(path: str, headers: dict = None) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": b"",
+        "headers": [(name.lower().encode(), value.encode())
+                    for name, value in (headers or {}).items()],
+        "client": ("10.0.0.1", 1234),
+    })
+
+
+class TestRouteCost:
+
+    @pytest.mark.parametrize(
+        "path, cost",
+        [
+            ("/metrics", 0),
+            (f"{API}/films/export", 10),
+            (f"{API}/films/batch", 5),
+            (f"{API}/persons/search", 3),
+            (f"{API}/films/search", 2),
+            (f"{API}/films/facets", 2),
+            (f"{API}/films/", DEFAULT_ROUTE_COST),
+            (f"{API}/persons/", DEFAULT_ROUTE_COST),
+        ],
+    )
+    def test_cost(self, path, cost):
+        assert route_cost(path) == cost
+
+    def test_client_ip_is_taken_from_nginx(self):
+        request = make_request("/", {"X-Forwarded-For": "1.2.3.4, 10.0.0.2"})
+
+        assert client_ip(request) == "1.2.3.4"
+        assert client_ip(make_request("/")) == "10.0.0.1"
+
+
+@pytest.mark.asyncio
+class TestTokenBucket:
+
+    async def test_burst_is_allowed_then_rejected(self, limiter):
+        assert [await limiter.check("client", 1) for _ in range(3)] == [None] * 3
+
+        assert await limiter.check("client", 1) == pytest.approx(1)
+
+    async def test_cost_takes_several_tokens(self, limiter):
+        assert await limiter.check("client", 2) is None
+
+        assert await limiter.check("client", 2) == pytest.approx(1)
+
+    async def test_cost_above_capacity_is_allowed_on_full_bucket(self, limiter):
+        assert await limiter.check("client", 10) is None
+
+        assert await limiter.check("client", 10) == pytest.approx(3)
+
+    async def test_bucket_is_refilled(self, limiter, clock):
+        assert await limiter.check("client", 3) is None
+
+        clock.now += 2
+        assert await limiter.check("client", 2) is None
+        assert await limiter.check("client", 1) == pytest.approx(1)
+
+    async def test_buckets_of_clients_are_separate(self, limiter):
+        assert await limiter.check("client", 3) is None
+
+        assert await limiter.check("other", 3) is None
+
+    async def test_rejected_client_is_blocked_without_redis(self, limiter, clock, monkeypatch):
+        await limiter.check("client", 3)
+        assert await limiter.check("client", 2) == pytest.approx(2)
+
+        monkeypatch.setattr(redis, "redis", None)
+        clock.now += 1
+        assert await limiter.check("client", 1) == pytest.approx(1)
+
+    async def test_block_ends_when_bucket_is_refilled(self, limiter, clock):
+        await limiter.check("client", 3)
+        await limiter.check("client", 1)
+
+        clock.now += 1
+        assert await limiter.check("client", 1) is None
+        assert "client" not in limiter.blocked_until
+
+    async def test_block_list_is_bounded(self, limiter):
+        for client in ("first", "second", "third"):
+            await limiter.check(client, 3)
+            await limiter.check(client, 1)
+
+        assert list(limiter.blocked_until) == ["second", "third"]
+
+
+@pytest.mark.asyncio
+class TestCheckLimitOfRequests:
+
+    async def test_retry_after_is_rounded_up_to_seconds(self, monkeypatch, limiter):
+        monkeypatch.setattr(limit_of_requests, "rate_limiter", limiter)
+        request = make_request(f"{API}/films/search")
+
+        assert await check_limit_of_requests(request) is None
+        assert await check_limit_of_requests(request) == 1
+
+    async def test_free_routes_are_not_limited(self, monkeypatch, limiter):
+        monkeypatch.setattr(limit_of_requests, "rate_limiter", limiter)
+
+        for _ in range(10):
+            assert await check_limit_of_requests(make_request("/metrics")) is None
+
+    async def test_requests_are_allowed_without_redis(self, monkeypatch, limiter):
+        monkeypatch.setattr(limit_of_requests, "rate_limiter", limiter)
+        monkeypatch.setattr(redis, "redis", None)
+
+        assert await check_limit_of_requests(make_request(f"{API}/films/export")) is None
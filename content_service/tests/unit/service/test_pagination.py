@@ -0,0 +1,65 @@
+from http import HTTPStatus
+
+import pytest
+from fastapi import HTTPException
+
+from core.pagination import (
+    decode_cursor,
+    decode_offset_cursor,
+    encode_cursor,
+    encode_offset_cursor,
+    query_fingerprint,
+)
+
+FILMS_QUERY = {"query": {"match_all": {}}, "sort": [{"imdb_rating": "desc"}, {"id": "asc"}]}
+
+
+class TestCursor:
+
+    def test_cursor_is_decoded_for_its_query(self):
+        fingerprint = query_fingerprint("movies", FILMS_QUERY)
+        cursor = encode_cursor("pit", [7.5, "id"], fingerprint)
+
+        assert decode_cursor(cursor, fingerprint) == {
+            "pit_id": "pit", "search_after": [7.5, "id"]}
+
+    def test_empty_cursor_opens_new_one(self):
+        assert decode_cursor("", query_fingerprint("movies", FILMS_QUERY)) is None
+
+    @pytest.mark.parametrize(
+        "index, query_body",
+        [
+            ("genres", FILMS_QUERY),
+            ("movies", {**FILMS_QUERY, "sort": [{"title.raw": "asc"}, {"id": "asc"}]}),
+        ],
+    )
+    def test_cursor_of_other_query_is_invalid(self, index, query_body):
+        cursor = encode_cursor(
+            "pit", [7.5, "id"], query_fingerprint("movies", FILMS_QUERY))
+
+        with pytest.raises(HTTPException) as error:
+            decode_cursor(cursor, query_fingerprint(index, query_body))
+
+        assert error.value.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_malformed_cursor_is_invalid(self):
+        with pytest.raises(HTTPException) as error:
+            decode_cursor("not a cursor", query_fingerprint("movies", FILMS_QUERY))
+
+        assert error.value.status_code == HTTPStatus.BAD_REQUEST
+
+
+class TestOffsetCursor:
+
+    def test_offset_is_decoded(self):
+        assert decode_offset_cursor(encode_offset_cursor(20)) == 20
+
+    def test_empty_cursor_starts_from_zero(self):
+        assert decode_offset_cursor("") == 0
+
+    @pytest.mark.parametrize("cursor", ["not a cursor", encode_offset_cursor(-1)])
+    def test_invalid_offset(self, cursor):
+        with pytest.raises(HTTPException) as error:
+            decode_offset_cursor(cursor)
+
+        assert error.value.status_code == HTTPStatus.BAD_REQUEST
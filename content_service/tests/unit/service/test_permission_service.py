@@ -0,0 +1,115 @@
+import asyncio
+from http import HTTPStatus
+
+import fakeredis
+import pytest
+from fastapi import HTTPException
+from fastapi_cache.backends.redis import RedisBackend
+
+from core.config import config
+from db.cache_backend import TwoTierCacheBackend
+from services import permission_service
+from services.bearer import security_service_token
+
+USER_ID = "user"
+FILM_ID = "film"
+
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeAsyncRedis()
+
+
+class FakeBilling:
+    """Billing service which remembers its calls."""
+
+    def __init__(self):
+        self.calls = []
+        self.bought = set()
+
+    async def check_whether_user_bought_film(self, user_id: str, film_id: str) -> bool:
+        self.calls.append((user_id, film_id))
+        # Let concurrent callers arrive while the request is in flight.
+        await asyncio.sleep(0.01)
+        return (user_id, film_id) in self.bought
+
+
+@pytest.fixture
+def billing(monkeypatch, redis):
+    monkeypatch.setattr(
+        permission_service,
+        "entitlement_cache",
+        TwoTierCacheBackend(RedisBackend(redis), ttl=0, max_items=100, max_bytes=2**20),
+    )
+    billing = FakeBilling()
+    monkeypatch.setattr(
+        permission_service,
+        "check_whether_user_bought_film",
+        billing.check_whether_user_bought_film,
+    )
+    return billing
+
+
+@pytest.mark.asyncio
+class TestEntitlementCache:
+
+    async def test_purchase_is_cached(self, billing, redis):
+        billing.bought.add((USER_ID, FILM_ID))
+
+        assert await permission_service.check_whether_user_bought_film_cached(USER_ID, FILM_ID)
+        assert await permission_service.check_whether_user_bought_film_cached(USER_ID, FILM_ID)
+
+        assert billing.calls == [(USER_ID, FILM_ID)]
+        ttl = await redis.ttl(permission_service.entitlement_key(USER_ID, FILM_ID))
+        assert config.entitlement_negative_cache_expire < ttl <= config.entitlement_cache_expire
+
+    async def test_no_purchase_is_cached_for_short_time(self, billing, redis):
+        assert not await permission_service.check_whether_user_bought_film_cached(
+            USER_ID, FILM_ID)
+        assert not await permission_service.check_whether_user_bought_film_cached(
+            USER_ID, FILM_ID)
+
+        assert billing.calls == [(USER_ID, FILM_ID)]
+        ttl = await redis.ttl(permission_service.entitlement_key(USER_ID, FILM_ID))
+        assert 0 < ttl <= config.entitlement_negative_cache_expire
+
+    async def test_concurrent_misses_make_one_request(self, billing):
+        billing.bought.add((USER_ID, FILM_ID))
+
+        results = await asyncio.gather(
+            *(
+                permission_service.check_whether_user_bought_film_cached(USER_ID, FILM_ID)
+                for _ in range(10)
+            ),
+            permission_service.check_whether_user_bought_film_cached(USER_ID, "other"),
+        )
+
+        assert results == [True] * 10 + [False]
+        assert sorted(billing.calls) == [(USER_ID, FILM_ID), (USER_ID, "other")]
+
+    async def test_cache_is_created_on_startup(self, monkeypatch):
+        monkeypatch.setattr(permission_service, "entitlement_cache", None)
+
+        with pytest.raises(RuntimeError):
+            await permission_service.check_whether_user_bought_film_cached(USER_ID, FILM_ID)
+
+
+@pytest.mark.asyncio
+class TestServiceToken:
+
+    async def test_valid_token(self, monkeypatch):
+        monkeypatch.setattr(config, "service_token", "secret")
+
+        assert await security_service_token("secret") is None
+
+    @pytest.mark.parametrize(
+        "service_token, token",
+        [("secret", "other"), ("secret", ""), ("", ""), ("", "anything")],
+    )
+    async def test_invalid_token(self, monkeypatch, service_token, token):
+        monkeypatch.setattr(config, "service_token", service_token)
+
+        with pytest.raises(HTTPException) as error:
+            await security_service_token(token)
+
+        assert error.value.status_code == HTTPStatus.FORBIDDEN
@@ -0,0 +1,100 @@
+from http import HTTPStatus
+
+import pytest
+from fastapi import APIRouter, FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from utils.request_metrics import UNMATCHED_ROUTE, TimedRoute, observe_request
+
+router = APIRouter(route_class=TimedRoute)
+
+
+@router.get("/{film_id}")
+async def film_details(film_id: str):
+    if film_id == "missing":
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="film not found")
+    return {"uuid": film_id}
+
+
+@router.get("/{film_id}/similar")
+def similar_films(film_id: str):
+    return [{"uuid": film_id}]
+
+
+app = FastAPI()
+app.include_router(router, prefix="/api/v1/films")
+
+
+@app.middleware("http")
+async def metrics(request: Request, call_next):
+    return await observe_request(request, call_next)
+
+
+def requests_count(route: str, status: int) -> float:
+    return REGISTRY.get_sample_value(
+        "http_request_duration_seconds_count",
+        {"method": "GET", "route": route, "status": str(status)},
+    ) or 0.0
+
+
+def serializations_count(route: str) -> float:
+    return REGISTRY.get_sample_value(
+        "http_response_serialization_duration_seconds_count", {"route": route}
+    ) or 0.0
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+class TestRouteLabels:
+
+    @pytest.mark.parametrize(
+        "url, route",
+        [
+            ("/api/v1/films/{}", "/api/v1/films/{film_id}"),
+            ("/api/v1/films/{}/similar", "/api/v1/films/{film_id}/similar"),
+        ],
+    )
+    def test_requests_are_labeled_by_route_template(self, client, url, route):
+        before = requests_count(route, HTTPStatus.OK)
+
+        for film_id in ("1", "2", "3"):
+            assert client.get(url.format(film_id)).status_code == HTTPStatus.OK
+
+        assert requests_count(route, HTTPStatus.OK) == before + 3
+
+    def test_status_is_label(self, client):
+        route = "/api/v1/films/{film_id}"
+        before = requests_count(route, HTTPStatus.NOT_FOUND)
+
+        assert client.get("/api/v1/films/missing").status_code == HTTPStatus.NOT_FOUND
+
+        assert requests_count(route, HTTPStatus.NOT_FOUND) == before + 1
+
+    def test_unmatched_paths_share_label(self, client):
+        before = requests_count(UNMATCHED_ROUTE, HTTPStatus.NOT_FOUND)
+
+        for path in ("/wp-login.php", "/.env", "/api/v1/films/1/2/3"):
+            assert client.get(path).status_code == HTTPStatus.NOT_FOUND
+
+        assert requests_count(UNMATCHED_ROUTE, HTTPStatus.NOT_FOUND) == before + 3
+
+
+class TestSerializationLatency:
+
+    @pytest.mark.parametrize(
+        "url, route",
+        [
+            ("/api/v1/films/1", "/api/v1/films/{film_id}"),
+            ("/api/v1/films/1/similar", "/api/v1/films/{film_id}/similar"),
+        ],
+    )
+    def test_serialization_of_async_and_sync_endpoints_is_timed(self, client, url, route):
+        before = serializations_count(route)
+
+        assert client.get(url).status_code == HTTPStatus.OK
+
+        assert serializations_count(route) == before + 1